@@ -1,12 +1,18 @@
 import streamlit as st
 import datetime
-import pandas as pd
 import os 
-from gtts import gTTS
-import io
-import difflib
-import html
+from static_audio import play_file, play_tts
+from corpus import load_unit # 共用的題庫 (corpus/*.json，每個行程只解析一次)
+from tts_prefetch import get_prefetcher, predict_next_indices
+from quiz_engine import QuizEngine, REVIEW, SCHEDULED # 共用的出題狀態機
+from progress_store import bank_digest, get_progress_store, learner_id # 學生進度 (重新整理後可以接著做)
+from stats_table import session_stats # 側邊欄統計 (作答後只更新那一列)
+from fragments import QUIZ_FRAGMENT, SIDEBAR_FRAGMENT, rerun_after_submit # 出題區 / 發音 / 側邊欄各自重跑
+from focus import focus_input # 換題時把游標放進作答框一次 (不輪詢)
+from theme import apply_theme # 共用樣式表 (theme.css，每個 session 只放進頁面一次)
+from feedback import Feedback, CORRECT, WRONG, CORRECT_SOUND, WRONG_SOUND, round_feedback, show_feedback # 作答結果訊息 (送出時建立一次，顯示時不再拆字串)
 import time
+import uuid
 
 # 設定頁面配置,側邊欄初始狀態為展開
 st.set_page_config(
@@ -16,253 +22,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Duolingo 風格 CSS 樣式 ---
-st.markdown("""
-<style>
-/* 隱藏 Streamlit 預設元素 - 但保留側邊欄控制按鈕 */
-#MainMenu {visibility: hidden;}
-footer {visibility: hidden;}
-
-/* 確保側邊欄控制按鈕可見 */
-button[kind="header"] {
-    visibility: visible !important;
-    display: block !important;
-}
-
-[data-testid="collapsedControl"] {
-    visibility: visible !important;
-    display: block !important;
-    z-index: 9999 !important;
-}
-
-/* 隱藏音訊播放器 */
-/*audio {
-    display: none !important;
-}
-
-.stAudio {
-    display: none !important;
-}*/
-
-audio {
-    display: block !important;
-    width: 100% !important;
-    margin: 10px 0 !important;
-}
-
-.stAudio {
-    display: block !important;
-}
-
-/* 頁面背景色 */
-.stApp {
-    background-color: #F7F7F7;
-}
-
-/* 標題樣式 */
-.title-text {
-    font-size: 32px;
-    font-weight: 700;
-    color: #1CB0F6;
-    text-align: left;
-    margin-bottom: 24px;
-}
-
-/* Duolingo 綠色按鈕樣式 */
-div.stButton > button {
-    width: 100%;
-    background-color: #58CC02 !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 16px !important;
-    padding: 16px 24px !important;
-    font-size: 18px !important;
-    font-weight: 700 !important;
-    box-shadow: 0 4px 0 #58A700 !important;
-    transition: all 0.1s ease !important;
-    cursor: pointer !important;
-}
-
-div.stButton > button:hover {
-    background-color: #61E002 !important;
-    transform: translateY(-2px) !important;
-    box-shadow: 0 6px 0 #58A700 !important;
-}
-
-div.stButton > button:active {
-    background-color: #58A700 !important;
-    transform: translateY(2px) !important;
-    box-shadow: 0 2px 0 #58A700 !important;
-}
-
-/* 提交按鈕樣式 */
-.stForm button[kind="primary"] {
-    display: none !important;
-}
-
-/* 輸入框樣式 */
-.stTextInput > div > div > input {
-    border: 2px solid #E5E5E5 !important;
-    border-radius: 12px !important;
-    padding: 16px !important;
-    font-size: 18px !important;
-    transition: all 0.2s ease !important;
-}
-
-.stTextInput > div > div > input:focus {
-    border-color: #1CB0F6 !important;
-    box-shadow: 0 0 0 3px rgba(28, 176, 246, 0.1) !important;
-}
-
-.stTextInput > label {
-    font-size: 16px !important;
-    font-weight: 600 !important;
-    color: #3C3C3C !important;
-    margin-bottom: 8px !important;
-}
-
-/* 成功訊息樣式 */
-.success-message {
-    background: linear-gradient(135deg, #58CC02 0%, #61E002 100%);
-    color: white;
-    padding: 20px;
-    border-radius: 16px;
-    font-size: 20px;
-    font-weight: 700;
-    text-align: left;
-    margin: 20px 0;
-    box-shadow: 0 4px 12px rgba(88, 204, 2, 0.3);
-}
-
-/* 錯誤訊息樣式 */
-.error-message {
-    background: transparent;
-    color: #3C3C3C;
-    padding: 10px;
-    border-radius: 0px;
-    font-size: 16px;
-    font-weight: 700;
-    text-align: left;
-    margin: 10px 0;
-    box-shadow: none;
-}
-
-/* 資訊訊息樣式 */
-.info-message {
-    background: linear-gradient(135deg, #1CB0F6 0%, #4DC3FF 100%);
-    color: white;
-    padding: 20px;
-    border-radius: 16px;
-    font-size: 18px;
-    font-weight: 700;
-    text-align: left;
-    margin: 20px 0;
-    box-shadow: 0 4px 12px rgba(28, 176, 246, 0.3);
-}
-
-/* 警告訊息樣式 */
-.warning-message {
-    background: linear-gradient(135deg, #FF9600 0%, #FFB800 100%);
-    color: white;
-    padding: 16px;
-    border-radius: 12px;
-    font-size: 16px;
-    font-weight: 600;
-    margin: 16px 0;
-    box-shadow: 0 4px 12px rgba(255, 150, 0, 0.3);
-}
-
-/* 側邊欄樣式 */
-[data-testid="stSidebar"] {
-    background-color: #FFFFFF;
-    border-right: 1px solid #E5E5E5;
-}
-
-[data-testid="stSidebar"] h1, 
-[data-testid="stSidebar"] h2, 
-[data-testid="stSidebar"] h3 {
-    color: #1CB0F6 !important;
-}
-
-/* 貓頭鷹圖片樣式 */
-.owl-image {
-    animation: bounce 2s infinite;
-}
-
-@keyframes bounce {
-    0%, 100% { transform: translateY(0); }
-    50% { transform: translateY(-10px); }
-}
-
-/* 統計卡片 */
-.stat-card {
-    background: white;
-    border-radius: 12px;
-    padding: 16px;
-    margin: 8px 0;
-    box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    border-left: 4px solid #58CC02;
-}
-
-</style>
-""", unsafe_allow_html=True)
-
-# JavaScript 用於自動聚焦
-st.markdown("""
-<script>
-function focusInput() {
-    const input = window.parent.document.querySelector('input[type="text"]');
-    if (input && document.activeElement !== input) {
-        input.focus();
-    }
-}
-
-window.addEventListener('load', function() {
-    setTimeout(focusInput, 100);
-});
-
-const observer = new MutationObserver(focusInput);
-observer.observe(document.body, {
-    childList: true,
-    subtree: true
-});
-
-setInterval(focusInput, 100);
-
-document.addEventListener('click', function(e) {
-    if (e.target.tagName !== 'INPUT') {
-        setTimeout(focusInput, 10);
-    }
-});
-
-document.addEventListener('keydown', function() {
-    setTimeout(focusInput, 10);
-});
-</script>
-""", unsafe_allow_html=True)
-
-# 詞彙列表
-chinese_words = [ 
-    "冷風", "雪梨", "港口", "卻是", "冬天",
-    "台灣", "季節", "相反", "煙火", "點心",
-    "等待", "綻放", "夜空", "照片", "分享",
-    "雖然", "喜歡", "春節", "年貨", "期待", "年夜飯"
-]
-
-word_bank = []
-for word in chinese_words:
-    word_item = {
-        "word": word,
-        "translation": word,
-    }
-    word_bank.append(word_item)
+# 詞彙列表 (corpus/ch_u10.json；translation 與詞彙相同)
+word_bank = load_unit("ch_u10").entries
 
 
 def play_local_audio(filename: str):
     """播放本地音效檔案"""
     try:
-        audio_bytes = open(filename, 'rb').read()
-        st.audio(audio_bytes, format='audio/mp3', autoplay=True)
+        play_file(filename)
     except FileNotFoundError:
         st.warning(f"⚠ 找不到音效檔案:'{filename}'")
     except Exception as e:
@@ -270,311 +37,208 @@ def play_local_audio(filename: str):
 
 
 def set_gtts_to_play(text: str, lang: str):
-    """設定要播放的 TTS 文字並加入時間戳記"""
+    """設定要播放的 TTS 文字並加入時間戳記 (同一次執行中由按鈕下方的 centralized_gtts_playback() 播放，不再 rerun)"""
     if text:
         # 使用時間戳記確保每次都是新的播放請求
         st.session_state.gtts_to_play = (text, lang, time.time())
-        st.rerun()
     else:
         st.warning("⚠ 播放內容為空")
         
 
 def centralized_gtts_playback():
-    """集中處理 gTTS 音訊播放"""
+    """集中處理 gTTS 音訊播放 (於 audio_controls() 內呼叫)"""
     if st.session_state.gtts_to_play is not None:
         text, lang, timestamp = st.session_state.gtts_to_play
         st.session_state.gtts_to_play = None
         
         try:
-            tts = gTTS(text=text, lang=lang)
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            
             # 直接播放，不使用 placeholder
-            st.audio(fp, format="audio/mp3", autoplay=True)
+            play_tts(text, lang)
             
         except Exception as e:
             st.error(f"生成語音時發生錯誤:{e}")
 
 
-def get_diff_html(a: str, b: str) -> str:
-    """生成差異化顯示的 HTML(中文版本)"""
-    s = difflib.SequenceMatcher(None, a, b)
-
-    correct = []
-    inputed = []
-
-    GREEN = "background:#58CC02;color:white;"
-    RED = "background:#FF4B4B;color:white;"
-    EMPTY = "background:#E5E5E5;color:white;"
-
-    def span(text, style):
-        text = html.escape(text)
-        return f"<span style='{style}display:inline-block;width:35px;height:45px;line-height:45px;margin:2px;border-radius:8px;font-family:Arial, sans-serif;text-align:center;font-size:27px;font-weight:600;'>{text}</span>"
-
-    for opcode, a1, a2, b1, b2 in s.get_opcodes():
-        A = a[a1:a2]
-        B = b[b1:b2]
-
-        if opcode == "equal":
-            for x, y in zip(A, B):
-                correct.append(span(x, GREEN))
-                inputed.append(span(y, GREEN))
-
-        elif opcode == "replace":
-            L = max(len(A), len(B))
-            for i in range(L):
-                ca = A[i] if i < len(A) else "_"
-                cb = B[i] if i < len(B) else "_"
-                correct.append(span(ca, RED))
-                inputed.append(span(cb, RED))
-
-        elif opcode == "delete":
-            for ch in A:
-                correct.append(span(ch, RED))
-                inputed.append(span("_", EMPTY))
-
-        elif opcode == "insert":
-            for ch in B:
-                correct.append(span("_", EMPTY))
-                inputed.append(span(ch, RED))
-
-    return f"""<div style='text-align:left;margin-top:10px;margin-bottom:10px;'>
-        <div style='margin-bottom:5px;'>{''.join(correct)}</div>
-        <div style='font-size:15px;margin:5px;color:#666;'>⬇️</div>
-        <div>{''.join(inputed)}</div>
-    </div>"""
-
-
 # --- 初始化 Session State ---
 total_questions = len(word_bank)
-current_word_hash = hash(tuple(item['word'] for item in word_bank)) 
-
-if "word_bank_hash" not in st.session_state or st.session_state.word_bank_hash != current_word_hash:
-    st.session_state.wrong_queue = []
-    st.session_state.study_mode = 'LEARNING' 
-    st.session_state.sequence_cursor = 0
-    st.session_state.current_display_index = 0
-    st.session_state.stats = [{"正確": 0, "錯誤": 0} for _ in range(total_questions)]
-    st.session_state.history = []
+current_word_hash = bank_digest(item['word'] for item in word_bank)
+PROGRESS_UNIT = "ch_u10"
+progress = get_progress_store()
+learner = learner_id(st.query_params, st.session_state)
+
+if "quiz" not in st.session_state or st.session_state.get("word_bank_hash") != current_word_hash:
+    saved = progress.load_quiz(learner, PROGRESS_UNIT, current_word_hash)
+    st.session_state.quiz, st.session_state.history = saved or (QuizEngine(total_questions), progress.new_history(learner, PROGRESS_UNIT))
     st.session_state.word_bank_hash = current_word_hash
-    st.session_state.last_message = ""      
+    st.session_state.feedback = None
     st.session_state.gtts_to_play = None    
-    st.session_state.local_sound_to_play = "" 
-    st.toast("🎉 新題庫已載入!")
+    st.toast("🎉 已載入上次的進度!" if saved else "🎉 新題庫已載入!")
 else:
-    if "last_message" not in st.session_state:
-        st.session_state.last_message = ""
+    if "feedback" not in st.session_state:
+        st.session_state.feedback = None
     if "gtts_to_play" not in st.session_state:
         st.session_state.gtts_to_play = None
-    if "local_sound_to_play" not in st.session_state:
-        st.session_state.local_sound_to_play = ""
+
+quiz = st.session_state.quiz
+stats = session_stats(st.session_state, quiz, (item["word"] for item in word_bank))
 
 
 def go_next_question():
     """進入下一題"""
-    if st.session_state.study_mode == 'REVIEW':
-        if len(st.session_state.wrong_queue) > 0:
-            next_idx = st.session_state.wrong_queue[0]
-            st.session_state.current_display_index = next_idx
-        else:
-            st.session_state.study_mode = 'LEARNING'
-            st.session_state.sequence_cursor = 0
-            st.session_state.last_message = "🎉 錯題複習完畢!開始新的一輪!"
-            st.session_state.current_display_index = 0
-    
-    elif st.session_state.study_mode == 'LEARNING':
-        st.session_state.sequence_cursor += 1
-        
-        if st.session_state.sequence_cursor < total_questions:
-            st.session_state.current_display_index = st.session_state.sequence_cursor
-        else:
-            if len(st.session_state.wrong_queue) > 0:
-                st.session_state.study_mode = 'REVIEW'
-                st.session_state.last_message = "🔄 一輪結束,進入錯題複習模式!"
-                go_next_question()
-            else:
-                st.session_state.sequence_cursor = 0
-                st.session_state.current_display_index = 0
-                st.session_state.last_message = "💯 太強了!全部答對,直接開始新的一輪!"
+    event = quiz.next()
+    if event:
+        st.session_state.feedback = round_feedback(event, st.session_state.feedback)
 
 
 # --- 主介面 ---
-current_index = st.session_state.current_display_index
-current_item = word_bank[current_index]
-current_word = current_item["word"]
-translation = current_item["translation"]
+# 整頁只在第一次載入、切換模式或換題庫時執行；之後的互動只重跑對應的 fragment：
+#   送出答案 -> quiz_area() + sidebar_panel()，按發音按鈕 -> audio_controls()，側邊欄 -> sidebar_panel()
 
 # 頁面標題
+apply_theme()
 st.markdown('<p class="title-text">🎧 中文詞彙聽力練習</p>', unsafe_allow_html=True)
 
-# 播放音效
-if st.session_state.local_sound_to_play:
-    play_local_audio(st.session_state.local_sound_to_play)
-    st.session_state.local_sound_to_play = ""
 
-centralized_gtts_playback()
+@st.fragment
+def audio_controls():
+    """播放按鈕與 TTS 播放：按下按鈕只重跑這一段 (播放的是按下當下的題目)"""
+    current_index = quiz.current
+    st.markdown('<div style="padding-top: 0px;">', unsafe_allow_html=True)
+    if st.button("🔊 播放詞彙發音", key=f"play_btn_{current_index}"): 
+        set_gtts_to_play(word_bank[current_index]["word"], 'zh-tw')
+    st.markdown('</div>', unsafe_allow_html=True)
 
-# 顯示訊息
-if st.session_state.last_message:
-    message = st.session_state.last_message
-    
-    # 檢查是否有差異化顯示
-    if message.startswith("HTML_DIFF_START") and message.endswith("HTML_DIFF_END"):
-        content = message[len("HTML_DIFF_START"):-len("HTML_DIFF_END")]
-        parts = content.split('|DIFF_SEP|', 1)
-        
-        if len(parts) >= 2:
-            prefix_message = parts[0]
-            diff_html_content = parts[1]
-        else:
-            prefix_message = content
-            diff_html_content = ""
-        
-        display_message = prefix_message.replace("❌ ", "").replace("⭐️ ", "").replace("🔄 ", "")
-        
-        st.markdown(f"""
-        <div class="error-message">
-            {display_message}
-            {diff_html_content}
-        </div>
-        """, unsafe_allow_html=True)
-    
-    else:
-        is_correct_msg = "答對了" in message or "複習完畢" in message or "全部答對" in message
-        is_wrong_msg = "答錯" in message or "跳過" in message or "🔄" in message
-        
-        if is_correct_msg: 
-            display_message = message.replace("✅ ", "").replace("🎉 ", "").replace("💯 ", "")
-            st.markdown(f'<div class="success-message">✅ {display_message}</div>', unsafe_allow_html=True)
-            
-        elif is_wrong_msg:
-            display_message = message.replace("❌ ", "").replace("⭐️ ", "").replace("🔄 ", "")
-            st.markdown(f'<div class="error-message">❌ {display_message}</div>', unsafe_allow_html=True)
-        else:
-            st.markdown(f'<div class="info-message">{message}</div>', unsafe_allow_html=True)
-    
-    st.session_state.last_message = ""
+    centralized_gtts_playback()
 
-# 顯示模式和進度
-if st.session_state.study_mode == 'REVIEW':
-    st.markdown(f'<div class="warning-message">🔥 錯題複習模式 (剩餘 {len(st.session_state.wrong_queue)} 題)</div>', unsafe_allow_html=True)
 
-# 貓頭鷹圖片和播放按鈕
-col_img, col_btn = st.columns([1, 8])
+def submit_answer(current_index: int, input_key: str):
+    """送出答案 (表單按鈕的 on_click)：判斷對錯、更新進度，然後只重跑出題區與側邊欄。"""
+    current_word = word_bank[current_index]["word"]
+    user_input = st.session_state.get(input_key, "")
+    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_text = user_input.strip()
+    is_correct = (user_text == current_word) 
 
-with col_img:
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(current_dir, "Dolingo.jpg")
-        st.markdown("""
-        <div style="display: flex; align-items: center; height: 100%;">
-            <div class="owl-image">
-        """, unsafe_allow_html=True)
-        st.image(image_path, width=60)
-        st.markdown("""
+    # 結果訊息與差異化顯示 (答對時也顯示)；比對 HTML 等顯示時才由 diff_render 產生
+    diff = (current_word, user_text, "box")
+    if is_correct:
+        st.session_state.feedback = Feedback(CORRECT, "答對了!太棒了!", diff=diff, sound=CORRECT_SOUND)
+    else:
+        st.session_state.feedback = Feedback(WRONG, "答錯了!" if user_text else "跳過!", f"正確答案是:{current_word}",
+                                             icon="" if user_text else "⭐️", diff=diff, sound=WRONG_SOUND)
+
+    stats.update(quiz.submit(is_correct))
+    go_next_question()
+
+    st.session_state.history.append({
+        "模式": "複習" if quiz.mode == REVIEW else "一般",
+        "題號": current_index + 1,
+        "詞彙": current_word,
+        "輸入": user_input,
+        "結果": "正確" if is_correct else "錯誤",
+        "時間": now_str
+    })
+    progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
+
+    rerun_after_submit()
+
+
+@st.fragment(key=QUIZ_FRAGMENT)
+def quiz_area():
+    """出題區 (提示音、訊息、模式、貓頭鷹與播放按鈕、答題表單)：送出答案時和側邊欄一起重跑 (submit_answer)"""
+    current_index = quiz.current
+
+    # 背景預取接下來幾題的發音，學生按播放時通常已在快取中
+    if "prefetch_owner" not in st.session_state:
+        st.session_state.prefetch_owner = uuid.uuid4().hex
+    if quiz.mode == SCHEDULED:
+        upcoming = quiz.scheduler.upcoming()
+    else:
+        upcoming = predict_next_indices(quiz.mode, quiz.cursor, quiz.wrong_queue, total_questions)
+    get_prefetcher().schedule(st.session_state.prefetch_owner,
+                              [(word_bank[i]["word"], 'zh-tw') for i in upcoming])
+
+    # 播放音效
+    if st.session_state.feedback:
+        feedback = st.session_state.feedback
+        if feedback.sound:
+            play_local_audio(feedback.sound)
+        # 顯示最新的結果訊息 (送出答案時就建好的 Feedback，不必再判斷字串)
+        show_feedback(feedback, "card")
+        st.session_state.feedback = None
+
+    # 顯示模式和進度
+    if quiz.mode == REVIEW:
+        st.markdown(f'<div class="warning-message">🔥 錯題複習模式 (剩餘 {len(quiz.wrong_queue)} 題)</div>', unsafe_allow_html=True)
+    elif quiz.mode == SCHEDULED:
+        st.markdown(f'<div class="info-message">🧠 間隔複習模式 (已熟練 {quiz.scheduler.mastered()} / {total_questions})</div>', unsafe_allow_html=True)
+
+    # 貓頭鷹圖片和播放按鈕
+    col_img, col_btn = st.columns([1, 8])
+
+    with col_img:
+        try:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            image_path = os.path.join(current_dir, "Dolingo.jpg")
+            st.markdown("""
+            <div style="display: flex; align-items: center; height: 100%;">
+                <div class="owl-image">
+            """, unsafe_allow_html=True)
+            st.image(image_path, width=60)
+            st.markdown("""
+                </div>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
-    except:
-        st.markdown("🦉", unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
+        except:
+            st.markdown("🦉", unsafe_allow_html=True)
 
-with col_btn:
-    st.markdown('<div style="padding-top: 0px;">', unsafe_allow_html=True)
-    if st.button("🔊 播放詞彙發音", key=f"play_btn_{current_index}"): 
-        set_gtts_to_play(current_word, 'zh-tw')
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# 答題表單
-input_key = f"input_{current_index}_{st.session_state.study_mode}" 
+    with col_btn:
+        audio_controls()
 
-with st.form(key=f"form_{current_index}", clear_on_submit=True):
-    user_input = st.text_input("✏️ 請輸入你聽到的中文詞彙", key=input_key, autocomplete="off", placeholder="在此輸入...")
-    submitted = st.form_submit_button("提交")
-    
-    if submitted:
-        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        user_text = user_input.strip()
-        is_correct = (user_text == current_word) 
+    # 答題表單
+    input_key = f"input_{current_index}_{quiz.mode}" 
 
-        if is_correct:
-            st.session_state.stats[current_index]["正確"] += 1
-            
-            # 生成差異化顯示(答對時也顯示)
-            diff_html = get_diff_html(current_word, user_text)
-            st.session_state.last_message = f"HTML_DIFF_START✅ 答對了!太棒了!|DIFF_SEP|{diff_html}HTML_DIFF_END"
-            
-            if current_index in st.session_state.wrong_queue:
-                st.session_state.wrong_queue.remove(current_index) 
-            
-            st.session_state.local_sound_to_play = "audio/duolingo_style_correct.mp3" 
-            go_next_question()
+    with st.form(key=f"form_{current_index}", clear_on_submit=True):
+        st.text_input("✏️ 請輸入你聽到的中文詞彙", key=input_key, autocomplete="off", placeholder="在此輸入...")
+        st.form_submit_button("提交", on_click=submit_answer, args=(current_index, input_key))
 
-        else:
-            st.session_state.stats[current_index]["錯誤"] += 1
-            
-            # 生成差異化顯示
-            diff_html = get_diff_html(current_word, user_text)
-            msg_prefix = f"❌ 答錯了!正確答案是:{current_word}" if user_text else f"⭐️ 跳過!正確答案是:{current_word}"
-            st.session_state.last_message = f"HTML_DIFF_START{msg_prefix}|DIFF_SEP|{diff_html}HTML_DIFF_END"
-            
-            if current_index not in st.session_state.wrong_queue:
-                st.session_state.wrong_queue.append(current_index) 
-            
-            if st.session_state.study_mode == 'REVIEW' and current_index in st.session_state.wrong_queue:
-                if st.session_state.wrong_queue[0] == current_index:
-                    item = st.session_state.wrong_queue.pop(0)
-                    st.session_state.wrong_queue.append(item)
-            
-            st.session_state.local_sound_to_play = "audio/dong_dong.mp3" 
-            go_next_question()
-
-        st.session_state.history.append({
-            "模式": "複習" if st.session_state.study_mode == 'REVIEW' else "一般",
-            "題號": current_index + 1,
-            "詞彙": current_word,
-            "輸入": user_input,
-            "結果": "正確" if is_correct else "錯誤",
-            "時間": now_str
-        })
+    focus_input(input_key)
 
-        st.rerun()
 
 # --- 側邊欄統計 ---
-with st.sidebar:
+@st.fragment(key=SIDEBAR_FRAGMENT)
+def sidebar_panel():
+    """側邊欄 (在 with st.sidebar: 裡呼叫)；切換模式時才重跑整頁"""
     st.markdown("## 📊 學習統計")
+    scheduled = st.toggle("🧠 間隔複習模式 (SM-2)", value=quiz.mode == SCHEDULED,
+                          help="依每個詞的熟練度安排出題：答錯的很快再出現，越熟的間隔越長")
+    if scheduled != (quiz.mode == SCHEDULED):
+        quiz.use_scheduler(scheduled)
+        progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
+        st.rerun()
     
     st.markdown(f"""
     <div class="stat-card">
-        <strong>學習模式:</strong> {st.session_state.study_mode}<br>
-        <strong>待複習題數:</strong> {len(st.session_state.wrong_queue)}
+        <strong>學習模式:</strong> {quiz.mode}<br>
+        <strong>待複習題數:</strong> {len(quiz.wrong_queue)}
     </div>
     """, unsafe_allow_html=True)
 
     st.markdown("### 📈 詞彙統計")
-    stats_list = []
-    for i, item in enumerate(word_bank):
-        s = st.session_state.stats[i]
-        total_try = s["正確"] + s["錯誤"]
-        rate = f"{s['正確']}/{total_try}" if total_try > 0 else "0/0"
-        
-        status_light = "⚪"
-        if i in st.session_state.wrong_queue:
-            status_light = "🔴" 
-        elif s["正確"] > 0:
-            status_light = "🟢" 
-        elif s["錯誤"] > 0:
-            status_light = "🟡" 
-            
-        stats_list.append({
-            "狀態": status_light,
-            "題號": i + 1,
-            "詞彙": item["word"],
-            "正確率": rate
-        })
-    st.dataframe(pd.DataFrame(stats_list), use_container_width=True, hide_index=True)
+    st.caption(stats.summary())
+    # 作答時只更新那一列 (stats.update)，沒有新作答時直接用快取的表格
+    st.dataframe(stats.frame(), width="stretch", hide_index=True)
 
     st.markdown("### 📝 歷史紀錄")
-    if st.session_state.history:
-        st.dataframe(pd.DataFrame(st.session_state.history[::-1]), use_container_width=True, hide_index=True)
\ No newline at end of file
+    history = st.session_state.history
+    if history:
+        page = 0
+        if history.pages() > 1:
+            page = st.number_input("頁數 (最新的在第 1 頁)", min_value=1, max_value=history.pages(), value=1) - 1
+        # 只組出這一頁的 DataFrame，沒有新作答時直接用快取
+        st.dataframe(history.frame(page), width="stretch", hide_index=True)
+
+
+quiz_area()
+with st.sidebar:
+    sidebar_panel()
\ No newline at end of file
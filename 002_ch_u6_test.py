@@ -2,31 +2,30 @@ import streamlit as st
 import os
 import datetime
 import pandas as pd
+from static_audio import play_file # 共用的音檔播放 (以靜態網址提供，瀏覽器可快取)
+from quiz_engine import QuizEngine, REVIEW, REVIEW_START, REVIEW_DONE, ROUND_DONE # 共用的出題狀態機
+from corpus import load_unit # 共用的題庫 (corpus/*.json，每個行程只解析一次)
+from focus import focus_input # 換題時把游標放進作答框一次 (不輪詢)
+from theme import apply_theme # 共用樣式表 (theme.css，每個 session 只放進頁面一次)
 
-# 題庫
-words = [
-    "小鎮", "柿餅", "節日", "新埔", "因此",
-    "走進", "彩排", "遠方", "金黃色", "可愛",
-    "月亮", "風乾", "香甜", "遊客", "買書",
-    "親朋好友", "如意", "進去", "最近", "學校"
-]
+# 題庫 (corpus/ch_u6.json)
+words = load_unit("ch_u6").words
 
 # 音檔所在資料夾（請在專案下建立 audio 資料夾，放入對應 mp3）
 AUDIO_DIR = "audio"
 
-# 初始化 session state
-if "index" not in st.session_state:
-    st.session_state.index = 0
-if "mode" not in st.session_state:  # normal / review
-    st.session_state.mode = "normal"
-if "retry_queue" not in st.session_state:
-    st.session_state.retry_queue = []
-if "answered" not in st.session_state:
-    st.session_state.answered = {}
+# 換輪時顯示的訊息 (quiz.next() 的回傳值)
+ROUND_MESSAGES = {
+    REVIEW_START: "🔁 進入錯題複習！",
+    REVIEW_DONE: "🎉 錯題複習完成！開始新一輪！",
+    ROUND_DONE: "🎉 全部正確！開始新一輪！",
+}
+
+# 初始化 session state (出題規則在 quiz_engine.py：一輪結束後複習答錯的詞，複習答錯的移到佇列尾端)
+if "quiz" not in st.session_state:
+    st.session_state.quiz = QuizEngine(len(words))
 if "history" not in st.session_state:
     st.session_state.history = []
-if "stats" not in st.session_state:
-    st.session_state.stats = {w: {"正確": 0, "錯誤": 0} for w in words}
 if "last_result" not in st.session_state:
     st.session_state.last_result = None
 if "played" not in st.session_state:
@@ -34,6 +33,9 @@ if "played" not in st.session_state:
 if "last_word" not in st.session_state:
     st.session_state.last_word = None
 
+quiz = st.session_state.quiz
+
+apply_theme()
 st.markdown('<p style="font-size:26px">🎧 聽音辨字練習（預載 mp3 版本）</p>', unsafe_allow_html=True)
 
 
@@ -52,55 +54,20 @@ def play_preloaded_audio(word: str) -> bool:
     # 檔名：audio/<單字>.mp3
     filename = os.path.join(AUDIO_DIR, f"{word}.mp3")
 
-    if not os.path.exists(filename):
-        st.warning(f"⚠️ 找不到音檔：{filename}，請確認檔案是否存在。")
-        return False
-
     try:
-        with open(filename, "rb") as f:
-            audio_bytes = f.read()
-        st.audio(audio_bytes, format="audio/mp3")
+        play_file(filename, autoplay=False)
         return True
+    except FileNotFoundError:
+        st.warning(f"⚠️ 找不到音檔：{filename}，請確認檔案是否存在。")
+        return False
     except Exception as e:
         st.error(f"讀取音檔時發生錯誤：{e}")
         return False
 
 
-# 📌 取得下一個題目
-def get_next_word():
-    # 優先處理錯題 queue
-    if st.session_state.mode == "review":
-        if st.session_state.retry_queue:
-            return st.session_state.retry_queue[0]
-        else:
-            # 錯題複習結束 → 回到新一輪
-            st.session_state.mode = "normal"
-            st.session_state.index = 0
-            st.session_state.last_result = "🎉 錯題複習完成！開始新一輪！"
-            return words[st.session_state.index]
-
-    # normal 模式 → 按順序走題庫
-    if st.session_state.index < len(words):
-        return words[st.session_state.index]
-    else:
-        # 一輪結束 → 準備錯題複習
-        wrongs = [w for w, ans in st.session_state.answered.items() if ans is False]
-        if wrongs:
-            st.session_state.mode = "review"
-            st.session_state.retry_queue = wrongs.copy()
-            st.session_state.last_result = "🔁 進入錯題複習！"
-            return st.session_state.retry_queue[0]
-        else:
-            # 全部答對 → 新一輪
-            st.session_state.index = 0
-            st.session_state.answered = {}
-            st.session_state.last_result = "🎉 全部正確！開始新一輪！"
-            return words[st.session_state.index]
-
-
 # 取得目前題目
-current_word = get_next_word()
-input_key = f"input_{current_word}_{st.session_state.index}_{st.session_state.mode}"
+current_word = words[quiz.current]
+input_key = f"input_{current_word}_{quiz.cursor}_{'review' if quiz.mode == REVIEW else 'normal'}"
 
 # 🔊 自動播放音訊（只有在新題目，或尚未播放成功時才播）
 if (not st.session_state.played) or (st.session_state.last_word != current_word):
@@ -118,27 +85,10 @@ def submit_answer():
     user_input = st.session_state[input_key]
     now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    if user_input == current_word:
-        st.session_state.stats[current_word]["正確"] += 1
-        result = "正確"
-        st.session_state.last_result = "✅ 答對了！"
-
-        # 複習模式 → 答對後移出 queue
-        if st.session_state.mode == "review":
-            if current_word in st.session_state.retry_queue:
-                st.session_state.retry_queue.remove(current_word)
-        else:
-            st.session_state.answered[current_word] = True
-    else:
-        st.session_state.stats[current_word]["錯誤"] += 1
-        result = "錯誤"
-        st.session_state.last_result = "❌ 答錯！"
-
-        if st.session_state.mode == "review":
-            # 答錯 → 保留在 queue
-            pass
-        else:
-            st.session_state.answered[current_word] = False
+    is_correct = user_input == current_word
+    quiz.submit(is_correct)
+    result = "正確" if is_correct else "錯誤"
+    st.session_state.last_result = "✅ 答對了！" if is_correct else "❌ 答錯！"
 
     # 紀錄歷史
     st.session_state.history.append({
@@ -148,9 +98,10 @@ def submit_answer():
         "時間": now_str
     })
 
-    # normal 模式 → 下一題
-    if st.session_state.mode == "normal":
-        st.session_state.index += 1
+    # 下一題 (換輪時改顯示換輪訊息)
+    event = quiz.next()
+    if event:
+        st.session_state.last_result = ROUND_MESSAGES[event]
 
     # reset 播放
     st.session_state.played = False
@@ -163,10 +114,11 @@ with st.form(key=f"form_{current_word}", clear_on_submit=False):
                   key=input_key,
                   autocomplete="off")
     st.form_submit_button("提交答案", on_click=submit_answer)
+focus_input(input_key)
 
 # 側邊欄進度
 st.sidebar.header("📊 學習進度")
-done = sum(1 for v in st.session_state.answered.values() if v is True)
+done = sum(1 for v in quiz.last if v is True)
 total = len(words)
 st.sidebar.write(f"✅ 已正確答對：{done} / {total}")
 
@@ -174,14 +126,14 @@ st.sidebar.write(f"✅ 已正確答對：{done} / {total}")
 st.sidebar.header("📝 答題歷史")
 if st.session_state.history:
     df = pd.DataFrame(st.session_state.history)
-    st.sidebar.dataframe(df, use_container_width=True)
+    st.sidebar.dataframe(df, width="stretch")
 
 # 單字正確率統計
 st.sidebar.header("📊 單字正確率統計")
 stats_list = []
-for w, s in st.session_state.stats.items():
-    total_attempts = s["正確"] + s["錯誤"]
-    rate = f"{s['正確']}/{total_attempts}" if total_attempts > 0 else "0/0"
+for i, w in enumerate(words):
+    total_attempts = quiz.correct[i] + quiz.wrong[i]
+    rate = f"{quiz.correct[i]}/{total_attempts}" if total_attempts > 0 else "0/0"
     stats_list.append({"單字": w, "正確/總次數": rate})
 df_stats = pd.DataFrame(stats_list)
-st.sidebar.dataframe(df_stats, use_container_width=True)
+st.sidebar.dataframe(df_stats, width="stretch")
@@ -1,29 +1,18 @@
 import streamlit as st
 import datetime
-import pandas as pd
-# 引入 os 用來檢查本地音檔路徑
-import os 
-# 引入 gTTS 來生成語音，以及 io 來處理音訊數據流
-from gtts import gTTS
-import io
-
-# 你的中文詞彙列表
-chinese_words = [
-    "小熊", "口渴", "烏鴉", "喝水", "方法",
-    "森林", "動物", "知道", "聰明", "旅行",
-    "中午", "裝扮", "小瓶子", "許多", "石頭",
-    "動作", "難道", "忘記", "哈哈", "但是"
-]
-
-# --- 重新建構 word_bank (只保留詞彙和翻譯) ---
-word_bank = []
-for word in chinese_words:
-    # 只保留 word 和 translation
-    word_item = {
-        "word": word,               # 測驗用的「詞彙」
-        "translation": word,        # 中文翻譯 (與詞彙相同)
-    }
-    word_bank.append(word_item)
+# 引入共用的音檔播放 (以靜態網址提供，內部使用 gTTS 快取)
+from static_audio import play_file, play_tts
+from corpus import load_unit # 共用的題庫 (corpus/*.json，每個行程只解析一次)
+from quiz_engine import QuizEngine, REVIEW, SCHEDULED # 共用的出題狀態機
+from progress_store import bank_digest, get_progress_store, learner_id # 學生進度 (重新整理後可以接著做)
+from stats_table import session_stats # 側邊欄統計 (作答後只更新那一列)
+from fragments import QUIZ_FRAGMENT, SIDEBAR_FRAGMENT, rerun_after_submit # 出題區 / 發音 / 側邊欄各自重跑
+from focus import focus_input # 換題時把游標放進作答框一次 (不輪詢)
+from theme import apply_theme # 共用樣式表 (theme.css，每個 session 只放進頁面一次)
+from feedback import Feedback, CORRECT, WRONG, CORRECT_SOUND, WRONG_SOUND, round_feedback, show_feedback # 作答結果訊息 (送出時建立一次，顯示時不再拆字串)
+
+# 詞彙列表 (corpus/ch_u8.json；translation 與詞彙相同)
+word_bank = load_unit("ch_u8").entries
 
 
 # --- 播放函式 (處理本地檔案 - 專門用於音效) ---
@@ -34,13 +23,10 @@ def play_local_audio(filename: str):
     放在你的 Streamlit 專案的 'audio' 資料夾中。
     """
     try:
-        # 讀取檔案為 bytes 並讓 Streamlit 播放
-        audio_bytes = open(filename, 'rb').read()
-        
         # 使用 st.empty() 容器來避免佔用頁面佈局，並設定 autoplay=True
         placeholder = st.empty()
         with placeholder:
-            st.audio(audio_bytes, format='audio/mp3', autoplay=True)
+            play_file(filename)
             
     except FileNotFoundError:
         # 這裡會提醒使用者如果找不到音效檔案
@@ -53,17 +39,17 @@ def play_local_audio(filename: str):
 
 def set_gtts_to_play(text: str, lang: str):
     """
-    將要播放的 gTTS 內容儲存到 Session State 中，並觸發重新執行。
+    將要播放的 gTTS 內容儲存到 Session State 中。
+    不再 rerun：按鈕下方的 centralized_gtts_playback() 在同一次 (按下按鈕觸發的) 執行中就會播放。
     """
     if text:
         st.session_state.gtts_to_play = (text, lang)
-        st.rerun() # 立即重新執行，在頁面頂部播放
     else:
         st.warning("⚠ 播放內容為空，無法生成語音。")
         
 def centralized_gtts_playback():
     """
-    在頁面頂部集中處理 gTTS 音訊播放。
+    在發音按鈕下方集中處理 gTTS 音訊播放 (於 audio_controls() 內呼叫)。
     """
     if st.session_state.gtts_to_play is not None:
         text, lang = st.session_state.gtts_to_play
@@ -72,13 +58,8 @@ def centralized_gtts_playback():
         placeholder = st.empty() 
         
         try:
-            tts = gTTS(text=text, lang=lang)
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            
             with placeholder:
-                st.audio(fp, format="audio/mp3", autoplay=True)
+                play_tts(text, lang)
             
         except Exception as e:
             st.error(f"生成語音時發生錯誤：{e}")
@@ -86,268 +67,170 @@ def centralized_gtts_playback():
 
 # --- 初始化 Session State ---
 total_questions = len(word_bank)
-current_word_hash = hash(tuple(item['word'] for item in word_bank)) 
-
-if "word_bank_hash" not in st.session_state or st.session_state.word_bank_hash != current_word_hash:
-    st.session_state.wrong_queue = []
-    st.session_state.study_mode = 'LEARNING' 
-    st.session_state.sequence_cursor = 0
-    st.session_state.current_display_index = 0
-    st.session_state.stats = [{"正確": 0, "錯誤": 0} for _ in range(total_questions)]
-    st.session_state.history = []
+current_word_hash = bank_digest(item['word'] for item in word_bank)
+PROGRESS_UNIT = "ch_u8"
+progress = get_progress_store()
+learner = learner_id(st.query_params, st.session_state)
+
+if "quiz" not in st.session_state or st.session_state.get("word_bank_hash") != current_word_hash:
+    saved = progress.load_quiz(learner, PROGRESS_UNIT, current_word_hash)
+    st.session_state.quiz, st.session_state.history = saved or (QuizEngine(total_questions), progress.new_history(learner, PROGRESS_UNIT))
     st.session_state.word_bank_hash = current_word_hash
-    st.session_state.last_message = ""      
+    st.session_state.feedback = None
     st.session_state.gtts_to_play = None    
-    st.session_state.local_sound_to_play = "" 
-    st.toast("新題庫已載入！")
+    st.toast("已載入上次的進度！" if saved else "新題庫已載入！")
 else:
-    if "last_message" not in st.session_state:
-        st.session_state.last_message = ""
+    if "feedback" not in st.session_state:
+        st.session_state.feedback = None
     if "gtts_to_play" not in st.session_state:
         st.session_state.gtts_to_play = None
-    if "local_sound_to_play" not in st.session_state:
-        st.session_state.local_sound_to_play = ""
 
 
-# --- 邏輯控制函式 (保持不變) ---
+quiz = st.session_state.quiz
+stats = session_stats(st.session_state, quiz, (item["word"] for item in word_bank))
+
+# --- 邏輯控制函式 (出題規則在 quiz_engine.py) ---
+
 
 def go_next_question():
     """
     更新狀態以指向下一題。
     """
-    
-    # 邏輯 A: 複習模式 (Review Mode)
-    if st.session_state.study_mode == 'REVIEW':
-        if len(st.session_state.wrong_queue) > 0:
-            next_idx = st.session_state.wrong_queue[0]
-            st.session_state.current_display_index = next_idx
-        else:
-            # 錯題都複習完了 -> 回到新一輪
-            st.session_state.study_mode = 'LEARNING'
-            st.session_state.sequence_cursor = 0
-            st.session_state.last_message = "🎉 錯題複習完畢！開始新的一輪！"
-            st.session_state.current_display_index = 0
-    
-    # 邏輯 B: 順序學習模式 (Learning Mode)
-    elif st.session_state.study_mode == 'LEARNING':
-        
-        st.session_state.sequence_cursor += 1
-        
-        if st.session_state.sequence_cursor < total_questions:
-            st.session_state.current_display_index = st.session_state.sequence_cursor
-        
-        else:
-            # --- 處理一輪結束 ---
-            
-            if len(st.session_state.wrong_queue) > 0:
-                st.session_state.study_mode = 'REVIEW'
-                st.session_state.last_message = "🔄 一輪結束，進入錯題複習模式！"
-                go_next_question()
-            else:
-                st.session_state.sequence_cursor = 0
-                st.session_state.current_display_index = 0
-                st.session_state.last_message = "💯 太強了！全部答對，直接開始新的一輪！"
+    event = quiz.next()
+    if event:
+        st.session_state.feedback = round_feedback(event, st.session_state.feedback)
 
 
 # --- 介面顯示 ---
-
-# 確保一開始有題目
-current_index = st.session_state.current_display_index
-current_item = word_bank[current_index]
-
-# 取出資料
-current_word = current_item["word"]
-translation = current_item["translation"]
-# 已刪除例句與定義
-
+# 整頁只在第一次載入、切換模式或換題庫時執行；之後的互動只重跑對應的 fragment：
+#   送出答案 -> quiz_area() + sidebar_panel()，按發音按鈕 -> audio_controls()，側邊欄 -> sidebar_panel()
 
 # --- 標題與狀態顯示 ---
+apply_theme("orange")
 st.markdown("<p style='font-size:22px'><b>🎧 中文詞彙發音練習</b></p>", unsafe_allow_html=True) 
 
-# *** 頁面頂部：集中播放音效 (本地檔案 - 專門用於正確/錯誤提示音) ***
-if st.session_state.local_sound_to_play:
-    play_local_audio(st.session_state.local_sound_to_play)
-    st.session_state.local_sound_to_play = ""
-
-# *** 頁面頂部：集中播放音效 (gTTS) ***
-centralized_gtts_playback()
-
-
-# 顯示最新的結果訊息
-if st.session_state.last_message:
-    message = st.session_state.last_message
-    
-    font_size = "24px" 
-    
-    if "答對了" in message or "複習完畢" in message or "全部答對" in message: 
-        display_message = message.replace("✅ ", "").replace("🎉 ", "").replace("💯 ", "")
-
-        html_content = f"""
-        <div style="background-color: #e6ffed; border-radius: 0.25rem; padding: 1rem; border-left: 0.5rem solid #090; color: #000;">
-            <span style="font-size: {font_size};">✅ {display_message}</span> 
-        </div>
-        """
-        st.markdown(html_content, unsafe_allow_html=True)
-        
-    elif "答錯" in message or "跳過" in message or "🔄" in message:
-        
-        display_message = message.replace("❌ ", "").replace("⏭️ ", "").replace("🔄 ", "")
-        
-        html_content = f"""
-        <div style="background-color: #ffeaea; border-radius: 0.25rem; padding: 1rem; border-left: 0.5rem solid #f00; color: #000;">
-            <span style="font-size: {font_size};">❌ {display_message}</span>
-        </div>
-        """
-        st.markdown(html_content, unsafe_allow_html=True)
 
-    else:
-        st.info(message)
-    
-    st.session_state.last_message = ""
-        
-# --- 狀態模式顯示 ---
-if st.session_state.study_mode == 'REVIEW':
-    st.warning(f"🔥 錯題複習模式 (剩餘 {len(st.session_state.wrong_queue)} 題)")
-else:
-    display_progress = st.session_state.sequence_cursor 
-    if display_progress == total_questions: display_progress = 0
-    st.info(f"📖 順序學習模式 (進度 {display_progress + 1} / {total_questions})")
-
-
-# --- 發音按鈕 (放大並改名為「圈詞測試」, 並改為橘色) ---
-
-# 選擇只用一個欄位
-col1, = st.columns(1) 
-
-with col1:
-    # 步驟 1: 注入 CSS 來自訂按鈕大小和樣式
-    st.markdown("""
-        <style>
-        div.stButton > button {
-            /* 調整按鈕的最小寬度 */
-            min-width: 100%;
-            /* 調整文字大小 */
-            font-size: 24px; 
-            /* 調整內距（上下左右），讓按鈕更厚實 */
-            padding: 15px 10px; 
-            /* 調整按鈕的圓角 */
-            border-radius: 10px;
-            
-            /* --- 顏色修改 (橘色) --- */
-            background-color: #FF9900; 
-            color: #FFFFFF; 
-            border: 1px solid #FF9900; 
-        }
-        
-        /* 增加滑鼠懸停 (hover) 效果 */
-        div.stButton > button:hover {
-            background-color: #FFAA33; 
-            border: 1px solid #FFAA33;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
-    # 步驟 2: 按鈕邏輯
+@st.fragment
+def audio_controls():
+    """
+    發音按鈕與 gTTS 播放：按下按鈕只重跑這一段。
+    播放的是按下當下的題目，所以出題區換題時不必重畫這裡也不會播錯。
+    """
     if st.button("▶ 圈詞測試下一題"): 
         # 播放詞彙 (中文 'zh-tw')
-        set_gtts_to_play(current_word, 'zh-tw') 
+        set_gtts_to_play(word_bank[quiz.current]["word"], 'zh-tw') 
 
+    centralized_gtts_playback()
 
-# 顯示文字 (只保留詞彙和翻譯)
-#st.write(f"**測驗詞彙：** **{current_word}**") 
-#st.write(f"**中文翻譯：** *{translation}*")
 
+def submit_answer(current_index: int, input_key: str):
+    """送出答案 (表單按鈕的 on_click)：判斷對錯、更新進度，然後只重跑出題區與側邊欄。"""
+    current_word = word_bank[current_index]["word"]
+    user_input = st.session_state.get(input_key, "")
+    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_text = user_input.strip()
+    # 中文比對不需要 lower()
+    is_correct = (user_text == current_word) 
 
-# --- 單字答題表單 ---
-input_key = f"input_{current_index}_{st.session_state.study_mode}" 
+    # --- 答案處理與狀態更新 ---
 
-with st.form(key=f"form_{current_index}", clear_on_submit=True):
-    # 確保這裡的提示是中文
-    user_input = st.text_input("請輸入你聽到的中文詞彙 (輸入完按 Enter 即可)", key=input_key, autocomplete="off")
-    submitted = st.form_submit_button("提交答案 (或按 Enter)")
-    
-    if submitted:
-        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        user_text = user_input.strip()
-        # 中文比對不需要 lower()
-        is_correct = (user_text == current_word) 
+    if is_correct:
+        # 結果訊息與提示音 (下一次畫出題區時播放、顯示)
+        st.session_state.feedback = Feedback(CORRECT, "答對了！", sound=CORRECT_SOUND)
 
-        # --- 答案處理與狀態更新 ---
-        
-        if is_correct:
-            st.session_state.stats[current_index]["正確"] += 1
-            st.session_state.last_message = "✅ 答對了！" 
-            if current_index in st.session_state.wrong_queue:
-                st.session_state.wrong_queue.remove(current_index) 
-            
-            # *** 設定正確音效路徑 ***
-            st.session_state.local_sound_to_play = "audio/duolingo_style_correct.mp3" 
-            
-            go_next_question()
+        stats.update(quiz.submit(True))
+        go_next_question()
 
-        else:
-            st.session_state.stats[current_index]["錯誤"] += 1
-            msg = f"❌ 答錯！正確答案是：{current_word}" if user_text else f"⏭️ 跳過！正確答案是：{current_word}"
-            st.session_state.last_message = msg 
-            
-            if current_index not in st.session_state.wrong_queue:
-                st.session_state.wrong_queue.append(current_index) 
-            
-            if st.session_state.study_mode == 'REVIEW' and current_index in st.session_state.wrong_queue:
-                if st.session_state.wrong_queue[0] == current_index:
-                    item = st.session_state.wrong_queue.pop(0)
-                    st.session_state.wrong_queue.append(item)
-            
-            # *** 設定錯誤音效路徑 ***
-            st.session_state.local_sound_to_play = "audio/dong_dong.mp3" 
-
-            go_next_question()
-
-
-        # 紀錄歷史
-        st.session_state.history.append({
-            "模式": "複習" if st.session_state.study_mode == 'REVIEW' else "一般",
-            "題號": current_index + 1,
-            "詞彙": current_word,
-            "輸入": user_input,
-            "結果": "正確" if is_correct else "錯誤",
-            "時間": now_str
-        })
-
-        st.rerun() 
-
-# --- 側邊欄統計 (保持不變) ---
-st.sidebar.header("📊 練習進度統計")
-st.sidebar.write(f"目前模式：**{st.session_state.study_mode}**")
-st.sidebar.write(f"待複習錯題數：{len(st.session_state.wrong_queue)}")
-
-st.sidebar.subheader("📈 詞彙答題統計")
-stats_list = []
-for i, item in enumerate(word_bank):
-    s = st.session_state.stats[i]
-    total_try = s["正確"] + s["錯誤"]
-    rate = f"{s['正確']}/{total_try}" if total_try > 0 else "0/0"
-    
-    # --- 狀態燈邏輯 ---
-    status_light = "⚪" 
-    
-    if i in st.session_state.wrong_queue:
-        status_light = "🔴" 
-    
-    elif s["正確"] > 0:
-        status_light = "🟢" 
-    
-    elif s["錯誤"] > 0 and s["正確"] == 0:
-        status_light = "🟡" 
-        
-    stats_list.append({
-        "狀態": status_light,
-        "題號": i + 1,
-        "詞彙": item["word"],
-        "正確率": rate
+    else:
+        st.session_state.feedback = Feedback(WRONG, "答錯！" if user_text else "跳過！", f"正確答案是：{current_word}",
+                                             icon="" if user_text else "⏭️", sound=WRONG_SOUND)
+
+        stats.update(quiz.submit(False))
+        go_next_question()
+
+
+    # 紀錄歷史
+    st.session_state.history.append({
+        "模式": "複習" if quiz.mode == REVIEW else "一般",
+        "題號": current_index + 1,
+        "詞彙": current_word,
+        "輸入": user_input,
+        "結果": "正確" if is_correct else "錯誤",
+        "時間": now_str
     })
-st.sidebar.dataframe(pd.DataFrame(stats_list), use_container_width=True)
+    progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
+
+    rerun_after_submit()
 
-st.sidebar.subheader("📝 歷史紀錄")
-if st.session_state.history:
-    st.sidebar.dataframe(pd.DataFrame(st.session_state.history[::-1]), use_container_width=True)
\ No newline at end of file
+
+@st.fragment(key=QUIZ_FRAGMENT)
+def quiz_area():
+    """
+    出題區 (提示音、結果訊息、模式、發音按鈕、作答表單)：送出答案時和側邊欄一起重跑 (submit_answer)。
+    """
+    current_index = quiz.current
+
+    # *** 集中播放音效 (本地檔案 - 專門用於正確/錯誤提示音) ***
+    if st.session_state.feedback:
+        feedback = st.session_state.feedback
+        if feedback.sound:
+            play_local_audio(feedback.sound)
+        # 顯示最新的結果訊息 (送出答案時就建好的 Feedback，不必再判斷字串)
+        show_feedback(feedback, "banner")
+        st.session_state.feedback = None
+            
+    # --- 狀態模式顯示 ---
+    if quiz.mode == REVIEW:
+        st.warning(f"🔥 錯題複習模式 (剩餘 {len(quiz.wrong_queue)} 題)")
+    elif quiz.mode == SCHEDULED:
+        st.info(f"🧠 間隔複習模式 (已熟練 {quiz.scheduler.mastered()} / {total_questions})")
+    else:
+        display_progress = quiz.cursor
+        st.info(f"📖 順序學習模式 (進度 {display_progress + 1} / {total_questions})")
+
+    # --- 發音按鈕 (獨立的 fragment) ---
+    audio_controls()
+
+    # --- 單字答題表單 ---
+    input_key = f"input_{current_index}_{quiz.mode}" 
+
+    with st.form(key=f"form_{current_index}", clear_on_submit=True):
+        # 確保這裡的提示是中文
+        st.text_input("請輸入你聽到的中文詞彙 (輸入完按 Enter 即可)", key=input_key, autocomplete="off")
+        st.form_submit_button("提交答案 (或按 Enter)", on_click=submit_answer, args=(current_index, input_key))
+
+    focus_input(input_key)
+
+
+# --- 側邊欄統計 ---
+@st.fragment(key=SIDEBAR_FRAGMENT)
+def sidebar_panel():
+    """側邊欄 (在 with st.sidebar: 裡呼叫)；切換模式時才重跑整頁。"""
+    st.header("📊 練習進度統計")
+    scheduled = st.toggle("🧠 間隔複習模式 (SM-2)", value=quiz.mode == SCHEDULED,
+                          help="依每個詞的熟練度安排出題：答錯的很快再出現，越熟的間隔越長")
+    if scheduled != (quiz.mode == SCHEDULED):
+        quiz.use_scheduler(scheduled)
+        progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
+        st.rerun()
+    st.write(f"目前模式：**{quiz.mode}**")
+    st.write(f"待複習錯題數：{len(quiz.wrong_queue)}")
+
+    st.subheader("📈 詞彙答題統計")
+    st.caption(stats.summary())
+    # 作答時只更新那一列 (stats.update)，沒有新作答時直接用快取的表格
+    st.dataframe(stats.frame(), width="stretch")
+
+    st.subheader("📝 歷史紀錄")
+    history = st.session_state.history
+    if history:
+        page = 0
+        if history.pages() > 1:
+            page = st.number_input("頁數 (最新的在第 1 頁)", min_value=1, max_value=history.pages(), value=1) - 1
+        # 只組出這一頁的 DataFrame，沒有新作答時直接用快取
+        st.dataframe(history.frame(page), width="stretch")
+
+
+quiz_area()
+with st.sidebar:
+    sidebar_panel()
\ No newline at end of file
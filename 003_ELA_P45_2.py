@@ -1,142 +1,64 @@
 import streamlit as st
 import datetime
-import pandas as pd
 import os # 用來讀取本地 mp3 檔案
 import random # 【新增】用於隨機化測驗類型和多選選項
+from static_audio import play_file # 共用的音檔播放 (以靜態網址提供，瀏覽器可快取)
+from corpus import load_unit # 共用的題庫 (corpus/*.json，每個行程只解析一次)
+from quiz_engine import QuizEngine, REVIEW, SCHEDULED # 共用的出題狀態機
+from progress_store import bank_digest, get_progress_store, learner_id # 學生進度 (重新整理後可以接著做)
+from stats_table import session_stats # 側邊欄統計 (作答後只更新那一列)
+from theme import apply_theme # 共用樣式表 (theme.css，每個 session 只放進頁面一次)
+from feedback import Feedback, CORRECT, WRONG, round_feedback, show_feedback # 作答結果訊息 (送出時建立一次，顯示時不再拆字串)
 
 
-word_bank = [
-    {"word": "agency", "translation": "代辦處；經銷處；政府機構",
-     "sentence": "Many people worked at the agency.",
-     "sentence_zh": "許多人在這家代辦處工作。",
-     "definition": "If you work at an agency, your job is to help others to get something done.",
-     "definition_zh": "如果你在一家代辦處工作，你的工作就是幫助別人完成一些事情。"},
-    
-    {"word": "business", "translation": "生意；業務；商店",
-     "sentence": "My aunt opened a small business that sells coffee.",
-     "sentence_zh": "我阿姨開了一家賣咖啡的小店。",
-     "definition": "A place open for business is ready to work, buy, or sell something.",
-     "definition_zh": "一個開放做生意的地方，就是準備好工作、購買或販售某物的場所。"},
-     
-    {"word": "confidently", "translation": "自信地；有信心地",
-     "sentence": "Tia confidently stood up to give her report.",
-     "sentence_zh": "Tia 自信地站起來做報告。",
-     "definition": "When you do something confidently, you are sure you will do it well.",
-     "definition_zh": "當你自信地做某事時，你確信自己能做得很好。"},
-     
-    {"word": "eagerly", "translation": "熱切地；渴望地",
-     "sentence": "The family eagerly explored their new home.",
-     "sentence_zh": "這家人熱切地探索他們的新家。",
-     "definition": "When you do something eagerly, you really want to do it.",
-     "definition_zh": "當你熱切地做某事時，你真的很想做它。"},
-     
-    {"word": "seeps", "translation": "滲出；緩慢穿過",
-     "sentence": "The sand seeps through the hourglass.",
-     "sentence_zh": "沙子緩慢地從沙漏中滲出。",
-     "definition": "When something seeps, it passes slowly through a small opening.",
-     "definition_zh": "當某物滲出時，它會緩慢地穿過一個小開口。"},
-     
-    {"word": "mystery", "translation": "謎；難以理解的事物",
-     "sentence": "The contents of the box are a mystery.",
-     "sentence_zh": "箱子裡的內容物是個謎。",
-     "definition": "A mystery is something that is hard to understand or is not known about.",
-     "definition_zh": "謎是難以理解或不為人知的事物。"},
-     
-    {"word": "ace", "translation": "高手；一流人才",
-     # 【修正】移除原單字中句子的 typo "an an"
-     "sentence": "He is an ace athlete.",
-     "sentence_zh": "他是一位一流的運動員。",
-     "definition": "Someone described as an ace is extremely good at something.",
-     "definition_zh": "被描述為高手的人，在某方面是非常優秀的。"},
-     
-    {"word": "located", "translation": "位於；坐落於",
-     "sentence": "The alligator pond was located near the center of the zoo.",
-     "sentence_zh": "鱷魚池位於動物園的中心附近。",
-     "definition": "Where something is located is where it is.",
-     "definition_zh": "某物被定位（located）的地方就是它所在的位置。"},
-]
-
-
-# 預先下載的 mp3 放在這個資料夾
-AUDIO_DIR = "audio"
+# 題庫 (corpus/ela_p45.json)
+unit = load_unit("ela_p45")
+word_bank = unit.entries
+
 
 def play_audio(filepath: str):
     """播放本地 mp3，如果檔案不存在就提示警告。"""
-    if not os.path.exists(filepath):
+    try:
+        play_file(filepath, autoplay=False)
+    except FileNotFoundError:
         st.warning(f"⚠ 找不到音檔：{os.path.basename(filepath)}")
         st.caption(f"請確保您的音檔檔名符合格式，例如：{os.path.basename(filepath)}")
-        return
-    try:
-        with open(filepath, "rb") as f:
-            audio_bytes = f.read()
-        st.audio(audio_bytes, format="audio/mp3")
     except Exception as e:
         st.error(f"讀取音檔時發生錯誤：{e}")
 
 # --- 初始化 Session State ---
 total_questions = len(word_bank)
-current_word_hash = hash(tuple((item['word'], item.get('definition_zh')) for item in word_bank))
-
-if "word_bank_hash" not in st.session_state or st.session_state.word_bank_hash != current_word_hash:
-    st.session_state.wrong_queue = []
-    st.session_state.study_mode = 'LEARNING' 
-    st.session_state.sequence_cursor = 0
-    st.session_state.current_display_index = 0
-    st.session_state.stats = [{"正確": 0, "錯誤": 0} for _ in range(total_questions)]
-    st.session_state.history = []
+current_word_hash = bank_digest((item['word'], item.get('definition_zh')) for item in word_bank)
+PROGRESS_UNIT = "ela_p45_2"
+progress = get_progress_store()
+learner = learner_id(st.query_params, st.session_state)
+
+if "quiz" not in st.session_state or st.session_state.get("word_bank_hash") != current_word_hash:
+    saved = progress.load_quiz(learner, PROGRESS_UNIT, current_word_hash)
+    st.session_state.quiz, st.session_state.history = saved or (QuizEngine(total_questions), progress.new_history(learner, PROGRESS_UNIT))
     st.session_state.word_bank_hash = current_word_hash
-    st.session_state.last_message = ""
+    st.session_state.feedback = None
     st.session_state.quiz_type = 'TRANSLATION' # 【新增】記錄當前測驗類型
-    st.toast("新題庫已載入！")
+    st.toast("已載入上次的進度！" if saved else "新題庫已載入！")
 else:
-    if "last_message" not in st.session_state:
-        st.session_state.last_message = ""
+    if "feedback" not in st.session_state:
+        st.session_state.feedback = None
     if "quiz_type" not in st.session_state:
          st.session_state.quiz_type = 'TRANSLATION'
 
-# --- 邏輯控制函式 ---
+quiz = st.session_state.quiz
+stats = session_stats(st.session_state, quiz, (item["word"] for item in word_bank), label_column="單字")
+
+# --- 邏輯控制函式 (出題規則在 quiz_engine.py) ---
+
 
 def go_next_question():
     """
     更新狀態以指向下一題。
     """
-    
-    # 邏輯 A: 複習模式 (Review Mode)
-    if st.session_state.study_mode == 'REVIEW':
-        if len(st.session_state.wrong_queue) > 0:
-            next_idx = st.session_state.wrong_queue[0]
-            st.session_state.current_display_index = next_idx
-        else:
-            # 錯題都複習完了 -> 回到新一輪
-            st.session_state.study_mode = 'LEARNING'
-            st.session_state.sequence_cursor = 0
-            st.session_state.last_message = "🎉 錯題複習完畢！開始新的一輪！"
-            st.session_state.current_display_index = 0
-    
-    # 邏輯 B: 順序學習模式 (Learning Mode)
-    elif st.session_state.study_mode == 'LEARNING':
-        
-        # 1. 先將游標推進
-        st.session_state.sequence_cursor += 1
-        
-        # 2. 檢查推進後的游標是否還在範圍內
-        if st.session_state.sequence_cursor < total_questions:
-            # 3. 顯示新游標所指向的題目
-            st.session_state.current_display_index = st.session_state.sequence_cursor
-        
-        # 4. 游標已到達或超過範圍 (一輪結束)
-        else:
-            # --- 處理一輪結束 ---
-            
-            if len(st.session_state.wrong_queue) > 0:
-                st.session_state.study_mode = 'REVIEW'
-                st.session_state.last_message = "🔄 一輪結束，進入錯題複習模式！"
-                # 遞迴呼叫自己，讓它立刻抓取第一題錯題
-                go_next_question()
-            else:
-                st.session_state.sequence_cursor = 0
-                st.session_state.current_display_index = 0
-                st.session_state.last_message = "💯 太強了！全部答對，直接開始新的一輪！"
+    event = quiz.next()
+    if event:
+        st.session_state.feedback = round_feedback(event, st.session_state.feedback)
 
 # --- 測驗產生器 ---
 
@@ -181,35 +103,23 @@ def generate_mc_quiz(current_item, all_words, question_type):
 def check_answer_and_proceed(user_choice):
     """處理使用者點擊按鈕後的邏輯：檢查答案、更新統計、跳到下一題。"""
     
-    current_index = st.session_state.current_display_index
+    current_index = quiz.current
     current_word = word_bank[current_index]["word"]
     is_correct = (user_choice.lower() == current_word.lower())
     
     now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # 1. 更新統計與訊息
+    stats.update(quiz.submit(is_correct))
     if is_correct:
-        st.session_state.stats[current_index]["正確"] += 1
-        st.session_state.last_message = "✅ 答對了！" 
-        if current_index in st.session_state.wrong_queue:
-            st.session_state.wrong_queue.remove(current_index)
-        
+        st.session_state.feedback = Feedback(CORRECT, "答對了！")
     else:
-        st.session_state.stats[current_index]["錯誤"] += 1
-        st.session_state.last_message = f"❌ 答錯！正確答案是：{current_word}"
-        if current_index not in st.session_state.wrong_queue:
-            st.session_state.wrong_queue.append(current_index)
-        
-        # 複習模式下，答錯的題目要保持在隊列中
-        if st.session_state.study_mode == 'REVIEW' and current_index in st.session_state.wrong_queue:
-            if st.session_state.wrong_queue[0] == current_index:
-                item = st.session_state.wrong_queue.pop(0)
-                st.session_state.wrong_queue.append(item)
+        st.session_state.feedback = Feedback(WRONG, "答錯！", f"正確答案是：{current_word}")
 
 
     # 2. 紀錄歷史
     st.session_state.history.append({
-        "模式": "複習" if st.session_state.study_mode == 'REVIEW' else "一般",
+        "模式": "複習" if quiz.mode == REVIEW else "一般",
         "題型": st.session_state.quiz_type,
         "題號": current_index + 1,
         "單字": current_word,
@@ -220,6 +130,7 @@ def check_answer_and_proceed(user_choice):
     
     # 3. 準備下一題
     go_next_question()
+    progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
     
     # 隨機選擇下一個測驗類型，增加多樣性
     st.session_state.quiz_type = random.choice(['TRANSLATION', 'DEFINITION'])
@@ -229,7 +140,7 @@ def check_answer_and_proceed(user_choice):
 # --- 介面顯示：Duolingo Style 主挑戰區 ---
 
 # 確保一開始有題目
-current_index = st.session_state.current_display_index
+current_index = quiz.current
 current_item = word_bank[current_index]
 
 # 取出資料
@@ -241,13 +152,15 @@ definition = current_item.get("definition", "N/A")
 definition_zh = current_item.get("definition_zh", "N/A") 
 
 
-# 組合音檔路徑
-base_name = f"{current_index + 1:02d}_{current_word}"
-word_audio_path     = os.path.join(AUDIO_DIR, f"{base_name}_word_en.mp3")
-sent_en_audio_path = os.path.join(AUDIO_DIR, f"{base_name}_sent_en.mp3")
-sent_zh_audio_path = os.path.join(AUDIO_DIR, f"{base_name}_sent_zh.mp3")
-def_en_audio_path  = os.path.join(AUDIO_DIR, f"{base_name}_def_en.mp3")
-def_zh_audio_path  = os.path.join(AUDIO_DIR, f"{base_name}_def_zh.mp3")
+# 組合音檔路徑 (先查 manifest，支援 --hash-names 產生的檔名；沒有 manifest 時 audio key 就是編號檔名)
+def clip_path(kind: str) -> str:
+    return unit.audio_path(current_item, kind)
+
+word_audio_path    = clip_path("word_en")
+sent_en_audio_path = clip_path("sent_en")
+sent_zh_audio_path = clip_path("sent_zh")
+def_en_audio_path  = clip_path("def_en")
+def_zh_audio_path  = clip_path("def_zh")
 
 audio_paths = {
     'word_en': word_audio_path,
@@ -256,32 +169,28 @@ audio_paths = {
 
 
 # --- 標題與狀態顯示 ---
+apply_theme()
 st.markdown("<p style='font-size:22px'><b>🧠 Duolingo 風格單字測驗</b></p>", unsafe_allow_html=True)
 
-# 顯示最新的結果訊息
-if st.session_state.last_message:
-    if "答對了" in st.session_state.last_message or "複習完畢" in st.session_state.last_message or "全部答對" in st.session_state.last_message:
-        st.success(st.session_state.last_message)
-    elif "答錯" in st.session_state.last_message or "跳過" in st.session_state.last_message:
-        st.error(st.session_state.last_message)
-    else:
-        st.info(st.session_state.last_message)
-    
-    st.session_state.last_message = "" 
+# 顯示最新的結果訊息 (作答時就建好的 Feedback)
+if st.session_state.feedback:
+    show_feedback(st.session_state.feedback, "alert")
+    st.session_state.feedback = None
 
 
-if st.session_state.study_mode == 'REVIEW':
-    st.warning(f"🔥 錯題複習模式 (剩餘 {len(st.session_state.wrong_queue)} 題)")
+if quiz.mode == REVIEW:
+    st.warning(f"🔥 錯題複習模式 (剩餘 {len(quiz.wrong_queue)} 題)")
+elif quiz.mode == SCHEDULED:
+    st.info(f"🧠 間隔複習模式 (已熟練 {quiz.scheduler.mastered()} / {total_questions})")
 else:
-    display_progress = st.session_state.sequence_cursor 
-    if display_progress == total_questions: display_progress = 0
+    display_progress = quiz.cursor
     st.info(f"📖 順序學習模式 (進度 {display_progress + 1} / {total_questions})")
 
 
 # --- Duolingo-Style 挑戰區 ---
 
 # 1. 產生當前問題
-all_words_list = [item['word'] for item in word_bank]
+all_words_list = unit.words
 prompt, correct_word, choices, audio_path_key = generate_mc_quiz(
     current_item, 
     all_words_list, 
@@ -316,7 +225,7 @@ for i in range(num_choices):
     
     with col:
         # 使用 lambda 呼叫答案檢查器
-        if st.button(choice, key=f"choice_{i}_{current_index}_{st.session_state.study_mode}_{st.session_state.quiz_type}", use_container_width=True):
+        if st.button(choice, key=f"choice_{i}_{current_index}_{quiz.mode}_{st.session_state.quiz_type}", width="stretch"):
             check_answer_and_proceed(choice)
 
 
@@ -354,35 +263,27 @@ with col5:
 
 # --- 側邊欄統計 (保持不變) ---
 st.sidebar.header("📊 練習進度統計")
-st.sidebar.write(f"目前模式：**{st.session_state.study_mode}**")
-st.sidebar.write(f"待複習錯題數：{len(st.session_state.wrong_queue)}")
+scheduled = st.sidebar.toggle("🧠 間隔複習模式 (SM-2)", value=quiz.mode == SCHEDULED,
+                              help="依每個詞的熟練度安排出題：答錯的很快再出現，越熟的間隔越長")
+if scheduled != (quiz.mode == SCHEDULED):
+    quiz.use_scheduler(scheduled)
+    progress.save_quiz(learner, PROGRESS_UNIT, current_word_hash, quiz, st.session_state.history)
+    st.rerun()
+st.sidebar.write(f"目前模式：**{quiz.mode}**")
+st.sidebar.write(f"待複習錯題數：{len(quiz.wrong_queue)}")
 st.sidebar.write(f"目前題型：**{st.session_state.quiz_type}**")
 
 
 st.sidebar.subheader("📈 單字答題統計")
-stats_list = []
-for i, item in enumerate(word_bank):
-    s = st.session_state.stats[i]
-    total_try = s["正確"] + s["錯誤"]
-    rate = f"{s['正確']}/{total_try}" if total_try > 0 else "0/0"
-    
-    # --- 狀態燈邏輯 ---
-    status_light = "⚪"
-    if i in st.session_state.wrong_queue:
-        status_light = "🔴" 
-    elif s["正確"] > 0:
-        status_light = "🟢" 
-    elif s["錯誤"] > 0 and s["正確"] == 0:
-        status_light = "🟡" 
-        
-    stats_list.append({
-        "狀態": status_light,
-        "題號": i + 1,
-        "單字": item["word"],
-        "正確率": rate
-    })
-st.sidebar.dataframe(pd.DataFrame(stats_list), use_container_width=True)
+st.sidebar.caption(stats.summary())
+# 作答時只更新那一列 (stats.update)，沒有新作答時直接用快取的表格
+st.sidebar.dataframe(stats.frame(), width="stretch")
 
 st.sidebar.subheader("📝 歷史紀錄")
-if st.session_state.history:
-    st.sidebar.dataframe(pd.DataFrame(st.session_state.history[::-1]), use_container_width=True)
\ No newline at end of file
+history = st.session_state.history
+if history:
+    page = 0
+    if history.pages() > 1:
+        page = st.sidebar.number_input("頁數 (最新的在第 1 頁)", min_value=1, max_value=history.pages(), value=1) - 1
+    # 只組出這一頁的 DataFrame，沒有新作答時直接用快取
+    st.sidebar.dataframe(history.frame(page), width="stretch")
\ No newline at end of file
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+answer_history.py
+側邊欄「歷史紀錄」用的作答紀錄，取代原本一直變長的 list：
+1) 依欄位分開存 (每欄一個 deque)，只保留最近 cap 筆，append 是 O(1)
+2) 超過上限被擠掉的舊紀錄，每累積 SPILL_BATCH 筆就附加寫入 spill_path (JSON Lines)，
+   不會遺失，也不必一直留在記憶體；存進度時用 persist_tail(n) 只存最近 n 筆，
+   比這 n 筆更舊、還沒寫過的紀錄排進待寫佇列 (每筆只排一次)，由 take_spill() 取走
+   交給 progress_store 的背景執行緒寫入，按下送出不必等磁碟
+3) frame(page) 只把畫面上那一頁 (由新到舊) 組成 DataFrame，
+   並依 version 快取：沒有新作答的 rerun 直接拿到同一個 DataFrame (請勿修改它)
+
+    history = AnswerHistory(cap=500, spill_path=".progress/history/kid01_ch_u8.jsonl")
+    history.append({"題號": 1, "結果": "正確"})
+    st.sidebar.dataframe(history.frame(page=0))
+"""
+
+import json
+import os
+from collections import deque
+from itertools import islice
+
+import pandas as pd
+
+HISTORY_CAP = int(os.environ.get("HISTORY_CAP", "500"))
+PAGE_SIZE = 50
+SPILL_BATCH = 100
+
+
+def append_rows(path: str, rows):
+    """把紀錄附加寫入 path (JSON Lines，一筆一行)。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+class AnswerHistory:
+    """最近 cap 筆作答紀錄 (欄位式 ring buffer)。"""
+
+    __slots__ = ("cap", "spill_path", "version", "total", "spilled", "_columns", "_spill",
+                 "_cache_key", "_cache_frame")
+
+    def __init__(self, rows=(), cap: int = HISTORY_CAP, spill_path: str = None):
+        if cap <= 0:
+            raise ValueError("cap 必須大於 0")
+        self.cap = cap
+        self.spill_path = spill_path
+        self.version = 0
+        self.total = 0               # 全部作答筆數 (含已寫到磁碟的)
+        self.spilled = 0             # 最舊的幾筆已寫到 (或排入) spill_path，依作答順序計算
+        self._columns = {}           # 欄位名稱 -> deque，所有欄位長度相同
+        self._spill = []             # 等待寫入 spill_path 的舊紀錄
+        self._cache_key = None
+        self._cache_frame = None
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        for column in self._columns.values():
+            return len(column)
+        return 0
+
+    def __iter__(self):
+        """由舊到新逐筆回傳 dict (只含記憶體裡的紀錄)。"""
+        names = list(self._columns)
+        for values in zip(*self._columns.values()):
+            yield dict(zip(names, values))
+
+    def append(self, row: dict):
+        columns = self._columns
+        size = len(self)
+        for name in row:
+            if name not in columns:
+                # 新欄位：前面的紀錄補 None
+                columns[name] = deque([None] * size, maxlen=self.cap)
+        # 被擠掉的是第 total - cap 筆 (從 0 算)；persist_tail() 已經寫過的就不再寫
+        if size == self.cap and self.spill_path and self.total - size >= self.spilled:
+            self._spill.append({name: column[0] for name, column in columns.items()})
+            self.spilled = self.total - size + 1
+            if len(self._spill) >= SPILL_BATCH:
+                self.flush()
+        for name, column in columns.items():
+            column.append(row.get(name))
+        self.total += 1
+        self.version += 1
+
+    def flush(self):
+        """把累積的舊紀錄附加寫入 spill_path。"""
+        if not self._spill or not self.spill_path:
+            return
+        append_rows(self.spill_path, self._spill)
+        self._spill = []
+
+    def take_spill(self):
+        """取走等待寫入 spill_path 的舊紀錄 (由舊到新)，由呼叫者負責寫入 (見 append_rows)。"""
+        rows, self._spill = self._spill, []
+        return rows
+
+    def tail(self, n: int):
+        """最近 n 筆 (由舊到新的 dict list)，存進度用。"""
+        size = len(self)
+        start = max(0, size - n)
+        names = list(self._columns)
+        columns = [islice(column, start, None) for column in self._columns.values()]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def persist_tail(self, n: int):
+        """
+        存進度用：回傳最近 n 筆 (同 tail)，並把比這 n 筆更舊、還沒寫過的紀錄排進待寫佇列；
+        這裡不碰磁碟，呼叫者要用 take_spill() 取走並寫入，進度檔沒存到的紀錄才不會遺失。
+        """
+        if self.spill_path:
+            first = self.total - len(self)          # 記憶體裡最舊一筆的序號
+            keep_from = max(self.total - n, first)  # 要存進進度的第一筆
+            if self.spilled < keep_from:
+                names = list(self._columns)
+                start = max(self.spilled, first) - first
+                columns = [islice(column, start, keep_from - first) for column in self._columns.values()]
+                self._spill.extend(dict(zip(names, values)) for values in zip(*columns))
+                self.spilled = keep_from
+        return self.tail(n)
+
+    def pages(self, page_size: int = PAGE_SIZE) -> int:
+        return max(1, -(-len(self) // page_size))
+
+    def frame(self, page: int = 0, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+        """第 page 頁 (0 是最新的一頁)，最新的在最上面。"""
+        key = (self.version, page, page_size)
+        if key != self._cache_key:
+            start = page * page_size
+            data = {name: list(islice(reversed(column), start, start + page_size))
+                    for name, column in self._columns.items()}
+            self._cache_frame = pd.DataFrame(data)
+            self._cache_key = key
+        return self._cache_frame
+
+    def __getstate__(self):
+        # session_state 可能被複製或序列化，不帶著快取的 DataFrame
+        return {name: getattr(self, name) for name in self.__slots__
+                if name not in ("_cache_key", "_cache_frame")}
+
+    def __setstate__(self, state):
+        self.spilled = 0
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._cache_key = None
+        self._cache_frame = None
+
+    def __repr__(self):
+        return f"AnswerHistory(rows={len(self)}, total={self.total}, cap={self.cap})"
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+audio_assets.py
+所有 App 共用的本地音檔快取 (答對/答錯音效、audio/*.mp3、audio_u7/*.mp3)：
+1) 每個 Python 行程只從磁碟讀一次，之後都回傳同一份不可變的 bytes
+2) 有記憶體上限 (LRU 淘汰)
+3) 依檔案 mtime 失效：檔案被更新後會自動重新讀取
+   (每個檔案最多每 CHECK_INTERVAL 秒 stat 一次，不會每次 rerun 都碰磁碟)
+4) 提供 hit / miss 計數，方便觀察快取效果
+5) 有 audio_store/ 音檔庫時，先把路徑換成內容相同的 blob (重複的音檔只載入一次)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from audio_store import resolve
+
+MEMORY_LIMIT_BYTES = int(os.environ.get("AUDIO_ASSET_MEMORY_MB", "64")) * 1024 * 1024
+CHECK_INTERVAL = float(os.environ.get("AUDIO_ASSET_CHECK_SECONDS", "5"))
+
+
+class AssetStore:
+    """以絕對路徑為 key 的唯讀音檔快取，執行緒安全。"""
+
+    def __init__(self, memory_limit: int = MEMORY_LIMIT_BYTES, check_interval: float = CHECK_INTERVAL):
+        self.memory_limit = memory_limit
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # 絕對路徑 -> [bytes, mtime, 上次檢查時間]
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _load(self, path: str):
+        # 先 stat 再讀，若讀取途中檔案被換掉，下一次檢查時 mtime 會不同而重新讀取
+        mtime = os.stat(path).st_mtime
+        with open(path, "rb") as f:
+            return f.read(), mtime
+
+    def _store(self, path: str, data: bytes, mtime: float, now: float):
+        if path in self._items:
+            self._bytes -= len(self._items.pop(path)[0])
+        if len(data) > self.memory_limit:
+            return
+        self._items[path] = [data, mtime, now]
+        self._bytes += len(data)
+        while self._bytes > self.memory_limit:
+            _, (old, _, _) = self._items.popitem(last=False)
+            self._bytes -= len(old)
+
+    def get(self, path: str) -> bytes:
+        """
+        回傳音檔 bytes。檔案不存在時丟出 FileNotFoundError
+        (與原本 open(filename, 'rb') 的行為一致)。
+        """
+        key = os.path.abspath(path)
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if now - item[2] < self.check_interval:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                try:
+                    mtime = os.stat(key).st_mtime
+                except FileNotFoundError:
+                    self._bytes -= len(self._items.pop(key)[0])
+                    raise
+                if mtime == item[1]:
+                    item[2] = now
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                self.reloads += 1
+
+        data, mtime = self._load(key)
+        with self._lock:
+            self.misses += 1
+            self._store(key, data, mtime, now)
+        return data
+
+    def preload(self, paths):
+        """預先載入 (例如答對/答錯音效)，不存在的檔案略過。"""
+        for path in paths:
+            try:
+                self.get(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "items": len(self._items),
+                "bytes": self._bytes,
+            }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_asset_store() -> AssetStore:
+    """整個 Python 行程共用一份 (所有學生、所有 rerun 共用)。"""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = AssetStore()
+    return _default_store
+
+
+def load_audio(path: str) -> bytes:
+    """App 端使用的捷徑：取代 open(path, 'rb').read()。"""
+    return get_asset_store().get(resolve(path))
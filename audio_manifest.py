@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+audio_manifest.py
+make_audio_files*.py 的增量建置 (incremental build)：
+1) 在音檔資料夾旁寫一份 manifest.json，記錄每個音檔的
+   text / lang / 輸出路徑 / 內容 hash / 產生器版本
+2) 再次執行時只合成內容有變動的項目；內容相同但檔名換了 (例如題庫重新排序)
+   就直接複製舊檔
+3) 清除已經不在題庫裡的舊音檔 (garbage collect)
+4) 可選擇以內容 hash 當檔名，重新排序題庫完全不用重做
+5) 離線後端 (--fake、--backend stub / espeak) 只輸出測試用的 WAV 到暫存資料夾，
+   不寫 manifest、不動音檔資料夾；音檔資料夾裡的 WAV 測試音會被當成需要重新合成
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from audio_store import INDEX_PATH as STORE_INDEX_PATH, refresh as refresh_store, resolve
+from tts_backends import audio_format
+from tts_batch import backend_from_args, run_from_args, write_atomic
+
+# 合成方式 (語言、後端參數...) 有改動時調高版本號，所有音檔都會重做一次
+GENERATOR_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def content_hash(text: str, lang: str) -> str:
+    raw = f"{GENERATOR_VERSION}\x1f{lang.lower()}\x1f{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def hashed_filename(text: str, lang: str) -> str:
+    """以內容 hash 命名的檔名，例如 3f2a9c0d1b7e4a55.mp3"""
+    return f"{content_hash(text, lang)[:16]}.mp3"
+
+
+def manifest_path(audio_dir: str) -> str:
+    return os.path.join(audio_dir, MANIFEST_NAME)
+
+
+def load_manifest(audio_dir: str) -> dict:
+    try:
+        with open(manifest_path(audio_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("generators", {})
+    return manifest
+
+
+def save_manifest(audio_dir: str, manifest: dict):
+    path = manifest_path(audio_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+_lookup_cache = {}  # audio_dir -> (manifest mtime, {key: path})
+
+
+def lookup(audio_dir: str, key: str):
+    """依邏輯名稱 (例如 "01_agency_word_en") 找出實際的音檔路徑，找不到回傳 None。"""
+    try:
+        mtime = os.stat(manifest_path(audio_dir)).st_mtime
+    except OSError:
+        return None
+    cached = _lookup_cache.get(audio_dir)
+    if cached is None or cached[0] != mtime:
+        index = {}
+        for section in load_manifest(audio_dir)["generators"].values():
+            for k, entry in section.get("entries", {}).items():
+                index.setdefault(k, entry["path"])
+        cached = _lookup_cache[audio_dir] = (mtime, index)
+    return cached[1].get(key)
+
+
+def _exists(path: str) -> bool:
+    """音檔在原路徑，或已收進 audio_store 音檔庫 (原檔被 --prune 刪掉) 都算存在。"""
+    return os.path.exists(path) or os.path.exists(resolve(path))
+
+
+def _is_placeholder(path: str) -> bool:
+    """離線後端的 WAV 測試音 (例如手動從暫存資料夾複製進來的)，不能當成正式音檔沿用。"""
+    if not os.path.exists(path):
+        path = resolve(path)
+    try:
+        with open(path, "rb") as f:
+            return audio_format(f.read(4)) == "audio/wav"
+    except OSError:
+        return False
+
+
+def _usable(entry: dict) -> bool:
+    return _exists(entry["path"]) and not _is_placeholder(entry["path"])
+
+
+def plan(manifest: dict, generator: str, jobs):
+    """
+    比對 manifest，把 jobs 分成三類：
+    - to_synth: 需要重新合成
+    - to_copy:  [(舊檔路徑, job)]，內容相同只是換了檔名
+    - unchanged: 完全不用動
+    """
+    old_entries = manifest["generators"].get(generator, {}).get("entries", {})
+    by_hash = {}
+    for entry in old_entries.values():
+        if _usable(entry):
+            by_hash.setdefault(entry["hash"], entry["path"])
+
+    to_synth, to_copy, unchanged = [], [], []
+    for job in jobs:
+        h = content_hash(job.text, job.lang)
+        entry = old_entries.get(job.key)
+        if entry and entry["hash"] == h and entry["path"] == job.path and _usable(entry):
+            unchanged.append(job)
+        elif h in by_hash:
+            to_copy.append((by_hash[h], job))
+        else:
+            to_synth.append(job)
+    return to_synth, to_copy, unchanged
+
+
+def _entry(job, backend: str) -> dict:
+    return {
+        "text": job.text,
+        "lang": job.lang,
+        "path": job.path,
+        "hash": content_hash(job.text, job.lang),
+        "backend": backend,
+        "generator_version": GENERATOR_VERSION,
+    }
+
+
+def collect_garbage(manifest: dict, generator: str, old_entries: dict):
+    """刪除舊 manifest 有、新 manifest 沒有用到的檔案，回傳被刪除的路徑。"""
+    in_use = set()
+    for section in manifest["generators"].values():
+        in_use.update(e["path"] for e in section.get("entries", {}).values())
+
+    removed = []
+    for entry in old_entries.values():
+        path = entry["path"]
+        if path in in_use or path in removed:
+            continue
+        try:
+            os.remove(path)
+            removed.append(path)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def build(jobs, args, audio_dir: str, generator: str):
+    """
+    依 args 執行增量或完整建置，並更新 manifest。
+    args 需包含 add_manifest_arguments() 與 tts_batch.add_batch_arguments() 的參數。
+    離線後端只合成到暫存資料夾 (見 tts_batch.run_from_args)，manifest 與音檔資料夾都不動。
+    """
+    backend = backend_from_args(args)
+    if not backend.persistent:
+        run_from_args(list(jobs), args, backend)
+        print(f"⚠ {backend.name} 後端不是正式音檔，未更新 {manifest_path(audio_dir)}")
+        return
+
+    manifest = load_manifest(audio_dir)
+    old_entries = dict(manifest["generators"].get(generator, {}).get("entries", {}))
+
+    if args.full:
+        to_synth, to_copy, unchanged = list(jobs), [], []
+    else:
+        to_synth, to_copy, unchanged = plan(manifest, generator, jobs)
+    print(f"需要合成 {len(to_synth)} 個，沿用舊檔 {len(to_copy)} 個，未變動 {len(unchanged)} 個")
+
+    done = list(unchanged)
+    # 先把來源全部讀進記憶體再寫出，避免兩個檔名互換時來源先被覆蓋
+    copies = []
+    for src, job in to_copy:
+        with open(resolve(src), "rb") as f:
+            copies.append((f.read(), job))
+    for data, job in copies:
+        write_atomic(job.path, data)
+        done.append(job)
+    if to_synth:
+        done += [r.job for r in run_from_args(to_synth, args, backend) if r.ok]
+
+    # 只記錄成功的項目；失敗的下次執行會再試一次
+    # (沿用的舊檔已排除 WAV 測試音，一定也是正式後端產生的)
+    entries = {job.key: _entry(job, backend.name) for job in done}
+    manifest["generators"][generator] = {
+        "generator_version": GENERATOR_VERSION,
+        "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "entries": entries,
+    }
+    if not args.keep_orphans:
+        for path in collect_garbage(manifest, generator, old_entries):
+            print(f"    🗑 已刪除不再使用的音檔: {path}")
+    save_manifest(audio_dir, manifest)
+    # 有建立 audio_store 音檔庫時，讓索引指向剛產生的新音檔
+    if os.path.exists(STORE_INDEX_PATH):
+        refresh_store()
+
+
+def add_manifest_arguments(parser):
+    parser.add_argument("--full", action="store_true", help="忽略 manifest，全部重新合成")
+    parser.add_argument("--keep-orphans", action="store_true", help="不要刪除已不在題庫中的舊音檔")
+    parser.add_argument("--hash-names", action="store_true",
+                        help="以內容 hash 命名音檔 (重新排序題庫不需重做)")
+    return parser
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+audio_store.py
+把 audio/ 與 audio_u7/ 的音檔整理成「內容定址」的音檔庫：
+1) 每個 mp3 依內容 SHA-256 存成 audio_store/blobs/<hash>.mp3，
+   內容完全相同的檔案 (例如 audio/一直.mp3 與 audio_u7/一直.mp3) 只存一份
+2) audio_store/index.json 記錄「邏輯名稱 (原本的路徑) -> blob」
+3) App 播放時 (audio_assets.load_audio、static_audio.play_file) 先用 resolve()
+   把原本的路徑換成 blob，同一份內容在記憶體與 page cache 裡都只有一份
+4) 加上 --prune 會刪除已收進音檔庫的原始檔，部署時只需要帶 audio_store/
+5) 音檔庫存在時，make_audio_files*.py 建置完會自動更新索引，App 不會拿到舊的 blob
+
+用法：
+    python audio_store.py            # 建立 / 更新音檔庫並顯示統計
+    python audio_store.py --prune    # 同上，並刪除已收錄的原始檔
+    python audio_store.py --stats    # 只顯示統計 (重複的檔案、可省下的空間)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+
+from tts_batch import write_atomic
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = ["audio", "audio_u7"]
+STORE_DIR = os.path.join(ROOT, "audio_store")
+BLOB_DIR = os.path.join(STORE_DIR, "blobs")
+INDEX_PATH = os.path.join(STORE_DIR, "index.json")
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+
+
+def logical_name(path: str) -> str:
+    """原本的檔案路徑 -> 音檔庫裡的邏輯名稱，例如 "audio_u7/一直.mp3"。"""
+    return os.path.relpath(os.path.abspath(path), ROOT).replace(os.sep, "/")
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_sources(source_dirs=SOURCE_DIRS):
+    """回傳 {邏輯名稱: (絕對路徑, hash, 大小)}。"""
+    found = {}
+    for folder in source_dirs:
+        folder = os.path.join(ROOT, folder)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if name.lower().endswith(AUDIO_EXTENSIONS) and os.path.isfile(path):
+                found[logical_name(path)] = (path, file_hash(path), os.path.getsize(path))
+    return found
+
+
+def load_index() -> dict:
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    index.setdefault("blobs", {})
+    index.setdefault("names", {})
+    index.setdefault("pruned", [])   # 原始檔已被 --prune 刪掉、只存在音檔庫的名稱
+    return index
+
+
+def save_index(index: dict):
+    index["updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def blob_path(digest: str, ext: str = ".mp3") -> str:
+    return os.path.join(BLOB_DIR, f"{digest}{ext}")
+
+
+def build_store(sources: dict, index: dict):
+    """把新的 / 變動過的原始檔收進音檔庫，回傳新增的 blob 數。"""
+    added = 0
+    pruned = set(index["pruned"]) - set(sources)
+    # 原始檔被刪除 (不是 --prune 刪的) 的名稱也從索引移除
+    for name in list(index["names"]):
+        if name not in sources and name not in pruned:
+            del index["names"][name]
+    index["pruned"] = sorted(pruned)
+    for name, (path, digest, size) in sources.items():
+        ext = os.path.splitext(path)[1].lower()
+        target = blob_path(digest, ext)
+        if digest not in index["blobs"] or not os.path.exists(target):
+            # 用複製而不是 hard link：gTTS 的 save() 會直接覆寫原檔，hard link 會連 blob 一起改掉
+            with open(path, "rb") as f:
+                write_atomic(target, f.read())
+            index["blobs"][digest] = {"path": logical_name(target), "size": size}
+            added += 1
+        index["names"][name] = digest
+    return added
+
+
+def collect_garbage(index: dict):
+    """刪除已沒有任何邏輯名稱指向的 blob，回傳刪除的數量。"""
+    in_use = set(index["names"].values())
+    removed = 0
+    for digest in list(index["blobs"]):
+        if digest in in_use:
+            continue
+        entry = index["blobs"].pop(digest)
+        try:
+            os.remove(os.path.join(ROOT, entry["path"]))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def prune_sources(sources: dict, index: dict):
+    """刪除內容已確實收進音檔庫的原始檔，回傳刪除的路徑。"""
+    removed = []
+    for name, (path, digest, _) in sources.items():
+        entry = index["blobs"].get(digest)
+        if entry is None or index["names"].get(name) != digest:
+            continue
+        target = os.path.join(ROOT, entry["path"])
+        if os.path.exists(target) and file_hash(target) == digest:
+            os.remove(path)
+            removed.append(name)
+    index["pruned"] = sorted(set(index["pruned"]) | set(removed))
+    return removed
+
+
+def print_stats(sources: dict):
+    by_hash = defaultdict(list)
+    for name, (_, digest, size) in sources.items():
+        by_hash[digest].append((name, size))
+    total = sum(size for _, _, size in sources.values())
+    unique = sum(names[0][1] for names in by_hash.values())
+    print(f"原始音檔 {len(sources)} 個 ({total / 1024:.0f} KB)，"
+          f"不重複內容 {len(by_hash)} 個 ({unique / 1024:.0f} KB)，可省下 {(total - unique) / 1024:.0f} KB")
+    for names in by_hash.values():
+        if len(names) > 1:
+            print("    ♻ 內容相同：" + "、".join(n for n, _ in names))
+
+
+_resolve_cache = None  # (index mtime, {絕對路徑: blob 絕對路徑})
+
+
+def resolve(path: str) -> str:
+    """
+    把原本的音檔路徑換成音檔庫裡的 blob 路徑；沒有音檔庫或沒收錄時原樣回傳。
+    index.json 依 mtime 快取，更新後會自動重新載入。
+    """
+    global _resolve_cache
+    try:
+        mtime = os.stat(INDEX_PATH).st_mtime
+    except OSError:
+        return path
+    cached = _resolve_cache
+    if cached is None or cached[0] != mtime:
+        index = load_index()
+        mapping = {}
+        for name, digest in index["names"].items():
+            entry = index["blobs"].get(digest)
+            if entry is not None:
+                mapping[os.path.join(ROOT, name)] = os.path.join(ROOT, entry["path"])
+        cached = _resolve_cache = (mtime, mapping)
+    return cached[1].get(os.path.abspath(path), path)
+
+
+def refresh(prune: bool = False):
+    """重新掃描原始檔並更新音檔庫 (make_audio_files*.py 建置完成後也會呼叫)。"""
+    sources = scan_sources()
+    index = load_index()
+    added = build_store(sources, index)
+    removed = collect_garbage(index)
+    pruned = prune_sources(sources, index) if prune else []
+    save_index(index)
+    return index, added, removed, pruned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整理 audio/、audio_u7/ 成內容定址的音檔庫")
+    parser.add_argument("--prune", action="store_true", help="刪除已收進音檔庫的原始音檔")
+    parser.add_argument("--stats", action="store_true", help="只顯示重複檔案統計，不寫入音檔庫")
+    args = parser.parse_args()
+
+    sources = scan_sources()
+    print_stats(sources)
+    if args.stats:
+        return
+
+    index, added, removed, pruned = refresh(prune=args.prune)
+    print(f"✅ 音檔庫已更新：新增 {added} 個 blob，刪除 {removed} 個不再使用的 blob，"
+          f"共 {len(index['blobs'])} 個 blob / {len(index['names'])} 個名稱")
+    for name in pruned:
+        print(f"    🗑 已刪除原始檔 (改由音檔庫提供): {name}")
+
+
+if __name__ == "__main__":
+    main()
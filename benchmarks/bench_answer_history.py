@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+bench_answer_history.py
+側邊欄歷史紀錄每次 rerun 的成本：原本的 pd.DataFrame(history[::-1]) 與 AnswerHistory.frame()
+(有新作答時重組一頁、沒有新作答時直接用快取) 的比較，以及 append 的成本。
+
+    python benchmarks/bench_answer_history.py --rows 3000 --reruns 500
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_history import AnswerHistory  # noqa: E402
+
+
+def make_row(i):
+    return {
+        "模式": "一般",
+        "題號": i % 30 + 1,
+        "詞彙": f"詞{i % 30}",
+        "輸入": f"詞{i % 30}",
+        "結果": "正確" if i % 3 else "錯誤",
+        "時間": datetime.datetime(2026, 1, 1).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def report(label, n, elapsed):
+    print(f"{label:<36} {n:>7} 次  {elapsed:6.3f}s  {elapsed / n * 1e6:9.1f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3000, help="已經作答的筆數 (大約一小時的練習)")
+    parser.add_argument("--reruns", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = [make_row(i) for i in range(args.rows)]
+
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        pd.DataFrame(rows[::-1])
+    report(f"list, {args.rows} rows: DataFrame(history[::-1])", args.reruns, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AnswerHistory(rows, spill_path=os.path.join(tmp, "spill.jsonl"))
+
+        start = time.perf_counter()
+        for _ in range(args.reruns):
+            history.frame()
+        report(f"AnswerHistory ({len(history)} rows): 沒有新作答", args.reruns, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(args.reruns):
+            history.append(make_row(i))
+            history.frame()
+        report("AnswerHistory: append + frame()", args.reruns, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(args.rows):
+            history.append(rows[i])
+        report("AnswerHistory.append (含 spill)", args.rows, time.perf_counter() - start)
+        history.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+bench_diff.py
+答錯比對 HTML 的成本：原本 002_ch_u10.py / 003_ELA_P45.py 的 get_diff_html 與 diff_render
+(答對直接走捷徑、span 開頭事先組好、LRU 快取) 的比較，
+以及 compact 輸出 (CSS class + 同狀態連續的字合併) 每次作答送到瀏覽器的 HTML 大小與元素數。
+同時確認 diff_render 的 inline 輸出與原本完全相同。
+
+    python benchmarks/bench_diff.py --repeat 2000
+"""
+
+import argparse
+import difflib
+import html
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diff_render import DiffRenderer, STYLES, diff_css  # noqa: E402
+
+
+def legacy_box(a: str, b: str) -> str:
+    """002_ch_u10.py 原本的 get_diff_html。"""
+    s = difflib.SequenceMatcher(None, a, b)
+
+    correct = []
+    inputed = []
+
+    GREEN = "background:#58CC02;color:white;"
+    RED = "background:#FF4B4B;color:white;"
+    EMPTY = "background:#E5E5E5;color:white;"
+
+    def span(text, style):
+        text = html.escape(text)
+        return f"<span style='{style}display:inline-block;width:35px;height:45px;line-height:45px;margin:2px;border-radius:8px;font-family:Arial, sans-serif;text-align:center;font-size:27px;font-weight:600;'>{text}</span>"
+
+    for opcode, a1, a2, b1, b2 in s.get_opcodes():
+        A = a[a1:a2]
+        B = b[b1:b2]
+
+        if opcode == "equal":
+            for x, y in zip(A, B):
+                correct.append(span(x, GREEN))
+                inputed.append(span(y, GREEN))
+
+        elif opcode == "replace":
+            L = max(len(A), len(B))
+            for i in range(L):
+                ca = A[i] if i < len(A) else "_"
+                cb = B[i] if i < len(B) else "_"
+                correct.append(span(ca, RED))
+                inputed.append(span(cb, RED))
+
+        elif opcode == "delete":
+            for ch in A:
+                correct.append(span(ch, RED))
+                inputed.append(span("_", EMPTY))
+
+        elif opcode == "insert":
+            for ch in B:
+                correct.append(span("_", EMPTY))
+                inputed.append(span(ch, RED))
+
+    return f"""<div style='text-align:left;margin-top:10px;margin-bottom:10px;'>
+        <div style='margin-bottom:5px;'>{''.join(correct)}</div>
+        <div style='font-size:15px;margin:5px;color:#666;'>⬇️</div>
+        <div>{''.join(inputed)}</div>
+    </div>"""
+
+
+def legacy_letter(a: str, b: str) -> str:
+    """003_ELA_P45.py 原本的 get_diff_html。"""
+    a = a.lower()
+    b = b.lower()
+    s = difflib.SequenceMatcher(None, a, b)
+
+    correct = []
+    inputed = []
+
+    GREEN = "background:#ddffdd;"
+    RED = "background:#b22222;color:white;"
+    EMPTY = "background:#eeeeee;color:#888;"
+
+    def span(text, style):
+        text = html.escape(text)
+        return f"<span style='{style}display:inline-block;width:20px;height:32px;line-height:27px;margin:1px;border-radius:4px;font-family:monospace;text-align:center;font-size:36px;'>{text}</span>"
+
+    for opcode, a1, a2, b1, b2 in s.get_opcodes():
+        A = a[a1:a2]
+        B = b[b1:b2]
+
+        if opcode == "equal":
+            for x, y in zip(A, B):
+                correct.append(span(x, GREEN))
+                inputed.append(span(y, GREEN))
+
+        elif opcode == "replace":
+            L = max(len(A), len(B))
+            for i in range(L):
+                ca = A[i] if i < len(A) else "_"
+                cb = B[i] if i < len(B) else "_"
+                correct.append(span(ca, RED))
+                inputed.append(span(cb, RED))
+
+        elif opcode == "delete":
+            for ch in A:
+                correct.append(span(ch, RED))
+                inputed.append(span("_", EMPTY))
+
+        elif opcode == "insert":
+            for ch in B:
+                correct.append(span("_", EMPTY))
+                inputed.append(span(ch, RED))
+
+    return f"""<div style='text-align:center;margin-top:12px;'>
+        {''.join(correct)}
+        <div style='font-size:13px;margin:3px;'>⬇️</div>
+        {''.join(inputed)}
+    </div>"""
+
+
+def typo(rng, text):
+    """隨機刪一個字、換一個字或多打一個字。"""
+    i = rng.randrange(len(text))
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:i] + text[i + 1:]
+    if kind == 1:
+        return text[:i] + rng.choice("abcdefg<&>乾淨國") + text[i + 1:]
+    return text[:i] + rng.choice("xyz的了") + text[i:]
+
+
+WORDS_ZH = ["乾淨", "口渴", "喝水", "國王", "小烏鴉", "石頭", "瓶子", "聰明", "辦法", "高興"]
+WORDS_EN = ["apple", "borrow", "curious", "delicious", "environment", "frighten", "generous", "harvest"]
+SENTENCES = [
+    "The crow dropped small stones into the pitcher until the water rose high enough to drink.",
+    "烏鴉口渴了，牠找到一個瓶子，瓶子裡的水太少，於是牠想出了一個聰明的辦法。",
+    "Students who practice a little every day usually remember new words much longer.",
+]
+
+
+def report(label, n, elapsed):
+    print(f"{label:<46} {n:>7} 次  {elapsed:6.3f}s  {elapsed / n * 1e6:8.1f} µs/次")
+
+
+def payload(text):
+    """HTML 大小 (bytes) 與標籤數 (瀏覽器要建立的元素數)。"""
+    return len(text.encode("utf-8")), text.count("</")
+
+
+def bench(title, legacy, style, pairs, repeat):
+    print(f"--- {title} ---")
+    for correct, answer in pairs:
+        assert DiffRenderer(STYLES[style]).render(correct, answer) == legacy(correct, answer), (correct, answer)
+
+    def loop(fn, **options):
+        start = time.perf_counter()
+        for i in range(repeat):
+            fn(*pairs[i % len(pairs)], **options)
+        return time.perf_counter() - start
+
+    report("原本 get_diff_html", repeat, loop(legacy))
+    # cache_size=0：每次都重算 (例如每個學生的錯字都不一樣)
+    report("diff_render inline，不使用快取", repeat, loop(DiffRenderer(STYLES[style], cache_size=0).render))
+    report("diff_render compact，不使用快取", repeat,
+           loop(DiffRenderer(STYLES[style], cache_size=0).render, compact=True))
+    report("diff_render compact，LRU 命中", repeat, loop(DiffRenderer(STYLES[style]).render, compact=True))
+
+    sample = pairs[0]
+    renderer = DiffRenderer(STYLES[style])
+    size, tags = payload(legacy(*sample))
+    compact_size, compact_tags = payload(renderer.render(*sample, compact=True))
+    print(f"    每次作答的 HTML ({len(sample[0])} 字)：原本 {size} bytes / {tags} 個元素，"
+          f"compact {compact_size} bytes / {compact_tags} 個元素 (樣式表 {len(diff_css())} bytes，每頁一次)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    bench("中文詞彙，答對", legacy_box, "box", [(w, w) for w in WORDS_ZH], args.repeat)
+    bench("中文詞彙，答錯", legacy_box, "box", [(w, typo(rng, w)) for w in WORDS_ZH], args.repeat)
+    bench("英文單字，答錯", legacy_letter, "letter", [(w, typo(rng, w)) for w in WORDS_EN], args.repeat)
+    bench("整句，答對", legacy_letter, "letter", [(s, s) for s in SENTENCES], args.repeat)
+    bench("整句，答錯", legacy_letter, "letter", [(s, typo(rng, typo(rng, s))) for s in SENTENCES], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+bench_progress_store.py
+模擬全班同時作答：每次作答都存一次進度。比較
+1) 每次作答直接寫一個 SQLite 交易 (送出按鈕要等磁碟)
+2) ProgressStore.save() 只放進記憶體，背景整批寫入
+量的是「送出時多等的時間」，以及最後實際寫入幾次。
+
+    python benchmarks/bench_progress_store.py --learners 30 --answers 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress_store import ProgressStore, SqliteBackend  # noqa: E402
+from quiz_engine import QuizEngine  # noqa: E402
+
+
+def make_answers(learners, answers, words, seed):
+    rng = random.Random(seed)
+    engines = {f"learner{i:03d}": QuizEngine(words) for i in range(learners)}
+    steps = []
+    for _ in range(answers):
+        for learner, engine in engines.items():
+            engine.submit(rng.random() < 0.7)
+            engine.next()
+            steps.append((learner, engine.to_dict()))
+    return steps
+
+
+def report(label, steps, elapsed, writes):
+    print(f"{label:<28} {len(steps):>6} saves  {elapsed:6.3f}s  {elapsed / len(steps) * 1e6:8.1f} µs/次  寫入 {writes} 列")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--learners", type=int, default=30)
+    parser.add_argument("--answers", type=int, default=50, help="每個學生作答幾題")
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    steps = make_answers(args.learners, args.answers, args.words, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SqliteBackend(os.path.join(tmp, "sync.sqlite3"))
+        start = time.perf_counter()
+        for learner, state in steps:
+            backend.save_many([(learner, "unit", state)])
+        report("sync commit per answer", steps, time.perf_counter() - start, len(steps))
+        backend.close()
+
+        store = ProgressStore(SqliteBackend(os.path.join(tmp, "batched.sqlite3")), flush_interval=0.05)
+        start = time.perf_counter()
+        for learner, state in steps:
+            store.save(learner, "unit", state)
+        report("ProgressStore.save", steps, time.perf_counter() - start, 0)
+        start = time.perf_counter()
+        store.close()
+        stats = store.stats()
+        print(f"{'  + final flush':<28} {'':>6}        {time.perf_counter() - start:6.3f}s"
+              f"  批次 {stats['flushes']}，寫入 {stats['written']} 列，合併 {stats['coalesced']} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+bench_quiz_engine.py
+不經過 Streamlit，直接量 QuizEngine 每秒能跑幾次「作答 + 下一題」(一輪一輪與 SM-2 模式)，
+錯題佇列在大題庫下的成本 (ReviewQueue 與原本 list 寫法比較)，
+以及 to_dict() / from_dict() 的速度 (存進度時的成本)。
+
+    python benchmarks/bench_quiz_engine.py --words 30 --steps 1000000 --accuracy 0.7 --big-words 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_engine import QuizEngine, ReviewQueue  # noqa: E402
+
+
+def bench_transitions(label, engine, answers):
+    submit, advance = engine.submit, engine.next
+    start = time.perf_counter()
+    for correct in answers:
+        submit(correct)
+        advance()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {len(answers):>9} steps  {elapsed:6.2f}s  {len(answers) / elapsed / 1e6:6.2f} M steps/s"
+          f"  ({engine.mode}, 錯題 {len(engine.wrong_queue)})")
+
+
+def bench_queue(n_items):
+    """佇列裡有 n_items 題時，複習一次 (查詢 + 答錯移到尾端 + 答對移除任意一題) 的成本。"""
+    rng = random.Random(1)
+    picks = [rng.randrange(n_items) for _ in range(n_items)]
+
+    queue = list(range(n_items))
+    start = time.perf_counter()
+    for i in picks:
+        if i in queue:
+            queue.append(queue.pop(0))
+            queue.remove(i)
+            queue.append(i)
+    list_elapsed = time.perf_counter() - start
+
+    queue = ReviewQueue(range(n_items))
+    start = time.perf_counter()
+    for i in picks:
+        if i in queue:
+            queue.rotate()
+            queue.discard(i)
+            queue.add(i)
+    rq_elapsed = time.perf_counter() - start
+
+    for label, elapsed in (("list", list_elapsed), ("ReviewQueue", rq_elapsed)):
+        print(f"{'queue of ' + str(n_items) + ': ' + label:<34} {n_items:>9} ops    {elapsed:6.2f}s  "
+              f"{elapsed / n_items * 1e6:6.2f} µs/op")
+
+
+def bench_serialize(engine, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        QuizEngine.from_dict(engine.to_dict())
+    elapsed = time.perf_counter() - start
+    print(f"{'to_dict + from_dict':<34} {rounds:>9} times  {elapsed:6.2f}s  {elapsed / rounds * 1e6:6.1f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--steps", type=int, default=1_000_000)
+    parser.add_argument("--accuracy", type=float, default=0.7, help="答對的機率")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--big-words", type=int, default=5000, help="大題庫的題數")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    answers = [rng.random() < args.accuracy for _ in range(args.steps)]
+
+    bench_transitions("all correct", QuizEngine(args.words), [True] * args.steps)
+    bench_transitions(f"accuracy {args.accuracy:.0%}", QuizEngine(args.words), answers)
+    bench_transitions(f"accuracy {args.accuracy:.0%}, retry on wrong",
+                      QuizEngine(args.words, advance_on_wrong=False), answers)
+
+    scheduled = QuizEngine(args.words)
+    scheduled.use_scheduler(True)
+    bench_transitions(f"accuracy {args.accuracy:.0%}, SM-2", scheduled, answers)
+
+    bench_transitions(f"{args.big_words} words, accuracy {args.accuracy:.0%}",
+                      QuizEngine(args.big_words), answers)
+    big_scheduled = QuizEngine(args.big_words)
+    big_scheduled.use_scheduler(True)
+    bench_transitions(f"{args.big_words} words, SM-2", big_scheduled, answers)
+    bench_queue(args.big_words)
+
+    engine = QuizEngine(args.words)
+    for correct in answers[:1000]:
+        engine.submit(correct)
+        engine.next()
+    bench_serialize(engine, 100_000)
+
+
+if __name__ == "__main__":
+    main()
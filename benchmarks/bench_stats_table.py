@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+bench_stats_table.py
+側邊欄統計表每次 rerun 的成本：原本每次重跑整個題庫組 DataFrame，
+與 StatsTable (作答後只更新一列、表格依 version 快取) 的比較。
+
+    python benchmarks/bench_stats_table.py --words 30 5000 --reruns 300
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_engine import QuizEngine  # noqa: E402
+from stats_table import StatsTable  # noqa: E402
+
+
+def rebuild(quiz, labels):
+    stats_list = []
+    for i, label in enumerate(labels):
+        total_try = quiz.correct[i] + quiz.wrong[i]
+        rate = f"{quiz.correct[i]}/{total_try}" if total_try > 0 else "0/0"
+        stats_list.append({"狀態": quiz.status(i), "題號": i + 1, "詞彙": label, "正確率": rate})
+    return pd.DataFrame(stats_list)
+
+
+def report(label, n, elapsed):
+    print(f"{label:<40} {n:>6} reruns  {elapsed:6.3f}s  {elapsed / n * 1e6:9.1f} µs/rerun")
+
+
+def run(words, reruns, seed):
+    rng = random.Random(seed)
+    labels = [f"詞{i}" for i in range(words)]
+    answers = [rng.random() < 0.7 for _ in range(reruns)]
+
+    quiz = QuizEngine(words)
+    start = time.perf_counter()
+    for correct in answers:
+        quiz.submit(correct)
+        quiz.next()
+        rebuild(quiz, labels)
+    report(f"{words} words: 每次重組整張表", reruns, time.perf_counter() - start)
+
+    quiz = QuizEngine(words)
+    stats = StatsTable(quiz, labels)
+    start = time.perf_counter()
+    for correct in answers:
+        stats.update(quiz.submit(correct))
+        quiz.next()
+        stats.frame()
+    report(f"{words} words: StatsTable，每次都有作答", reruns, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(reruns):
+        stats.summary()
+        stats.frame()
+    report(f"{words} words: StatsTable，沒有新作答", reruns, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[30, 5000])
+    parser.add_argument("--reruns", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for words in args.words:
+        run(words, args.reruns, args.seed)
+
+
+if __name__ == "__main__":
+    main()
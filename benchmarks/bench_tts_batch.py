@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+bench_tts_batch.py
+用 StubBackend (固定延遲、不連網) 比較逐一合成與平行合成的吞吐量。
+
+    python benchmarks/bench_tts_batch.py --words 40 --latency 0.3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_backends import StubBackend  # noqa: E402
+from tts_batch import SynthesisJob, run_batch  # noqa: E402
+
+
+def make_jobs(out_dir: str, n_words: int):
+    jobs = []
+    for i in range(n_words):
+        for kind, lang in (("word_en", "en"), ("sent_en", "en"), ("sent_zh", "zh-TW"),
+                           ("def_en", "en"), ("def_zh", "zh-TW")):
+            jobs.append(SynthesisJob(os.path.join(out_dir, f"{i:02d}_{kind}.mp3"),
+                                     f"word {i} {kind}", lang, kind))
+    return jobs
+
+
+def bench(label, jobs, **kwargs):
+    start = time.monotonic()
+    results = run_batch(jobs, **kwargs)
+    elapsed = time.monotonic() - start
+    ok = sum(r.ok for r in results)
+    print(f"{label:<28} {len(jobs):>4} jobs  {elapsed:6.2f}s  {len(jobs) / elapsed:6.1f} jobs/s  ok={ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3, help="假後端每次呼叫的延遲秒數")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        jobs = make_jobs(out_dir, args.words)
+        bench("sequential (1 worker)", jobs,
+              backend=StubBackend(args.latency), max_workers=1, rate_per_sec=0)
+        bench(f"parallel ({args.workers} workers, {args.rps} rps)", jobs,
+              backend=StubBackend(args.latency), max_workers=args.workers, rate_per_sec=args.rps)
+        bench("parallel + 10% gTTSError", jobs,
+              backend=StubBackend(args.latency, fail_every=10), max_workers=args.workers,
+              rate_per_sec=args.rps, backoff=0.05)
+
+
+if __name__ == "__main__":
+    main()
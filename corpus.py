@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+corpus.py
+所有 App 與 make_audio_files*.py 共用的題庫載入器：
+1) 每個單元一個 JSON 檔 (corpus/<unit>.json)，欄位統一為
+   word / translation / sentence / sentence_zh / definition / definition_zh /
+   blank_index / audio (音檔種類 -> 音檔 key)，其他欄位 (例如錯別字題的 wrong) 原樣保留
+2) 載入時檢查格式 (缺 word、重複的詞、blank_index 超出句子長度...)，錯誤訊息會指出第幾筆
+3) 同一份題庫在不同 App 有些文字不一樣時 (例如 ELA P45 用半形標點)，
+   寫在 variants 裡：{"variants": {"p45": {"agency": {"translation": "..."}}}}，
+   用 load_unit("ela_p45", variant="p45") 取得覆寫後的題庫
+4) 每個行程只解析一次：依檔案 mtime / 大小判斷是否變動，變動時再依內容 SHA-256
+   決定是否需要重新解析；Streamlit 每次 rerun 都拿到同一份唯讀的題庫
+"""
+
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+
+from audio_manifest import lookup as audio_lookup
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+class CorpusError(ValueError):
+    """題庫檔案格式錯誤。"""
+
+
+class Unit:
+    """一個單元的題庫 (唯讀)。entries 的每一筆都是唯讀 dict，可以直接當成原本的 word_bank 使用。"""
+
+    def __init__(self, name, title, lang, audio_dir, passage, entries, digest, variants=None):
+        self.name = name
+        self.title = title
+        self.lang = lang
+        self.audio_dir = audio_dir
+        self.passage = passage
+        self.entries = entries
+        self.words = tuple(e["word"] for e in entries)
+        self.digest = digest
+        self.variants = variants or {}   # 變體名稱 -> {詞: {欄位: 文字}}
+        self._rows = {}
+        self._variant_units = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rows(self, *fields):
+        """把指定欄位組成 tuple 清單 (例如錯別字題的 QUIZ_WORDS)，同一組欄位只組一次。"""
+        rows = self._rows.get(fields)
+        if rows is None:
+            rows = self._rows[fields] = tuple(tuple(e[f] for f in fields) for e in self.entries)
+        return rows
+
+    def variant(self, name: str) -> "Unit":
+        """套用某個變體的文字覆寫 (同一個變體只組一次)。"""
+        unit = self._variant_units.get(name)
+        if unit is None:
+            if name not in self.variants:
+                raise CorpusError(f"{self.name}：沒有變體「{name}」(可用：{', '.join(self.variants) or '無'})")
+            overrides = self.variants[name]
+            entries = tuple(MappingProxyType({**e, **overrides.get(e["word"], {})}) for e in self.entries)
+            unit = self._variant_units[name] = Unit(
+                f"{self.name}:{name}", self.title, self.lang, self.audio_dir, self.passage, entries, self.digest)
+        return unit
+
+    def audio_path(self, entry, kind: str):
+        """
+        entry 的某種音檔路徑：先查 audio_manifest (支援 --hash-names 檔名)，
+        沒有再用 <audio_dir>/<key>.mp3；這一筆沒有該種音檔時回傳 None。
+        """
+        key = entry.get("audio", {}).get(kind)
+        if key is None:
+            return None
+        return audio_lookup(self.audio_dir, key) or os.path.join(self.audio_dir, f"{key}.mp3")
+
+
+def _fail(path, message, index=None):
+    where = f"第 {index + 1} 筆：" if index is not None else ""
+    raise CorpusError(f"{os.path.basename(path)}：{where}{message}")
+
+
+def _compile_entry(path, index, raw):
+    if not isinstance(raw, dict):
+        _fail(path, "必須是物件", index)
+    word = raw.get("word")
+    if not isinstance(word, str) or not word.strip():
+        _fail(path, "缺少 word", index)
+    for key, value in raw.items():
+        if key in ("blank_index", "audio"):
+            continue
+        if not isinstance(value, str):
+            _fail(path, f"{key} 必須是字串", index)
+
+    entry = dict(raw)
+    if "blank_index" in raw:
+        blank = raw["blank_index"]
+        n_words = len(raw.get("sentence", "").split())
+        if not isinstance(blank, int) or isinstance(blank, bool) or not 0 <= blank < n_words:
+            _fail(path, f"blank_index={blank!r} 超出例句的 {n_words} 個字", index)
+    if "audio" in raw:
+        audio = raw["audio"]
+        if not isinstance(audio, dict) or not all(
+                isinstance(k, str) and isinstance(v, str) and v for k, v in audio.items()):
+            _fail(path, "audio 必須是 {種類: 音檔 key}", index)
+        entry["audio"] = MappingProxyType(dict(audio))
+    return MappingProxyType(entry)
+
+
+def _compile_variants(path, raw, words):
+    """檢查 variants：{變體: {詞: {欄位: 文字}}}，詞必須在題庫裡，只能覆寫文字欄位。"""
+    if not isinstance(raw, dict):
+        _fail(path, "variants 必須是 {變體: {詞: {欄位: 文字}}}")
+    variants = {}
+    for name, overrides in raw.items():
+        if not isinstance(overrides, dict):
+            _fail(path, f"variants.{name} 必須是 {{詞: {{欄位: 文字}}}}")
+        for word, fields in overrides.items():
+            if word not in words:
+                _fail(path, f"variants.{name}：題庫裡沒有「{word}」")
+            if not isinstance(fields, dict) or not all(
+                    isinstance(v, str) and k not in ("word", "blank_index", "audio") for k, v in fields.items()):
+                _fail(path, f"variants.{name}.{word} 只能覆寫文字欄位")
+        variants[name] = {word: dict(fields) for word, fields in overrides.items()}
+    return variants
+
+
+def compile_unit(path: str, data: bytes, digest: str) -> Unit:
+    """解析並檢查一個單元的 JSON。"""
+    try:
+        raw = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise CorpusError(f"{os.path.basename(path)}：不是合法的 JSON ({e})")
+    if not isinstance(raw, dict):
+        _fail(path, "最外層必須是物件")
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    if raw.get("unit", name) != name:
+        _fail(path, f"unit 欄位 ({raw.get('unit')}) 與檔名不一致")
+    items = raw.get("entries")
+    if not isinstance(items, list) or not items:
+        _fail(path, "entries 必須是非空的清單")
+
+    entries = tuple(_compile_entry(path, i, item) for i, item in enumerate(items))
+    seen = set()
+    for i, entry in enumerate(entries):
+        if entry["word"] in seen:
+            _fail(path, f"重複的詞「{entry['word']}」", i)
+        seen.add(entry["word"])
+    variants = _compile_variants(path, raw.get("variants", {}), seen)
+
+    return Unit(
+        name=name,
+        title=raw.get("title", name),
+        lang=raw.get("lang", "zh-tw"),
+        audio_dir=raw.get("audio_dir", "audio"),
+        passage=raw.get("passage", ""),
+        entries=entries,
+        digest=digest,
+        variants=variants,
+    )
+
+
+class CorpusLoader:
+    """依檔案內容快取已解析的單元，執行緒安全。"""
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR):
+        self.corpus_dir = corpus_dir
+        self._lock = threading.Lock()
+        self._by_path = {}     # 路徑 -> (mtime_ns, size, Unit)
+        self._by_digest = {}   # 內容 SHA-256 -> Unit
+        self.loads = 0
+        self.compiles = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.corpus_dir, f"{name}.json")
+
+    def units(self):
+        """所有單元名稱 (依檔名排序)。"""
+        return sorted(n[:-5] for n in os.listdir(self.corpus_dir) if n.endswith(".json"))
+
+    def load(self, name: str) -> Unit:
+        path = self.path(name)
+        st_ = os.stat(path)
+        with self._lock:
+            self.loads += 1
+            cached = self._by_path.get(path)
+            if cached and cached[:2] == (st_.st_mtime_ns, st_.st_size):
+                return cached[2]
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            unit = self._by_digest.get(digest)
+        compiled = unit is None or unit.name != name
+        if compiled:
+            unit = compile_unit(path, data, digest)
+        with self._lock:
+            self.compiles += compiled
+            self._by_digest[digest] = unit
+            self._by_path[path] = (st_.st_mtime_ns, st_.st_size, unit)
+        return unit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loads": self.loads, "compiles": self.compiles, "units": len(self._by_path)}
+
+
+_default_loader = None
+_default_lock = threading.Lock()
+
+
+def get_corpus_loader() -> CorpusLoader:
+    """整個 Python 行程共用一個。"""
+    global _default_loader
+    if _default_loader is None:
+        with _default_lock:
+            if _default_loader is None:
+                _default_loader = CorpusLoader()
+    return _default_loader
+
+
+def load_unit(name: str, variant: str = None) -> Unit:
+    """App 端使用的捷徑，例如 load_unit("ela_p45").entries、load_unit("ela_p45", variant="p45")。"""
+    unit = get_corpus_loader().load(name)
+    return unit.variant(variant) if variant else unit
+
+
+if __name__ == "__main__":
+    # python corpus.py：檢查所有單元的格式
+    loader = get_corpus_loader()
+    for unit_name in loader.units():
+        unit = loader.load(unit_name)
+        variants = f" (變體：{', '.join(unit.variants)})" if unit.variants else ""
+        print(f"✅ {unit_name}: {unit.title}，{len(unit)} 筆{variants}")
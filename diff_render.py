@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+diff_render.py
+答錯時顯示的「正確答案 ⬇️ 你的輸入」逐字比對 HTML (原本各 App 的 get_diff_html)：
+1) 完全答對時不建 difflib.SequenceMatcher，直接整排標成正確 (equality fast path)
+2) 每種狀態 (ok 正確 / bad 錯誤 / gap 缺字) 的 <span ...> 開頭事先組好，
+   (狀態, 字元) 組成的整個 span 也記在表裡，同一個字再出現時只剩一次查表
+3) 同一組 (正確答案, 輸入) 的結果放在 LRU 快取 (整個行程共用，全班答錯同一題時只算一次)
+4) compact=True 時改用 CSS class (樣式表由 diff_css() 產生，theme.py 把它併進共用樣式表)：
+   同狀態連續的字合併成一段 <span class='diff-ok'>，每個字只剩一個 <i>字</i>，
+   不再帶一長串 inline style (89 字的整句比對從約 34 KB 降到約 2 KB)
+
+    html_content = render_diff("乾淨", "乾靜", "box", compact=True)        # 002_ch_u10.py 的方塊樣式
+    html_content = render_diff("apple", "aple", "letter", compact=True)    # 003_ELA_P45.py 的字母樣式
+"""
+
+import difflib
+import html
+import threading
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+
+OK, BAD, GAP = "ok", "bad", "gap"
+GAP_CHAR = "_"
+CACHE_SIZE = 512
+
+def diff_cells(correct: str, answer: str):
+    """
+    逐字比對，回傳 (上排, 下排)，每排是 [(狀態, 字元), ...]；兩排一樣長，缺字以 "_" 補上。
+    對齊方式與 difflib.SequenceMatcher 相同；答對、沒有作答或完全沒有共同字元時不必建 SequenceMatcher。
+    """
+    if correct == answer:
+        row = [(OK, ch) for ch in correct]
+        return row, list(row)
+
+    if not correct or not answer or not set(correct) & set(answer):
+        # SequenceMatcher 在這些情況下只會回傳一段 insert / delete / replace
+        opcode = "insert" if not correct else "delete" if not answer else "replace"
+        opcodes = [(opcode, 0, len(correct), 0, len(answer))]
+    else:
+        opcodes = difflib.SequenceMatcher(None, correct, answer).get_opcodes()
+
+    top, bottom = [], []
+    for opcode, a1, a2, b1, b2 in opcodes:
+        A = correct[a1:a2]
+        B = answer[b1:b2]
+        if opcode == "equal":
+            top += [(OK, ch) for ch in A]
+            bottom += [(OK, ch) for ch in B]
+        elif opcode == "replace":
+            for i in range(max(len(A), len(B))):
+                top.append((BAD, A[i] if i < len(A) else GAP_CHAR))
+                bottom.append((BAD, B[i] if i < len(B) else GAP_CHAR))
+        elif opcode == "delete":
+            top += [(BAD, ch) for ch in A]
+            bottom += [(GAP, GAP_CHAR)] * len(A)
+        elif opcode == "insert":
+            top += [(GAP, GAP_CHAR)] * len(B)
+            bottom += [(BAD, ch) for ch in B]
+    return top, bottom
+
+
+class DiffStyle:
+    """
+    一種比對外觀：每個字的共用樣式、三種狀態的顏色、包住上下兩排的外框，
+    以及 compact 輸出時外框各部分的樣式 (frame：選擇器 -> 樣式，"" 表示外框本身)。
+    """
+
+    def __init__(self, name: str, cell: str, colors: dict, template: str, frame: dict,
+                 fold_case: bool = False):
+        self.name = name
+        self.cell = cell                # 每個字共用的 inline style
+        self.colors = colors            # 狀態 -> 顏色 style
+        self.template = template        # 含 {top}、{bottom} 的外框 HTML (inline 輸出)
+        self.frame = frame
+        self.fold_case = fold_case      # 英文單字不分大小寫比對
+
+    def css(self) -> str:
+        """
+        compact 輸出用的樣式表：外框是 .diff-<name>，每個字是裡面的 <i>，
+        同狀態連續的字包在同一個 .diff-<狀態> 裡。
+        """
+        scope = f".diff-{self.name}"
+        rules = [f"{scope}{' ' + part if part else ''}{{{style}}}" for part, style in self.frame.items()]
+        rules.append(f"{scope} i{{font-style:normal;{self.cell}}}")
+        rules += [f"{scope} .diff-{status} i{{{color}}}" for status, color in self.colors.items()]
+        return "".join(rules)
+
+
+class DiffRenderer:
+    """把 diff_cells() 的結果組成 HTML，結果依 (正確答案, 輸入, compact) 做 LRU 快取，執行緒安全。"""
+
+    def __init__(self, style: DiffStyle, cache_size: int = CACHE_SIZE):
+        self.style = style
+        self.cache_size = cache_size
+        # 事先組好每種狀態的 <span> 開頭：inline 輸出每個字一個，compact 輸出每一段同狀態的字一個
+        self._inline = {status: f"<span style='{color}{style.cell}'>"
+                        for status, color in style.colors.items()}
+        self._runs = {status: f"<span class='diff-{status}'>" for status in style.colors}
+        # 外框事先切成三段，組裝時直接相接 (不必每次 str.format)
+        head, rest = style.template.split("{top}")
+        compact = (f"<div class='diff-{style.name}'><div class='diff-top'>", "</div><div class='diff-arrow'>⬇️</div><div>",
+                   "</div></div>")
+        self._frames = ((head, *rest.split("{bottom}")), compact)   # (inline, compact)
+        # 查表：inline 為 (狀態, 字元) -> 完整的 <span>…</span>，compact 為 字元 -> <i>…</i>
+        self._spans = {}
+        self._chars = {}
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # (correct, answer, compact) -> HTML
+        self.hits = 0
+        self.misses = 0
+
+    def _row(self, cells) -> str:
+        spans = self._spans
+        parts = []
+        for cell in cells:
+            span = spans.get(cell)
+            if span is None:
+                status, ch = cell
+                span = spans[cell] = self._inline[status] + html.escape(ch) + "</span>"
+            parts.append(span)
+        return "".join(parts)
+
+    def _compact_row(self, cells) -> str:
+        """同狀態連續的字合併成一段 (run-length)：<span class='diff-ok'><i>乾</i><i>淨</i></span>。"""
+        chars = self._chars
+        parts = []
+        for status, run in groupby(cells, key=itemgetter(0)):
+            parts.append(self._runs[status])
+            for _, ch in run:
+                tag = chars.get(ch)
+                if tag is None:
+                    tag = chars[ch] = "<i>" + html.escape(ch) + "</i>"
+                parts.append(tag)
+            parts.append("</span>")
+        return "".join(parts)
+
+    def render(self, correct: str, answer: str, compact: bool = False) -> str:
+        if self.style.fold_case:
+            correct, answer = correct.lower(), answer.lower()
+        key = (correct, answer, compact)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+
+        top, bottom = diff_cells(correct, answer)
+        row = self._compact_row if compact else self._row
+        head, mid, tail = self._frames[compact]
+        text = head + row(top) + mid + row(bottom) + tail
+
+        if self.cache_size <= 0:
+            return text
+        with self._lock:
+            self._cache[key] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"style": self.style.name, "entries": len(self._cache),
+                    "hits": self.hits, "misses": self.misses}
+
+
+# --- 各 App 使用的外觀 (與原本 get_diff_html 的輸出相同) ---
+
+STYLES = {
+    # 002_ch_u10.py：Duolingo 風格的中文方塊
+    "box": DiffStyle(
+        "box",
+        cell="display:inline-block;width:35px;height:45px;line-height:45px;margin:2px;border-radius:8px;"
+             "font-family:Arial, sans-serif;text-align:center;font-size:27px;font-weight:600;",
+        colors={OK: "background:#58CC02;color:white;",
+                BAD: "background:#FF4B4B;color:white;",
+                GAP: "background:#E5E5E5;color:white;"},
+        template="""<div style='text-align:left;margin-top:10px;margin-bottom:10px;'>
+        <div style='margin-bottom:5px;'>{top}</div>
+        <div style='font-size:15px;margin:5px;color:#666;'>⬇️</div>
+        <div>{bottom}</div>
+    </div>""",
+        frame={"": "text-align:left;margin-top:10px;margin-bottom:10px;",
+               ".diff-top": "margin-bottom:5px;",
+               ".diff-arrow": "font-size:15px;margin:5px;color:#666;"},
+    ),
+    # 003_ELA_P45.py：英文字母 (不分大小寫)
+    "letter": DiffStyle(
+        "letter",
+        cell="display:inline-block;width:20px;height:32px;line-height:27px;margin:1px;border-radius:4px;"
+             "font-family:monospace;text-align:center;font-size:36px;",
+        colors={OK: "background:#ddffdd;",
+                BAD: "background:#b22222;color:white;",
+                GAP: "background:#eeeeee;color:#888;"},
+        template="""<div style='text-align:center;margin-top:12px;'>
+        {top}
+        <div style='font-size:13px;margin:3px;'>⬇️</div>
+        {bottom}
+    </div>""",
+        frame={"": "text-align:center;margin-top:12px;",
+               ".diff-arrow": "font-size:13px;margin:3px;"},
+        fold_case=True,
+    ),
+}
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(style: str) -> DiffRenderer:
+    """整個 Python 行程共用的 DiffRenderer (每種外觀一個)。"""
+    renderer = _renderers.get(style)
+    if renderer is None:
+        with _renderers_lock:
+            renderer = _renderers.get(style)
+            if renderer is None:
+                if style not in STYLES:
+                    raise ValueError(f"未知的比對外觀：{style} (可用：{', '.join(STYLES)})")
+                renderer = _renderers[style] = DiffRenderer(STYLES[style])
+    return renderer
+
+
+def diff_css() -> str:
+    """所有外觀的 compact 樣式表 (theme.py 併進共用樣式表，每個 session 只送一次)。"""
+    return "".join(style.css() for style in STYLES.values())
+
+
+def render_diff(correct: str, answer: str, style: str = "box", compact: bool = False) -> str:
+    """正確答案與輸入的逐字比對 HTML (取代各 App 的 get_diff_html)。"""
+    return get_renderer(style).render(correct, answer, compact)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+feedback.py
+作答後顯示的結果訊息 (取代各 App 的 last_message 字串：
+"HTML_DIFF_START…|DIFF_SEP|…HTML_DIFF_END" 標記、"答對了" in message 之類的字串判斷)：
+1) 送出答案時建立一次 Feedback (種類、判定、說明、答案比對、提示音)，顯示時直接使用，不再拆字串
+2) 答案比對只記 (正確答案, 輸入, 外觀)，顯示時才由 diff_render 產生 (有 LRU 快取)
+3) 換輪訊息 (quiz_engine 的 REVIEW_DONE / REVIEW_START / ROUND_DONE) 各 App 共用同一份
+4) show_feedback() 依版面輸出：banner (國語 U8、U9、ELA P30 / P45)、card (國語 U10)、alert (ELA P45_2)
+
+    st.session_state.feedback = Feedback(WRONG, "答錯！", f"正確答案是：{word}", sound=WRONG_SOUND)
+    ...
+    show_feedback(st.session_state.feedback, "banner")
+"""
+
+import html
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+import streamlit as st
+
+from diff_render import render_diff
+from quiz_engine import REVIEW_DONE, REVIEW_START, ROUND_DONE
+
+CORRECT, WRONG, INFO = "correct", "wrong", "info"
+KIND_ICONS = {CORRECT: "✅", WRONG: "❌", INFO: "ℹ️"}
+
+CORRECT_SOUND = "audio/duolingo_style_correct.mp3"
+WRONG_SOUND = "audio/dong_dong.mp3"
+
+
+@dataclass(frozen=True)
+class Feedback:
+    """一則結果訊息；建立後不再修改 (要改就用 dataclasses.replace 建新的)。"""
+    kind: str                           # CORRECT / WRONG / INFO，決定顯示的樣式
+    title: str                          # 判定，例如 "答對了！"、"答錯！"
+    text: str = ""                      # 接在判定後面的說明，例如 "正確答案是：乾淨"
+    icon: str = ""                      # 空白時用種類的圖示 (✅ / ❌ / ℹ️)
+    diff: Optional[Tuple[str, str, str]] = None   # (正確答案, 輸入, diff_render 的外觀)
+    sound: str = ""                     # 要播放的本地提示音
+    notice: str = ""                    # 顯示在最前面的提示 (例如最後一題答錯後進入錯題複習)
+
+    @property
+    def label(self) -> str:
+        """圖示 + 判定 + 說明；沒有判定時只有說明。"""
+        if not self.title:
+            return self.text
+        return f"{self.icon or KIND_ICONS[self.kind]} {self.title}{self.text}"
+
+    def diff_html(self) -> str:
+        if self.diff is None:
+            return ""
+        correct, answer, style = self.diff
+        return render_diff(correct, answer, style, compact=True)
+
+
+# 換輪訊息 (所有 App 共用)
+ROUND_FEEDBACK = {
+    REVIEW_DONE: Feedback(CORRECT, "錯題複習完畢！開始新的一輪！", icon="🎉"),
+    REVIEW_START: Feedback(INFO, "一輪結束，進入錯題複習模式！", icon="🔄"),
+    ROUND_DONE: Feedback(CORRECT, "太強了！全部答對，直接開始新的一輪！", icon="💯"),
+}
+
+
+def round_feedback(event: str, feedback: Optional[Feedback] = None, keep_diff: bool = False) -> Feedback:
+    """
+    quiz.next() 換輪時要顯示的訊息，提示音沿用這次作答的。
+    keep_diff=True 而且這次作答有比對時，保留比對與說明，換輪訊息放在最前面。
+    """
+    sound = feedback.sound if feedback else ""
+    if keep_diff and feedback and feedback.diff:
+        return replace(feedback, title="", notice=ROUND_FEEDBACK[event].label)
+    return replace(ROUND_FEEDBACK[event], sound=sound)
+
+
+def _banner(feedback: Feedback) -> str:
+    notice = f"{html.escape(feedback.notice)}<br><br>" if feedback.notice else ""
+    return (f'<div class="feedback-banner feedback-{feedback.kind}">'
+            f'<span class="feedback-text">{notice}{html.escape(feedback.label)}</span>'
+            f'{feedback.diff_html()}</div>')
+
+
+def _card(feedback: Feedback) -> str:
+    css_class = {CORRECT: "success-message", WRONG: "error-message", INFO: "info-message"}[feedback.kind]
+    if feedback.diff:
+        # 有比對時一律用淺色的 error-message 外框，比對方塊本身就有顏色
+        css_class = "error-message"
+    notice = f"{html.escape(feedback.notice)}<br><br>" if feedback.notice else ""
+    return f'<div class="{css_class}">{notice}{html.escape(feedback.label)}{feedback.diff_html()}</div>'
+
+
+def show_feedback(feedback: Feedback, layout: str = "banner"):
+    """依版面顯示一則結果訊息 (banner / card 的樣式在 theme.css)。"""
+    if layout == "alert":
+        {CORRECT: st.success, WRONG: st.error, INFO: st.info}[feedback.kind](feedback.label)
+    elif layout == "card":
+        st.markdown(_card(feedback), unsafe_allow_html=True)
+    elif layout == "banner":
+        if feedback.kind == INFO and not feedback.diff:
+            st.info(feedback.label)
+        else:
+            st.markdown(_banner(feedback), unsafe_allow_html=True)
+    else:
+        raise ValueError(f"未知的訊息版面：{layout} (可用：banner、card、alert)")
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+focus.py
+每出一題就把游標放進作答輸入框一次 (取代各 App 的 setInterval / MutationObserver 輪詢聚焦腳本)：
+1) 腳本直接放進頁面 (st.html，不用 iframe)，依輸入框的 key 找到「這一題」的輸入框
+2) 腳本內容含 key，換題時 HTML 不同才會重新執行；同一題的其他 rerun (按發音、側邊欄更新)
+   HTML 相同，Streamlit 不會重畫，也就不會搶走焦點
+3) 輸入框還沒畫出來時才短暫觀察 DOM，聚焦成功或 WAIT_MS 之後就停止，平常不做任何輪詢
+
+    with st.form(key=f"form_{current_index}", clear_on_submit=True):
+        st.text_input("...", key=input_key)
+        ...
+    focus_input(input_key)
+"""
+
+import html
+import json
+import re
+
+import streamlit as st
+
+# 等輸入框出現的上限 (毫秒)
+WAIT_MS = 2000
+
+_SCRIPT = """<script data-focus="__KEY__">
+(() => {
+  const selector = "." + CSS.escape(__CLASS__) + " input";
+  const focus = () => {
+    const input = document.querySelector(selector);
+    if (!input) return false;
+    if (document.activeElement !== input) input.focus({preventScroll: true});
+    return true;
+  };
+  if (focus()) return;
+  const observer = new MutationObserver(() => { if (focus()) observer.disconnect(); });
+  observer.observe(document.body, {childList: true, subtree: true});
+  setTimeout(() => observer.disconnect(), __WAIT_MS__);
+})();
+</script>"""
+
+
+def key_class(key: str) -> str:
+    """Streamlit 幫有 key 的元素加的 CSS class (非英數字元換成 "-")。"""
+    return "st-key-" + re.sub(r"[^a-zA-Z0-9_-]", "-", key.strip())
+
+
+def focus_input(key: str):
+    """把焦點放進 key 為 key 的 st.text_input；同一個 key 只會執行一次。"""
+    st.html(
+        _SCRIPT
+        .replace("__KEY__", html.escape(key))
+        .replace("__CLASS__", json.dumps(key_class(key)))
+        .replace("__WAIT_MS__", str(WAIT_MS)),
+        unsafe_allow_javascript=True,
+    )
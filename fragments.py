@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+fragments.py
+各 App 拆成 st.fragment 時共用的小工具：
+1) 出題區、發音按鈕、側邊欄各自是一個 fragment，互動時只重跑自己那一段，
+   不必每次重送整頁的 CSS、圖片與側邊欄表格
+2) 出題區與側邊欄用固定的 key (QUIZ_FRAGMENT / SIDEBAR_FRAGMENT)；送出答案的 on_click
+   呼叫 rerun_after_submit()，兩者一起重跑一次。側邊欄不再定時重跑，沒人作答時不耗任何資源
+"""
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+# @st.fragment(key=...) 用的名稱
+QUIZ_FRAGMENT = "quiz_area"
+SIDEBAR_FRAGMENT = "sidebar_panel"
+
+
+def rerun_after_submit():
+    """在送出答案的 on_click 裡呼叫：只重跑出題區與側邊欄 (其他 fragment 與整頁都不動)。"""
+    try:
+        st.rerun([QUIZ_FRAGMENT, SIDEBAR_FRAGMENT])
+    except StreamlitAPIException:
+        st.rerun()
@@ -1,28 +1,13 @@
 # make_audio_files.py
-from gtts import gTTS
+import argparse
 
-words = [
-    "開開心心",
-    "大街上",
-    "滿街",
-    "雙眼",
-    "看哪看",
-    "左思右想",
-    "胖國王",
-    "衣裳",
-    "一針一線",
-    "簡單",
-    "聰明",
-    "大臣",
-    "不敢",
-    "東西",
-    "慌張",
-    "一直",
-    "好棒"
-]
+from corpus import load_unit
+from tts_batch import SynthesisJob, add_batch_arguments, run_from_args
 
-for w in words:
-    tts = gTTS(w, lang="zh-tw")
-    filename = f"audio_u7/{w}.mp3"
-    tts.save(filename)
-    print("已產生：", filename)
+# 題庫 (corpus/ch_u7.json，與 002_ch_u7.py 共用)
+unit = load_unit("ch_u7")
+
+if __name__ == "__main__":
+    args = add_batch_arguments(argparse.ArgumentParser(description="產生 U7 詞彙 mp3")).parse_args()
+    jobs = [SynthesisJob(unit.audio_path(e, "word"), e["word"], unit.lang, e["word"]) for e in unit.entries]
+    run_from_args(jobs, args)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+progress_store.py
+把每個學生、每個單元的作答進度 (QuizEngine 狀態與作答紀錄) 存起來，
+重新整理瀏覽器或伺服器重開後可以接著做，不必整個單元重來。
+1) 後端可替換：SqliteBackend (預設，單一檔案)、MemoryBackend (測試與基準測試用)，
+   用環境變數 PROGRESS_BACKEND 選擇
+2) 作答時 save() 只把最新狀態放進記憶體 (同一個學生同一個單元只留最後一次)，
+   背景執行緒每 flush_interval 秒 (或累積 max_pending 筆時) 用一個交易整批寫入，
+   按下送出不必等磁碟；超出進度檔範圍的舊作答紀錄也由同一個執行緒附加寫入 spill 檔
+3) 學生 id 放在網址的 ?learner=...，重新整理或收藏網址都會拿回同一份進度；
+   session 第一次執行時才從資料庫讀取 (load_quiz)
+
+    store = get_progress_store()
+    learner = learner_id(st.query_params, st.session_state)
+    saved = store.load_quiz(learner, "ch_u8", digest)     # (QuizEngine, AnswerHistory) 或 None
+    history = store.new_history(learner, "ch_u8")         # 沒有存過時的空白作答紀錄
+    store.save_quiz(learner, "ch_u8", digest, quiz, history)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from answer_history import AnswerHistory, append_rows
+from quiz_engine import QuizEngine
+
+# 資料庫位置與寫入頻率 (可用環境變數覆寫)
+PROGRESS_DB = os.environ.get(
+    "PROGRESS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".progress", "progress.sqlite3"),
+)
+FLUSH_SECONDS = float(os.environ.get("PROGRESS_FLUSH_SECONDS", "2"))
+MAX_PENDING = 256
+# 資料庫只保存最近幾筆作答紀錄 (側邊欄顯示用；完整紀錄在 AnswerHistory 的 spill 檔)
+HISTORY_LIMIT = 200
+HISTORY_DIR = os.environ.get("PROGRESS_HISTORY_DIR", os.path.join(os.path.dirname(PROGRESS_DB), "history"))
+STATE_VERSION = 1
+
+LEARNER_PARAM = "learner"
+LEARNER_KEY = "learner_id"
+_LEARNER_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def bank_digest(items) -> str:
+    """題庫內容的穩定摘要 (不同行程也相同，不像 hash())，題庫改變時舊進度就不再套用。"""
+    return hashlib.sha256(repr(tuple(items)).encode("utf-8")).hexdigest()[:16]
+
+
+def learner_id(query_params, session_state) -> str:
+    """
+    目前學生的 id：網址的 ?learner= 優先，其次是這個 session 記住的 id，都沒有就產生一個新的。
+    結果同時寫回網址與 session_state (切換單元時網址參數會被清掉，下一次執行再補上)。
+    """
+    value = query_params.get(LEARNER_PARAM)
+    if not value or not _LEARNER_RE.match(value):
+        value = session_state.get(LEARNER_KEY) or uuid.uuid4().hex[:12]
+    if query_params.get(LEARNER_PARAM) != value:
+        query_params[LEARNER_PARAM] = value
+    session_state[LEARNER_KEY] = value
+    return value
+
+
+class ProgressBackend:
+    """後端基底類別：state 是可轉成 JSON 的 dict。"""
+    name = "base"
+
+    def load(self, learner: str, unit: str):
+        """回傳存過的 state；沒有時回傳 None。"""
+        raise NotImplementedError
+
+    def save_many(self, records):
+        """records: [(learner, unit, state), ...]，整批寫入 (全部成功或全部失敗)。"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(ProgressBackend):
+    """只存在記憶體 (行程結束就消失)，仍會經過 JSON 編碼，行為與 SqliteBackend 一致。"""
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def load(self, learner, unit):
+        with self._lock:
+            raw = self._rows.get((learner, unit))
+        return json.loads(raw) if raw is not None else None
+
+    def save_many(self, records):
+        encoded = {(learner, unit): json.dumps(state, ensure_ascii=False)
+                   for learner, unit, state in records}
+        with self._lock:
+            self._rows.update(encoded)
+
+
+class SqliteBackend(ProgressBackend):
+    """單一 SQLite 檔案，每個 (learner, unit) 一列。"""
+    name = "sqlite"
+
+    def __init__(self, path: str = PROGRESS_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # 背景寫入與 App 讀取在不同執行緒，共用一條連線並以 _lock 保護
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            " learner TEXT NOT NULL, unit TEXT NOT NULL, state TEXT NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (learner, unit))"
+        )
+
+    def load(self, learner, unit):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM progress WHERE learner = ? AND unit = ?", (learner, unit)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def save_many(self, records):
+        now = time.time()
+        rows = [(learner, unit, json.dumps(state, ensure_ascii=False), now)
+                for learner, unit, state in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO progress (learner, unit, state, updated) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (learner, unit) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                    rows,
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    "sqlite": SqliteBackend,
+    "memory": MemoryBackend,
+}
+
+
+def make_backend(name: str) -> ProgressBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的進度後端：{name} (可用：{', '.join(BACKENDS)})")
+
+
+class ProgressStore:
+    """合併寫入、背景整批寫進後端的進度儲存，執行緒安全。"""
+
+    def __init__(self, backend: ProgressBackend = None,
+                 flush_interval: float = FLUSH_SECONDS, max_pending: int = MAX_PENDING):
+        self.backend = backend or SqliteBackend()
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # 同一時間只有一批在寫
+        self._pending = {}                    # (learner, unit) -> state，只留最新的
+        self._spills = {}                     # spill 檔路徑 -> 還沒寫入的舊作答紀錄 (由舊到新)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.saves = 0
+        self.coalesced = 0                    # 被同一列較新的狀態覆蓋、沒有真的寫入的次數
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    def _start(self):
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._run, name="progress-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def save(self, learner: str, unit: str, state: dict, spill=None):
+        """
+        記下最新狀態，稍後由背景執行緒寫入；不會等磁碟。
+        spill=(路徑, 紀錄 list) 時，這些紀錄會在同一次 flush 裡先附加寫入該檔案。
+        """
+        with self._lock:
+            key = (learner, unit)
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = state
+            if spill:
+                path, rows = spill
+                self._spills.setdefault(path, []).extend(rows)
+            self.saves += 1
+            full = len(self._pending) >= self.max_pending
+            self._start()
+        if full:
+            self._wake.set()
+
+    def load(self, learner: str, unit: str):
+        """讀取狀態；還沒寫入的最新狀態優先。"""
+        with self._lock:
+            state = self._pending.get((learner, unit))
+        if state is not None:
+            return state
+        return self.backend.load(learner, unit)
+
+    def flush(self) -> int:
+        """
+        把目前累積的狀態用一個交易寫入，回傳寫入筆數。寫入失敗時放回佇列，下次再試。
+        spill 檔先寫 (寧可重複一筆，也不要進度檔已經不含、spill 檔卻還沒寫到)。
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                spills, self._spills = self._spills, {}
+            if not batch and not spills:
+                return 0
+            try:
+                while spills:
+                    path = next(iter(spills))
+                    append_rows(path, spills[path])
+                    del spills[path]
+                if batch:
+                    self.backend.save_many([(learner, unit, state) for (learner, unit), state in batch.items()])
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                    # 等待寫入的期間又有新的狀態時，以新的為準；沒寫成的舊紀錄排回較新的紀錄前面
+                    for key, state in batch.items():
+                        self._pending.setdefault(key, state)
+                    for path, rows in spills.items():
+                        self._spills[path] = rows + self._spills.get(path, [])
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.written += len(batch)
+            return len(batch)
+
+    def close(self):
+        """停止背景執行緒並寫入剩下的狀態。"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    # --- QuizEngine 專用 ---
+
+    def new_history(self, learner: str, unit: str, rows=()) -> AnswerHistory:
+        """這個學生這個單元的作答紀錄；超過上限的舊紀錄寫到 HISTORY_DIR/<learner>_<unit>.jsonl。"""
+        return AnswerHistory(rows, spill_path=os.path.join(HISTORY_DIR, f"{learner}_{unit}.jsonl"))
+
+    def save_quiz(self, learner: str, unit: str, digest: str, quiz: QuizEngine, history: AnswerHistory):
+        # 只存最近 HISTORY_LIMIT 筆；更舊的交給背景執行緒寫進 spill 檔 (和這份狀態同一批)
+        tail = history.persist_tail(HISTORY_LIMIT)
+        rows = history.take_spill()
+        self.save(learner, unit, {
+            "version": STATE_VERSION,
+            "digest": digest,
+            "quiz": quiz.to_dict(),
+            "history": tail,
+        }, spill=(history.spill_path, rows) if rows and history.spill_path else None)
+
+    def load_quiz(self, learner: str, unit: str, digest: str):
+        """回傳 (QuizEngine, AnswerHistory)；沒有存過、題庫已改變或資料損壞時回傳 None。"""
+        state = self.load(learner, unit)
+        if not state or state.get("version") != STATE_VERSION or state.get("digest") != digest:
+            return None
+        try:
+            return QuizEngine.from_dict(state["quiz"]), self.new_history(learner, unit, state.get("history", []))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "saves": self.saves,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "written": self.written,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "spill_pending": sum(len(rows) for rows in self._spills.values()),
+            }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """
+    整個 Python 行程共用一個 (行程結束前會寫入剩下的狀態)。可用環境變數設定：
+      PROGRESS_BACKEND=sqlite         後端 (sqlite / memory)
+      PROGRESS_DB=/data/progress.db   SQLite 檔案位置
+      PROGRESS_FLUSH_SECONDS=2        背景寫入的間隔
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                backend = make_backend(os.environ.get("PROGRESS_BACKEND", "sqlite"))
+                _default_store = ProgressStore(backend)
+                atexit.register(_default_store.close)
+    return _default_store
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+quiz_engine.py
+所有聽寫 / 測驗 App 共用的出題狀態機，不依賴 Streamlit：
+1) LEARNING：依序出題，答錯的題目加入錯題佇列
+2) 一輪結束時佇列不是空的就進入 REVIEW，依佇列順序複習：
+   答對移出佇列、答錯移到佇列尾端；佇列清空後開始新的一輪
+3) App 只負責判斷對錯與畫面：submit() 記錄一次作答，next() 前進到下一題，
+   next() 的回傳值告訴 App 要不要顯示「進入複習」「複習完畢」之類的訊息
+4) 錯題佇列是 ReviewQueue：查詢、移除任意一題、把第一題移到尾端都是 O(1)，
+   題庫有上千題時每次作答的成本也不會變
+5) use_scheduler(True) 切換成 SCHEDULED 間隔複習模式 (scheduler.py 的 SM-2)：
+   不再分一輪一輪，依每題的熟練度決定下一題；答對 / 答錯次數與錯題佇列照常更新
+6) 狀態只有幾個整數與 list，to_dict() / from_dict() 可直接存成 JSON
+
+    engine = QuizEngine(len(word_bank))
+    engine.submit(user_text == word_bank[engine.current]["word"])
+    event = engine.next()    # None / REVIEW_START / REVIEW_DONE / ROUND_DONE
+"""
+
+from collections import OrderedDict
+
+from scheduler import Sm2Scheduler
+
+LEARNING = "LEARNING"
+REVIEW = "REVIEW"
+SCHEDULED = "SCHEDULED"
+
+# next() 的回傳值
+REVIEW_START = "review_start"   # 一輪結束，進入錯題複習
+REVIEW_DONE = "review_done"     # 錯題複習完畢，開始新的一輪
+ROUND_DONE = "round_done"       # 一輪全部答對，直接開始新的一輪
+
+
+class ReviewQueue:
+    """
+    依加入順序排列、不重複的題號佇列 (以 OrderedDict 當作有序集合)。
+    in / add / discard / first / rotate 都是 O(1)，取代原本 list 的 in、remove(i)、pop(0)。
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items=()):
+        self._items = OrderedDict.fromkeys(items)
+
+    def __contains__(self, index) -> bool:
+        return index in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, index):
+        """加到尾端；已經在佇列裡就不動。"""
+        if index not in self._items:
+            self._items[index] = None
+
+    def discard(self, index):
+        self._items.pop(index, None)
+
+    def first(self) -> int:
+        """佇列第一題；佇列是空的時丟出 IndexError。"""
+        for index in self._items:
+            return index
+        raise IndexError("錯題佇列是空的")
+
+    def rotate(self):
+        """把第一題移到尾端。"""
+        self._items.move_to_end(self.first())
+
+    def __repr__(self):
+        return f"ReviewQueue({list(self._items)})"
+
+
+class QuizEngine:
+    """
+    一個學生的作答進度。advance_on_wrong=False 時，LEARNING 模式答錯會停在同一題
+    (u8_doligo2.py 的「再試一次」)，答對才前進。
+    """
+
+    __slots__ = ("total", "advance_on_wrong", "mode", "cursor", "wrong_queue",
+                 "correct", "wrong", "last", "retry", "scheduler")
+
+    def __init__(self, total: int, advance_on_wrong: bool = True):
+        if total <= 0:
+            raise ValueError("題庫至少要有一題")
+        self.total = total
+        self.advance_on_wrong = advance_on_wrong
+        self.mode = LEARNING
+        self.cursor = 0             # LEARNING 模式目前的題號
+        self.wrong_queue = ReviewQueue()  # 待複習的題號，依答錯順序
+        self.correct = [0] * total  # 每題答對次數
+        self.wrong = [0] * total    # 每題答錯次數
+        self.last = [None] * total  # 每題最近一次作答是否正確 (還沒作答為 None)
+        self.retry = False          # 答錯且不前進，下一次 next() 停在同一題
+        self.scheduler = None       # SCHEDULED 模式的 Sm2Scheduler
+
+    @property
+    def current(self) -> int:
+        """目前要顯示的題號。"""
+        if self.mode == SCHEDULED:
+            return self.scheduler.current
+        if self.mode == REVIEW and self.wrong_queue:
+            return self.wrong_queue.first()
+        return self.cursor
+
+    def submit(self, correct: bool) -> int:
+        """記錄目前這題的作答結果 (對錯由 App 判斷)，回傳這題的題號。"""
+        index = self.current
+        queue = self.wrong_queue
+        self.last[index] = correct
+        if correct:
+            self.correct[index] += 1
+            queue.discard(index)
+        else:
+            self.wrong[index] += 1
+            if index not in queue:
+                queue.add(index)
+            elif self.mode == REVIEW and queue.first() == index:
+                # 複習時答錯：移到佇列尾端，稍後再問
+                queue.rotate()
+        self.retry = not correct and not self.advance_on_wrong and self.mode == LEARNING
+        if self.mode == SCHEDULED:
+            self.scheduler.review(index, correct)
+        return index
+
+    def next(self):
+        """前進到下一題；換模式或換輪時回傳 REVIEW_START / REVIEW_DONE / ROUND_DONE，否則回傳 None。"""
+        if self.mode == SCHEDULED:
+            self.scheduler.advance()
+            return None
+        if self.mode == REVIEW:
+            if self.wrong_queue:
+                return None
+            self.mode = LEARNING
+            self.cursor = 0
+            return REVIEW_DONE
+
+        if self.retry:
+            self.retry = False
+            return None
+        self.cursor += 1
+        if self.cursor < self.total:
+            return None
+        self.cursor = 0
+        if self.wrong_queue:
+            self.mode = REVIEW
+            return REVIEW_START
+        return ROUND_DONE
+
+    def use_scheduler(self, enabled: bool):
+        """
+        切換間隔複習模式。開啟時錯題佇列裡的題目排成立刻到期、其餘題目當作新題；
+        關閉時回到 LEARNING 從第一題開始 (錯題佇列保留，一輪結束後照常複習)。
+        """
+        if enabled == (self.mode == SCHEDULED):
+            return
+        if enabled:
+            if self.scheduler is None:
+                self.scheduler = Sm2Scheduler(self.total)
+                for index in self.wrong_queue:
+                    self.scheduler.introduce(index)
+                self.scheduler.advance()
+            self.mode = SCHEDULED
+        else:
+            self.mode = LEARNING
+            self.cursor = 0
+        self.retry = False
+
+    def status(self, index: int) -> str:
+        """側邊欄的狀態燈：🔴 待複習、🟢 答對過、🟡 只答錯過、⚪ 還沒作答。"""
+        if index in self.wrong_queue:
+            return "🔴"
+        if self.correct[index] > 0:
+            return "🟢"
+        if self.wrong[index] > 0:
+            return "🟡"
+        return "⚪"
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "advance_on_wrong": self.advance_on_wrong,
+            "mode": self.mode,
+            "cursor": self.cursor,
+            "wrong_queue": list(self.wrong_queue),
+            "correct": list(self.correct),
+            "wrong": list(self.wrong),
+            "last": list(self.last),
+            "retry": self.retry,
+            "scheduler": self.scheduler.to_dict() if self.scheduler else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuizEngine":
+        """還原 to_dict() 的結果；欄位長度或題號對不上題數時丟出 ValueError。"""
+        engine = cls(data["total"], data.get("advance_on_wrong", True))
+        total = engine.total
+        for name in ("correct", "wrong", "last"):
+            values = list(data[name])
+            if len(values) != total:
+                raise ValueError(f"{name} 應有 {total} 筆，實際 {len(values)} 筆")
+            setattr(engine, name, values)
+        queue = list(data["wrong_queue"])
+        if not all(0 <= i < total for i in queue) or len(set(queue)) != len(queue):
+            raise ValueError(f"wrong_queue 題號不正確：{queue}")
+        if data["mode"] not in (LEARNING, REVIEW, SCHEDULED) or not 0 <= data["cursor"] < total:
+            raise ValueError(f"mode / cursor 不正確：{data['mode']} / {data['cursor']}")
+        engine.wrong_queue = ReviewQueue(queue)
+        engine.mode = data["mode"]
+        engine.cursor = data["cursor"]
+        engine.retry = bool(data.get("retry", False))
+        if data.get("scheduler"):
+            engine.scheduler = Sm2Scheduler.from_dict(data["scheduler"])
+            if engine.scheduler.total != total:
+                raise ValueError(f"scheduler 題數 {engine.scheduler.total} 與題庫 {total} 不一致")
+        if engine.mode == SCHEDULED and engine.scheduler is None:
+            raise ValueError("SCHEDULED 模式缺少 scheduler 狀態")
+        return engine
+
+    def __repr__(self):
+        return (f"QuizEngine(mode={self.mode}, current={self.current}, "
+                f"total={self.total}, wrong_queue={len(self.wrong_queue)})")
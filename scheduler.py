@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+scheduler.py
+QuizEngine 的「間隔複習」模式：用 SM-2 演算法安排每一題下次出現的時間。
+1) 每題記錄 ease (難易係數)、interval (間隔)、reps (連續答對次數)、due (到期時間)
+2) 時間以「作答題數」計算：interval 1 代表 SPACING 題之後再出現，
+   答錯的題目很快回來，越熟的題目間隔越長，不必每一輪都重做一遍
+3) 到期時間放在 heap 裡，挑下一題是 O(log n)；沒有到期的題目時先出新題，
+   新題也出完了就出最早到期的那一題
+4) 狀態都是 list，to_dict() / from_dict() 可直接存成 JSON
+
+    scheduler = Sm2Scheduler(len(word_bank))
+    scheduler.review(scheduler.current, correct=True)
+    scheduler.advance()
+"""
+
+import heapq
+from itertools import islice
+
+# 間隔 1 = 幾題之後再出現
+SPACING = 3
+MIN_EASE = 1.3
+INITIAL_EASE = 2.5
+# 連續答對幾次算「已熟練」(側邊欄統計用)
+MASTERED_REPS = 3
+# 只有對 / 錯，對應到 SM-2 的 0~5 分
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+class Sm2Scheduler:
+    """依 SM-2 安排出題順序，不依賴 Streamlit。"""
+
+    __slots__ = ("total", "spacing", "clock", "next_new", "current",
+                 "ease", "interval", "reps", "due", "_heap", "_seq", "_entry")
+
+    def __init__(self, total: int, spacing: int = SPACING):
+        if total <= 0:
+            raise ValueError("題庫至少要有一題")
+        self.total = total
+        self.spacing = spacing
+        self.clock = 0                     # 目前為止作答的題數
+        self.next_new = 0                  # 下一個還沒出過的題號
+        self.ease = [INITIAL_EASE] * total
+        self.interval = [0] * total
+        self.reps = [0] * total
+        self.due = [None] * total          # 還沒出過的題目為 None
+        self._heap = []                    # (due, seq, 題號)，舊的項目留著，取出時略過
+        self._seq = 0
+        self._entry = [None] * total       # 每題目前有效的 seq
+        self.current = self._pick()
+
+    def _push(self, index: int, due: int):
+        self._seq += 1
+        self.due[index] = due
+        self._entry[index] = self._seq
+        heapq.heappush(self._heap, (due, self._seq, index))
+        # 過期的項目太多時整理一次，heap 大小維持在題數的兩倍以內
+        if len(self._heap) > 2 * self.total + 16:
+            self._heap = [e for e in self._heap if self._entry[e[2]] == e[1]]
+            heapq.heapify(self._heap)
+
+    def _top(self):
+        """最早到期的有效項目 (due, seq, 題號)；沒有時回傳 None。"""
+        heap = self._heap
+        while heap and self._entry[heap[0][2]] != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def introduce(self, index: int):
+        """把一題排成立刻到期 (例如切換模式時錯題佇列裡的題目)。"""
+        self._push(index, self.clock)
+
+    def _pick(self) -> int:
+        top = self._top()
+        if top is not None and top[0] <= self.clock:
+            return top[2]
+        while self.next_new < self.total and self.due[self.next_new] is not None:
+            self.next_new += 1
+        if self.next_new < self.total:
+            return self.next_new
+        return top[2]
+
+    def review(self, index: int, correct: bool):
+        """依作答結果更新這一題的 ease / interval，排定下次出現的時間。"""
+        quality = QUALITY_CORRECT if correct else QUALITY_WRONG
+        if quality >= 3:
+            if self.reps[index] == 0:
+                interval = 1
+            elif self.reps[index] == 1:
+                interval = 6
+            else:
+                interval = round(self.interval[index] * self.ease[index])
+            self.reps[index] += 1
+        else:
+            interval = 1
+            self.reps[index] = 0
+        penalty = 5 - quality
+        self.ease[index] = max(MIN_EASE, self.ease[index] + 0.1 - penalty * (0.08 + penalty * 0.02))
+        self.interval[index] = interval
+        if index == self.next_new:
+            self.next_new += 1
+        self.clock += 1
+        self._push(index, self.clock + interval * self.spacing)
+
+    def advance(self) -> int:
+        """選出下一題 (存在 current) 並回傳題號。"""
+        self.current = self._pick()
+        return self.current
+
+    def upcoming(self, lookahead: int = 3):
+        """接下來可能出現的題號 (預取語音用)：最早到期的幾題加上接下來的新題。"""
+        live = (e for e in heapq.nsmallest(lookahead * 2 + 1, self._heap)
+                if self._entry[e[2]] == e[1] and e[2] != self.current)
+        due_soon = [e[2] for e in islice(live, lookahead)]
+        new = [i for i in range(self.next_new, min(self.total, self.next_new + lookahead + 1))
+               if self.due[i] is None and i != self.current]
+        # 已到期的優先，其次是新題，最後是還沒到期的
+        overdue = [i for i in due_soon if self.due[i] <= self.clock]
+        later = [i for i in due_soon if self.due[i] > self.clock]
+        return (overdue + new + later)[:lookahead]
+
+    def mastered(self) -> int:
+        """連續答對 MASTERED_REPS 次以上的題數。"""
+        return sum(1 for r in self.reps if r >= MASTERED_REPS)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "spacing": self.spacing,
+            "clock": self.clock,
+            "next_new": self.next_new,
+            "current": self.current,
+            "ease": list(self.ease),
+            "interval": list(self.interval),
+            "reps": list(self.reps),
+            "due": list(self.due),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Sm2Scheduler":
+        """還原 to_dict() 的結果 (heap 依 due 重建)；欄位長度不對時丟出 ValueError。"""
+        scheduler = cls(data["total"], data.get("spacing", SPACING))
+        total = scheduler.total
+        for name in ("ease", "interval", "reps", "due"):
+            values = list(data[name])
+            if len(values) != total:
+                raise ValueError(f"{name} 應有 {total} 筆，實際 {len(values)} 筆")
+            setattr(scheduler, name, values)
+        if not 0 <= data["current"] < total:
+            raise ValueError(f"current 題號不正確：{data['current']}")
+        scheduler.clock = data["clock"]
+        scheduler.next_new = data["next_new"]
+        scheduler._heap = []
+        scheduler._entry = [None] * total
+        for index, due in enumerate(scheduler.due):
+            if due is not None:
+                scheduler._push(index, due)
+        scheduler.current = data["current"]
+        return scheduler
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+static_audio.py
+把音檔放到 Streamlit 的靜態檔案路由 (static/ -> app/static/...) 上，App 只送出網址：
+1) 本地音檔 (audio/、audio_u7/) 與 TTS 快取裡的語音，依內容 hash 命名成
+   static/audio/<fingerprint>.mp3，內容相同的檔案只會有一份
+2) App 用 <audio src="app/static/audio/..."> 播放，不再把整個 mp3 塞進 websocket；
+   同一個音檔第二次播放直接由瀏覽器快取取得
+3) 靜態路由 (Starlette FileResponse) 支援 Range 請求與 ETag / Last-Modified
+4) .streamlit/config.toml 沒開 enableStaticServing 時，自動退回原本的 st.audio(bytes)
+
+Streamlit 的靜態路由不送 Cache-Control，所以這裡把檔案的 mtime 設成很久以前，
+讓瀏覽器依 Last-Modified 推算出很長的快取時間；檔名就是內容 hash，
+內容變了網址也會跟著變，不會拿到舊檔。
+"""
+
+import hashlib
+import html
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from audio_assets import load_audio
+from audio_store import resolve
+from tts_backends import audio_format
+from tts_batch import write_atomic
+from tts_cache import cache_key, get_tts_cache
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+AUDIO_SUBDIR = "audio"
+URL_PREFIX = f"app/static/{AUDIO_SUBDIR}"
+DISK_LIMIT_BYTES = int(os.environ.get("STATIC_AUDIO_DISK_MB", "200")) * 1024 * 1024
+# AUDIO_SERVING=inline 可強制改回 st.audio(bytes)
+SERVING_MODE = os.environ.get("AUDIO_SERVING", "static")
+# 靜態檔的 Last-Modified (2020-01-01)，讓瀏覽器的啟發式快取時間夠長
+FROZEN_MTIME = 1577836800
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def _extension(data: bytes) -> str:
+    return "wav" if audio_format(data) == "audio/wav" else "mp3"
+
+
+class StaticAudio:
+    """管理 static/audio/ 底下以內容命名的音檔，執行緒安全。"""
+
+    def __init__(self, static_dir: str = STATIC_DIR, disk_limit: int = DISK_LIMIT_BYTES):
+        self.audio_dir = os.path.join(static_dir, AUDIO_SUBDIR)
+        self.disk_limit = disk_limit
+        self._lock = threading.Lock()
+        self._files = OrderedDict()   # 檔名 -> 大小，依最近使用排序
+        self._bytes = 0
+        self._by_path = {}            # 本地音檔絕對路徑 -> (mtime, size, 檔名)
+        self._by_tts = {}             # tts cache key -> 檔名
+        self.published = 0
+        os.makedirs(self.audio_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.audio_dir):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                st_ = os.stat(os.path.join(self.audio_dir, name))
+            except OSError:
+                continue
+            entries.append((st_.st_atime, name, st_.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.disk_limit and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(os.path.join(self.audio_dir, name))
+            except OSError:
+                pass
+        alive = self._files.keys()
+        self._by_path = {k: v for k, v in self._by_path.items() if v[2] in alive}
+        self._by_tts = {k: v for k, v in self._by_tts.items() if v in alive}
+
+    def _touch(self, name: str) -> bool:
+        """檔案仍在就更新 LRU 順序並回傳 True。"""
+        if name in self._files:
+            self._files.move_to_end(name)
+            return True
+        return False
+
+    def publish(self, data: bytes, name: str = None) -> str:
+        """把 bytes 放到 static/audio/，回傳網址 (預設以內容 hash 命名)。"""
+        name = name or f"{fingerprint(data)}.{_extension(data)}"
+        with self._lock:
+            if self._touch(name):
+                return f"{URL_PREFIX}/{name}"
+        path = os.path.join(self.audio_dir, name)
+        write_atomic(path, data)
+        os.utime(path, (FROZEN_MTIME, FROZEN_MTIME))
+        with self._lock:
+            if name not in self._files:
+                self._files[name] = len(data)
+                self._bytes += len(data)
+                self.published += 1
+                self._evict()
+        return f"{URL_PREFIX}/{name}"
+
+    def _name(self, url: str) -> str:
+        return url.rsplit("/", 1)[-1]
+
+    def file_url(self, path: str) -> str:
+        """本地音檔的網址；檔案不存在時丟出 FileNotFoundError。"""
+        key = os.path.abspath(resolve(path))
+        st_ = os.stat(key)
+        with self._lock:
+            known = self._by_path.get(key)
+            if known and known[:2] == (st_.st_mtime, st_.st_size) and self._touch(known[2]):
+                return f"{URL_PREFIX}/{known[2]}"
+        url = self.publish(load_audio(key))
+        with self._lock:
+            self._by_path[key] = (st_.st_mtime, st_.st_size, self._name(url))
+        return url
+
+    def tts_url(self, text: str, lang: str, tld: str = "com", slow: bool = False) -> str:
+        """TTS 語音的網址 (先查 tts_cache，沒有才合成)。"""
+        key = cache_key(text, lang, tld, slow)
+        with self._lock:
+            name = self._by_tts.get(key)
+            if name and self._touch(name):
+                return f"{URL_PREFIX}/{name}"
+        cache = get_tts_cache()
+        url = self.publish(cache.get(text, lang, tld=tld, slow=slow))
+        # 離線備援的語音沒有進快取，下次還要重新確認，不記住網址
+        if cache.contains(key):
+            with self._lock:
+                self._by_tts[key] = self._name(url)
+        return url
+
+    def chunk_base(self, text: str, lang: str, tld: str = "com", slow: bool = False) -> str:
+        """
+        串流播放用的網址 (不含副檔名)，合成前就能算出來：app/static/audio/tts-<key>。
+        合成完成後檔案會是 .mp3 (gTTS) 或 .wav (離線備援)。
+        """
+        return f"{URL_PREFIX}/tts-{cache_key(text, lang, tld, slow)[:24]}"
+
+    def publish_chunk(self, text: str, lang: str, tld: str = "com", slow: bool = False) -> str:
+        """合成 (或從 tts_cache 取出) 一段語音，發布到 chunk_base() 對應的檔名。"""
+        data = get_tts_cache().get(text, lang, tld=tld, slow=slow)
+        base = self.chunk_base(text, lang, tld, slow)
+        return self.publish(data, name=f"{self._name(base)}.{_extension(data)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": self._bytes,
+                "published": self.published,
+            }
+
+
+_default_static = None
+_default_lock = threading.Lock()
+
+
+def get_static_audio() -> StaticAudio:
+    """整個 Python 行程共用一份。"""
+    global _default_static
+    if _default_static is None:
+        with _default_lock:
+            if _default_static is None:
+                _default_static = StaticAudio()
+    return _default_static
+
+
+def static_serving_enabled() -> bool:
+    """config.toml 有開 server.enableStaticServing 而且沒有強制 inline 模式。"""
+    if SERVING_MODE == "inline":
+        return False
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+_play_counter = 0
+
+
+def render_audio_url(url: str, autoplay: bool = True):
+    """以 <audio> 標籤播放網址；每次呼叫產生不同的 HTML，確保同一個音檔可以重播。"""
+    global _play_counter
+    _play_counter += 1
+    st.html(
+        f'<audio src="{html.escape(url)}" controls{" autoplay" if autoplay else ""} '
+        f'preload="auto" data-play="{_play_counter}" style="width:100%"></audio>'
+    )
+
+
+def play_file(path: str, autoplay: bool = True):
+    """播放本地音檔 (取代 st.audio(open(path, 'rb').read()))；檔案不存在時丟出 FileNotFoundError。"""
+    if static_serving_enabled():
+        render_audio_url(get_static_audio().file_url(path), autoplay)
+    else:
+        st.audio(load_audio(path), format="audio/mp3", autoplay=autoplay)
+
+
+def play_tts(text: str, lang: str, autoplay: bool = True, tld: str = "com", slow: bool = False):
+    """播放 TTS 語音 (取代 st.audio(get_tts_bytes(...)))。"""
+    if static_serving_enabled():
+        render_audio_url(get_static_audio().tts_url(text, lang, tld, slow), autoplay)
+    else:
+        data = get_tts_cache().get(text, lang, tld=tld, slow=slow)
+        st.audio(data, format=audio_format(data), autoplay=autoplay)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+stats_table.py
+側邊欄「詞彙答題統計」表格，改成增量更新：
+1) 每題一列 (狀態燈、題號、詞彙、正確率)，依欄位存成 list
+2) 作答後 update(題號) 只重算那一列，並依差值更新整體統計
+   (作答次數、正確率、各狀態燈的題數)，都是 O(1)
+3) frame() 依 version 快取 DataFrame，沒有新作答的 rerun 不再重組整張表
+
+    stats = session_stats(st.session_state, quiz, [item["word"] for item in word_bank])
+    stats.update(quiz.submit(is_correct))
+    st.sidebar.dataframe(stats.frame())
+"""
+
+from collections import Counter
+
+import pandas as pd
+
+from quiz_engine import QuizEngine
+
+SESSION_KEY = "stats_table"
+
+
+def last_answer_light(quiz: QuizEngine, index: int) -> str:
+    """看最近一次作答的狀態燈：🔴 待複習、🟢 最近答對、🟡 最近答錯、⚪ 還沒作答。"""
+    if index in quiz.wrong_queue:
+        return "🔴"
+    if quiz.last[index] is True:
+        return "🟢"
+    if quiz.last[index] is False:
+        return "🟡"
+    return "⚪"
+
+
+class StatsTable:
+    """一個 QuizEngine 的每題統計與整體統計。light 決定狀態燈 (預設 QuizEngine.status)。"""
+
+    def __init__(self, quiz: QuizEngine, labels, label_column: str = "詞彙",
+                 rate_column: str = "正確率", numbered: bool = True, light=None):
+        labels = list(labels)
+        if len(labels) != quiz.total:
+            raise ValueError(f"labels 應有 {quiz.total} 筆，實際 {len(labels)} 筆")
+        self.quiz = quiz
+        self.light = light or QuizEngine.status
+        self.label_column = label_column
+        self.rate_column = rate_column
+        self.numbered = numbered
+        self._labels = labels
+        self._correct = list(quiz.correct)
+        self._wrong = list(quiz.wrong)
+        self._lights = [self.light(quiz, i) for i in range(quiz.total)]
+        self._rates = [self._rate(i) for i in range(quiz.total)]
+        self.lights = Counter(self._lights)   # 狀態燈 -> 題數
+        self.answers = sum(self._correct) + sum(self._wrong)
+        self.correct = sum(self._correct)
+        self.version = 0
+        self._cache_version = None
+        self._cache_frame = None
+
+    def _rate(self, index: int) -> str:
+        return f"{self._correct[index]}/{self._correct[index] + self._wrong[index]}"
+
+    def update(self, index: int) -> int:
+        """重算第 index 題 (剛作答的那一題)，回傳 index。"""
+        quiz = self.quiz
+        correct, wrong = quiz.correct[index], quiz.wrong[index]
+        self.answers += correct + wrong - self._correct[index] - self._wrong[index]
+        self.correct += correct - self._correct[index]
+        self._correct[index], self._wrong[index] = correct, wrong
+        self._rates[index] = self._rate(index)
+
+        light = self.light(quiz, index)
+        old = self._lights[index]
+        if light != old:
+            self.lights[old] -= 1
+            self.lights[light] += 1
+            self._lights[index] = light
+        self.version += 1
+        return index
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.answers if self.answers else 0.0
+
+    @property
+    def mastered(self) -> int:
+        """狀態燈是 🟢 的題數。"""
+        return self.lights["🟢"]
+
+    @property
+    def pending(self) -> int:
+        """狀態燈是 🔴 (在錯題佇列裡) 的題數。"""
+        return self.lights["🔴"]
+
+    def summary(self) -> str:
+        return (f"作答 {self.answers} 次，正確率 {self.accuracy:.0%}，"
+                f"🟢 {self.mastered} / {self.quiz.total}，🔴 待複習 {self.pending}")
+
+    def frame(self) -> pd.DataFrame:
+        """整張表 (依 version 快取，請勿修改回傳的 DataFrame)。"""
+        if self._cache_version != self.version:
+            data = {"狀態": self._lights}
+            if self.numbered:
+                data["題號"] = range(1, self.quiz.total + 1)
+            data[self.label_column] = self._labels
+            data[self.rate_column] = self._rates
+            self._cache_frame = pd.DataFrame(data)
+            self._cache_version = self.version
+        return self._cache_frame
+
+    def __repr__(self):
+        return f"StatsTable(total={self.quiz.total}, answers={self.answers}, version={self.version})"
+
+
+def session_stats(session_state, quiz: QuizEngine, labels, **options) -> StatsTable:
+    """
+    這個 session 的 StatsTable；第一次、或 quiz 換成另一個 (新題庫、載入進度) 時重建。
+    options 同 StatsTable (label_column、rate_column、numbered、light)。
+    """
+    stats = session_state.get(SESSION_KEY)
+    if stats is None or stats.quiz is not quiz:
+        stats = session_state[SESSION_KEY] = StatsTable(quiz, labels, **options)
+    return stats
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+streamlit_app.py
+所有單元共用的多頁 App 外殼：一個班級只需要跑一個 Streamlit 行程。
+1) 用 st.navigation 註冊各單元；單元的程式 (與題庫) 要等學生第一次點開才會執行
+2) 所有單元在同一個行程裡，共用 tts_cache / audio_assets / corpus 等行程內快取
+3) 各單元原本都直接使用 st.session_state.index、stats ... 這些同名的 key，
+   切換單元時把上一個單元的狀態收起來、換回這個單元的狀態，彼此不會互相覆蓋
+   (元件本身的值不保存，例如輸入框內容會清空)；學生 id (progress_store.LEARNER_KEY) 所有單元共用
+4) 樣式表 (theme.py) 放在瀏覽器的 <head>，切換單元不會重送；單元之間只換 data-app-theme 外觀
+
+執行方式：streamlit run streamlit_app.py
+"""
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from progress_store import LEARNER_KEY
+from theme import THEME_KEY
+
+# (程式檔, 標題, 圖示, 網址路徑)，依分類排列
+UNITS = {
+    "國語": [
+        ("002_ch_u6_test.py", "第六課 詞彙聽寫", "📝", "ch_u6"),
+        ("002_ch_u7.py", "第七課 詞彙聽寫", "📝", "ch_u7"),
+        ("002_ch_u8.py", "第八課 詞彙聽寫", "📝", "ch_u8"),
+        ("002_u8_miss.py", "第八課 錯別字", "🔍", "ch_u8_typos"),
+        ("002_ch_u9.py", "第九課 詞彙聽寫", "📝", "ch_u9"),
+        ("002_ch_u10.py", "第十課 詞彙聽寫", "🎧", "ch_u10"),
+    ],
+    "English": [
+        ("003_ELA_P30.py", "ELA P30 Vocabulary", "📘", "ela_p30"),
+        ("003_ELA_P45.py", "ELA P45 Vocabulary", "📗", "ela_p45"),
+    ],
+}
+
+ACTIVE_KEY = "_shell_active_page"
+SAVED_PREFIX = "_shell_saved_"
+
+
+def _is_shell_key(key) -> bool:
+    """外殼自己的 key 與所有單元共用的 key (學生 id、頁面上已套用的樣式表)，切換單元時不收起來。"""
+    return str(key).startswith("_shell_") or key in (LEARNER_KEY, THEME_KEY)
+
+
+def _widget_keys():
+    """
+    目前有綁定元件 (按鈕、輸入框、表單...) 的 key。這些值由元件自己管理，
+    不能手動寫回 session_state (按鈕會直接報錯)，所以切換單元時不保存。
+    Streamlit 沒有公開這份清單 (內部欄位名稱隨版本不同)，取不到時回傳 None。
+    """
+    try:
+        state = get_script_run_ctx().session_state._state
+    except Exception:
+        return None
+    mapper = getattr(state, "_key_id_mapper", state)
+    mapping = getattr(mapper, "_key_id_mapping", None)
+    return set(mapping) if mapping is not None else None
+
+
+def switch_page_state(page_key: str):
+    """
+    切換到另一個單元時，把目前 session_state 收進 _shell_saved_<舊單元>，
+    再把新單元上次的狀態放回去。同一個單元內的 rerun 什麼都不做。
+    """
+    active = st.session_state.get(ACTIVE_KEY)
+    if active == page_key:
+        return
+
+    widget_keys = _widget_keys()
+    current = {k: v for k, v in st.session_state.items() if not _is_shell_key(k)}
+    # 分不出哪些是元件的 key 時就不保存，回到該單元時從頭開始 (至少不會互相干擾)
+    if active is not None and widget_keys is not None:
+        st.session_state[SAVED_PREFIX + active] = {
+            k: v for k, v in current.items() if k not in widget_keys}
+    for key in current:
+        del st.session_state[key]
+
+    st.session_state.update(st.session_state.pop(SAVED_PREFIX + page_key, {}))
+    st.session_state[ACTIVE_KEY] = page_key
+
+
+pages = {section: [] for section in UNITS}
+page_keys = {}
+for section, units in UNITS.items():
+    for script, title, icon, url_path in units:
+        unit_page = st.Page(script, title=title, icon=icon, url_path=url_path)
+        pages[section].append(unit_page)
+        # 預設頁面的 page.url_path 是空字串，另外記一份固定的 key
+        page_keys[id(unit_page)] = url_path
+
+page = st.navigation(pages)
+switch_page_state(page_keys.get(id(page), page.url_path))
+page.run()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+theme.py
+所有單元共用的樣式表 (取代各 App 每次 rerun 都用 st.markdown 重送的一大段 <style>)：
+1) 樣式來源是 theme.css (design tokens + 共用元件樣式) 加上 diff_render 的比對方塊樣式，
+   依內容 hash 發布成 static/theme/<hash>.css；內容變了網址就跟著變，瀏覽器可以放心長期快取
+2) apply_theme() 只在每個 session 第一次 (或換外觀時) 送出一段小腳本，
+   把 <link id="app-theme"> 放進 <head>；之後的 rerun、fragment 重跑、切換單元都不再送任何 CSS，
+   瀏覽器也不必因為新的 <style> 重新計算整頁樣式
+3) 各單元的差異 (U8、U9 的橘色按鈕、P45 的大字輸入框) 寫成 <html data-app-theme="..."> 底下的變數與規則
+4) 沒開 enableStaticServing 時退回把整份 CSS 放進 <head> 的 <style> (一樣每個 session 一次)
+
+    from theme import apply_theme
+    apply_theme("orange")
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import streamlit as st
+
+from diff_render import diff_css
+from static_audio import FROZEN_MTIME, STATIC_DIR, static_serving_enabled
+from tts_batch import write_atomic
+
+THEME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "theme.css")
+THEME_SUBDIR = "theme"
+URL_PREFIX = f"app/static/{THEME_SUBDIR}"
+# session_state 裡記錄「這個瀏覽器頁面目前套用的 (版本, 外觀)」；切換單元時外殼不收起來
+THEME_KEY = "_theme_applied"
+# 各單元可用的外觀 (對應 theme.css 裡的 [data-app-theme="..."])
+VARIANTS = ("default", "orange", "spelling")
+
+_SCRIPT = """<script data-theme="__VERSION__">
+(() => {
+  const theme = __THEME__;
+  document.documentElement.dataset.appTheme = theme.variant;
+  let sheet = document.getElementById("app-theme");
+  if (sheet && sheet.dataset.version === theme.version) return;
+  if (sheet) sheet.remove();
+  if (theme.href) {
+    sheet = document.createElement("link");
+    sheet.rel = "stylesheet";
+    sheet.href = theme.href;
+  } else {
+    sheet = document.createElement("style");
+    sheet.textContent = theme.css;
+  }
+  sheet.id = "app-theme";
+  sheet.dataset.version = theme.version;
+  document.head.appendChild(sheet);
+})();
+</script>"""
+
+
+class Theme:
+    """組好的樣式表與版本 (內容 hash)，以及發布到靜態路由後的網址。"""
+
+    def __init__(self, theme_file: str = THEME_FILE, static_dir: str = STATIC_DIR):
+        with open(theme_file, encoding="utf-8") as f:
+            self.css = f.read() + "\n/* diff_render.py */\n" + diff_css() + "\n"
+        self.version = hashlib.sha256(self.css.encode("utf-8")).hexdigest()[:12]
+        self.theme_dir = os.path.join(static_dir, THEME_SUBDIR)
+        self._lock = threading.Lock()
+        self._url = None
+
+    def url(self) -> str:
+        """static/theme/<version>.css 的網址；檔案不存在時才寫入。"""
+        if self._url is None:
+            with self._lock:
+                if self._url is None:
+                    name = f"{self.version}.css"
+                    path = os.path.join(self.theme_dir, name)
+                    if not os.path.exists(path):
+                        write_atomic(path, self.css.encode("utf-8"))
+                        os.utime(path, (FROZEN_MTIME, FROZEN_MTIME))
+                    self._url = f"{URL_PREFIX}/{name}"
+        return self._url
+
+    def script(self, variant: str, inline: bool = False) -> str:
+        """把樣式表放進 <head> 並設定外觀的腳本；inline=True 時直接帶整份 CSS。"""
+        theme = {"variant": variant, "version": self.version}
+        if inline:
+            theme["css"] = self.css
+        else:
+            theme["href"] = self.url()
+        # </ 轉成 <\/，CSS 內容不會提早結束 <script>
+        payload = json.dumps(theme, ensure_ascii=False).replace("</", "<\\/")
+        return _SCRIPT.replace("__VERSION__", self.version).replace("__THEME__", payload)
+
+
+_default_theme = None
+_default_lock = threading.Lock()
+
+
+def get_theme() -> Theme:
+    """整個 Python 行程共用一份 (theme.css 只讀一次)。"""
+    global _default_theme
+    if _default_theme is None:
+        with _default_lock:
+            if _default_theme is None:
+                _default_theme = Theme()
+    return _default_theme
+
+
+def apply_theme(variant: str = "default"):
+    """
+    套用共用樣式表與這個單元的外觀。同一個 session 裡版本與外觀都沒變時什麼都不送；
+    請在頁面最上方 (fragment 之外) 呼叫。
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"未知的外觀：{variant} (可用：{', '.join(VARIANTS)})")
+    theme = get_theme()
+    applied = (theme.version, variant)
+    if st.session_state.get(THEME_KEY) == applied:
+        return
+    st.html(theme.script(variant, inline=not static_serving_enabled()), unsafe_allow_javascript=True)
+    st.session_state[THEME_KEY] = applied
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+tts_backends.py
+語音合成後端 (backend) 的共同介面：
+1) GTTSBackend   — 線上 gTTS (預設、音質最好)
+2) EspeakBackend — 離線 espeak-ng (需安裝 espeak-ng 執行檔)
+3) StubBackend   — 離線、可預期的假後端 (產生一段靜音 WAV)，供測試與基準測試使用
+4) BackendRouter — 依語言選擇後端清單，逾時或失敗就自動換下一個
+
+教室 Wi-Fi 不穩時，播放按鈕最多等 timeout 秒就會改用離線語音，不會卡住。
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from gtts import gTTS, gTTSError
+
+
+class TTSBackendError(Exception):
+    """所有後端都無法產生語音時丟出。"""
+
+
+def audio_format(data: bytes) -> str:
+    """依檔頭判斷音訊格式，給 st.audio(format=...) 使用。"""
+    if data[:4] == b"RIFF":
+        return "audio/wav"
+    return "audio/mp3"
+
+
+class TTSBackend:
+    """
+    後端基底類別。
+    persistent=True 表示產出的音檔值得長期快取 (例如 gTTS)；
+    離線後端只是備援，不寫入快取，網路恢復後就會改回 gTTS。
+    """
+    name = "base"
+    persistent = True
+
+    def available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str, lang: str, tld: str = "com", slow: bool = False) -> bytes:
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """真正呼叫 gTTS 的後端。"""
+    name = "gtts"
+
+    def __init__(self, request_timeout: float = 10.0):
+        self.request_timeout = request_timeout
+
+    def synthesize(self, text, lang, tld="com", slow=False):
+        fp = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=tld, slow=slow, timeout=self.request_timeout).write_to_fp(fp)
+        return fp.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    """離線的 espeak-ng，輸出 WAV。"""
+    name = "espeak"
+    persistent = False
+
+    # gTTS 語言代碼 -> espeak-ng voice
+    VOICES = {"en": "en-us", "zh": "cmn", "zh-tw": "cmn", "zh-cn": "cmn"}
+
+    def __init__(self, executable: str = None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.executable is not None
+
+    def synthesize(self, text, lang, tld="com", slow=False):
+        if not self.available():
+            raise TTSBackendError("找不到 espeak-ng 執行檔")
+        lang = lang.lower()
+        voice = self.VOICES.get(lang) or self.VOICES.get(lang.split("-")[0], lang)
+        speed = "120" if slow else "160"
+        proc = subprocess.run([self.executable, "-v", voice, "-s", speed, "--stdout", text],
+                              capture_output=True, timeout=30)
+        if proc.returncode != 0 or not proc.stdout:
+            raise TTSBackendError(proc.stderr.decode("utf-8", "replace").strip() or "espeak-ng 執行失敗")
+        return proc.stdout
+
+
+class StubBackend(TTSBackend):
+    """
+    離線假後端：產生長度與文字成正比的靜音 WAV，內容完全可預期。
+    latency 可模擬網路延遲；fail_every=N 時每第 N 次呼叫丟出 gTTSError，用來測試重試邏輯。
+    """
+    name = "stub"
+    persistent = False
+    SAMPLE_RATE = 8000
+
+    def __init__(self, latency: float = 0.0, fail_every: int = 0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, lang, tld="com", slow=False):
+        with self._lock:
+            self.calls += 1
+            call_no = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and call_no % self.fail_every == 0:
+            raise gTTSError(f"stub failure #{call_no}")
+        # 每個字元 0.08 秒 (最少 0.3 秒) 的靜音
+        n_frames = int(self.SAMPLE_RATE * max(0.3, 0.08 * len(text)))
+        fp = io.BytesIO()
+        with wave.open(fp, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(self.SAMPLE_RATE)
+            w.writeframes(b"\x80" * n_frames)
+        return fp.getvalue()
+
+
+class BackendRouter(TTSBackend):
+    """
+    依語言挑選後端清單，依序嘗試；每個後端最多等 timeout 秒，
+    逾時或失敗就換下一個。
+    routes 例如 {"en": [gtts, espeak, stub], "zh": [gtts, stub]}，
+    "*" 是沒有對應語言時的預設清單。
+
+    逾時的呼叫無法中斷，只能在背景跑完，所以：
+    1) 有 request_timeout 的後端 (gTTS) 把單次 HTTP 請求限制在 timeout 秒內，背景呼叫不會無限期卡住
+    2) 每個後端最多同時 max_in_flight 個呼叫；額滿 (例如 gTTS 卡住時) 就直接換下一個後端，
+       (清單最後一個後端則最多排隊 timeout 秒)；執行緒池依此配置大小，拿到名額就一定有空的執行緒
+    3) 逾時的 persistent 後端 (gTTS) 在背景跑完時，結果交給 on_late(data)，例如寫進快取，
+       這次的合成不會白費
+    """
+    name = "router"
+
+    def __init__(self, routes: dict, timeout: float = 3.0, max_in_flight: int = 4):
+        self.routes = {k.lower(): [b for b in v if b.available()] for k, v in routes.items()}
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        backends = {id(b): b for chain in self.routes.values() for b in chain}
+        for backend in backends.values():
+            if getattr(backend, "request_timeout", None):
+                backend.request_timeout = min(backend.request_timeout, timeout)
+        self._slots = {key: threading.BoundedSemaphore(max_in_flight) for key in backends}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_in_flight * len(backends)),
+                                        thread_name_prefix="tts-backend")
+        self.fallbacks = 0
+
+    def chain(self, lang: str):
+        lang = lang.lower()
+        return (self.routes.get(lang)
+                or self.routes.get(lang.split("-")[0])
+                or self.routes.get("*", []))
+
+    def synthesize_with_source(self, text, lang, tld="com", slow=False, on_late=None):
+        """
+        回傳 (audio bytes, 實際使用的 backend)。
+        on_late(data)：persistent 後端逾時、之後才在背景成功時呼叫 (在後端的執行緒裡)。
+        """
+        errors = []
+        chain = self.chain(lang)
+        for i, backend in enumerate(chain):
+            slot = self._slots[id(backend)]
+            last = i == len(chain) - 1
+            if not slot.acquire(timeout=self.timeout if last else 0):
+                errors.append(f"{backend.name}: 忙碌中 (已有 {self.max_in_flight} 個請求未完成)")
+                continue
+            future = self._pool.submit(backend.synthesize, text, lang, tld, slow)
+            # 呼叫真正結束 (包含逾時後在背景跑完) 才釋放名額
+            future.add_done_callback(lambda _, slot=slot: slot.release())
+            try:
+                data = future.result(timeout=self.timeout)
+            except FutureTimeout:
+                errors.append(f"{backend.name}: 逾時 {self.timeout}s")
+                if on_late is not None and backend.persistent:
+                    future.add_done_callback(lambda f: _deliver_late(f, on_late))
+                continue
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+                continue
+            if i > 0:
+                self.fallbacks += 1
+            return data, backend
+        raise TTSBackendError("；".join(errors) or f"沒有可用於 {lang} 的語音後端")
+
+    def synthesize(self, text, lang, tld="com", slow=False):
+        return self.synthesize_with_source(text, lang, tld, slow)[0]
+
+
+def _deliver_late(future, on_late):
+    """逾時的呼叫在背景完成：成功才交給 on_late，失敗就算了 (使用者早已拿到備援語音)。"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_late(future.result())
+    except Exception:
+        pass
+
+
+BACKENDS = {
+    "gtts": GTTSBackend,
+    "espeak": EspeakBackend,
+    "stub": StubBackend,
+}
+
+
+def make_backend(name: str) -> TTSBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的語音後端：{name} (可用：{', '.join(BACKENDS)})")
+
+
+def _chain_from_env(value: str):
+    return [make_backend(n.strip()) for n in value.split(",") if n.strip()]
+
+
+_default_router = None
+_default_lock = threading.Lock()
+
+
+def get_default_backend() -> BackendRouter:
+    """
+    App 播放時使用的後端 (整個行程共用)。可用環境變數設定：
+      TTS_BACKENDS=gtts,espeak        預設的後端順序 (stub 只產生靜音，只在測試時自行加上)
+      TTS_BACKENDS_ZH=gtts,espeak     針對某語言 (語言代碼前綴) 的順序
+      TTS_TIMEOUT=3                   每個後端最多等幾秒
+      TTS_MAX_IN_FLIGHT=4             每個後端最多同時幾個呼叫
+    """
+    global _default_router
+    if _default_router is None:
+        with _default_lock:
+            if _default_router is None:
+                routes = {"*": _chain_from_env(os.environ.get("TTS_BACKENDS", "gtts,espeak"))}
+                for key, value in os.environ.items():
+                    if key.startswith("TTS_BACKENDS_"):
+                        routes[key[len("TTS_BACKENDS_"):].lower().replace("_", "-")] = _chain_from_env(value)
+                _default_router = BackendRouter(routes, timeout=float(os.environ.get("TTS_TIMEOUT", "3")),
+                                                max_in_flight=int(os.environ.get("TTS_MAX_IN_FLIGHT", "4")))
+    return _default_router
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+tts_batch.py
+make_audio_files*.py 共用的批次語音合成引擎：
+1) 以固定大小的 thread pool 平行合成
+2) 每秒請求數上限 (rate limit)，避免被 Google 擋下
+3) 遇到 gTTSError 以指數退避 (exponential backoff) 重試
+4) 每一個 job 都有結果報告 (成功/失敗、嘗試次數、耗時)
+
+後端使用 tts_backends 的共同介面；用 StubBackend 可在沒有網路時測試吞吐量。
+離線後端 (stub / espeak，persistent=False) 產生的是 WAV 測試音，一律寫到暫存資料夾
+(SCRATCH_DIR，副檔名 .wav)，不會蓋掉 audio/ 裡真正的 mp3。
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from gtts import gTTSError
+
+from tts_backends import BACKENDS, GTTSBackend, StubBackend, make_backend
+
+# 離線後端的輸出位置 (可用環境變數 TTS_SCRATCH_DIR 指定)
+SCRATCH_DIR = os.environ.get("TTS_SCRATCH_DIR",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_scratch"))
+
+
+@dataclass
+class SynthesisJob:
+    """一個要合成的音檔。"""
+    path: str          # 輸出的 mp3 路徑
+    text: str          # 要念的文字
+    lang: str          # gTTS 語言代碼，例如 "en"、"zh-TW"
+    label: str = ""    # 顯示用名稱，例如 "單字音檔"
+    key: str = ""      # 邏輯名稱，例如 "01_agency_word_en" (manifest 用；空白時以 path 代替)
+
+    def __post_init__(self):
+        if not self.key:
+            self.key = self.path
+
+
+@dataclass
+class JobResult:
+    """單一 job 的執行結果。"""
+    job: SynthesisJob
+    ok: bool
+    attempts: int
+    seconds: float
+    error: str = ""
+
+
+class RateLimiter:
+    """簡單的間隔式限速器：任兩次 acquire() 至少相隔 1/rate 秒。"""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec and rate_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def write_atomic(path: str, data: bytes):
+    """先寫暫存檔再改名，避免中斷時留下半個 mp3。"""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _run_job(job: SynthesisJob, backend, limiter: RateLimiter,
+             max_retries: int, backoff: float) -> JobResult:
+    start = time.monotonic()
+    attempts = 0
+    while True:
+        attempts += 1
+        limiter.acquire()
+        try:
+            data = backend.synthesize(job.text, job.lang)
+            write_atomic(job.path, data)
+            return JobResult(job, True, attempts, time.monotonic() - start)
+        except gTTSError as e:
+            if attempts > max_retries:
+                return JobResult(job, False, attempts, time.monotonic() - start,
+                                 f"gTTSError：{e}")
+            # 指數退避：backoff, 2*backoff, 4*backoff ...
+            time.sleep(backoff * (2 ** (attempts - 1)))
+        except Exception as e:
+            return JobResult(job, False, attempts, time.monotonic() - start,
+                             f"其他錯誤：{e}")
+
+
+def run_batch(jobs, backend=None, max_workers: int = 4, rate_per_sec: float = 3.0,
+              max_retries: int = 3, backoff: float = 1.0, on_result=None):
+    """
+    平行執行所有 jobs，回傳與 jobs 同順序的 JobResult 清單。
+    on_result(result) 會在每個 job 完成時被呼叫 (可用來即時印出進度)。
+    """
+    backend = backend or GTTSBackend()
+    limiter = RateLimiter(rate_per_sec)
+    report_lock = threading.Lock()
+
+    def work(job):
+        result = _run_job(job, backend, limiter, max_retries, backoff)
+        if on_result is not None:
+            with report_lock:
+                on_result(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(work, jobs))
+
+
+def print_result(result: JobResult):
+    """預設的進度輸出格式。"""
+    label = result.job.label or "音檔"
+    if result.ok:
+        print(f"    ▶ {label}: {result.job.path} ... OK ({result.seconds:.1f}s)")
+    else:
+        print(f"    ▶ {label}: {result.job.path} ... 失敗（{result.error}，嘗試 {result.attempts} 次）")
+
+
+def print_report(results, elapsed: float = None):
+    """列印整批的結果摘要。"""
+    ok = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    retried = [r for r in results if r.attempts > 1]
+    print("-" * 40)
+    print(f"成功 {len(ok)} / {len(results)}，重試過 {len(retried)} 個，失敗 {len(failed)} 個")
+    if elapsed is not None:
+        print(f"總耗時 {elapsed:.1f} 秒")
+    for r in failed:
+        print(f"  ✗ {r.job.path}：{r.error}")
+
+
+def add_batch_arguments(parser):
+    """讓各個 make_audio_files*.py 共用相同的命令列參數。"""
+    parser.add_argument("--workers", type=int, default=4, help="同時合成的數量 (預設 4)")
+    parser.add_argument("--rps", type=float, default=3.0, help="每秒最多送出幾個請求 (預設 3)")
+    parser.add_argument("--retries", type=int, default=3, help="gTTSError 時最多重試次數 (預設 3)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="gtts",
+                        help="語音後端 (預設 gtts；espeak/stub 為離線，只輸出 WAV 測試音到暫存資料夾)")
+    parser.add_argument("--fake", action="store_true", help="等同 --backend stub (不連網，用來測試)")
+    return parser
+
+
+def backend_from_args(args):
+    """依命令列參數建立語音後端 (--fake 等同 --backend stub，並模擬網路延遲)。"""
+    return StubBackend(latency=0.2) if args.fake else make_backend(args.backend)
+
+
+def scratch_job(job: SynthesisJob, scratch_dir: str = SCRATCH_DIR) -> SynthesisJob:
+    """同一個 job 改寫到暫存資料夾、副檔名改成 .wav (保留原本的相對路徑，避免同名檔互相覆蓋)。"""
+    rel = os.path.relpath(os.path.abspath(job.path))
+    if rel.startswith(os.pardir):
+        rel = os.path.splitdrive(os.path.abspath(job.path))[1].lstrip(os.sep)
+    path = os.path.join(scratch_dir, os.path.splitext(rel)[0] + ".wav")
+    return SynthesisJob(path, job.text, job.lang, job.label, job.key)
+
+
+def run_from_args(jobs, args, backend=None):
+    """
+    依命令列參數執行 jobs，並印出進度與報告。
+    離線後端只用來測試，輸出改寫到 SCRATCH_DIR (回傳結果裡的 job.path 是暫存檔的路徑)。
+    """
+    backend = backend or backend_from_args(args)
+    if not backend.persistent:
+        jobs = [scratch_job(job) for job in jobs]
+        print(f"⚠ {backend.name} 後端只產生測試用的 WAV，輸出到 {SCRATCH_DIR} (不會寫入音檔資料夾)")
+    start = time.monotonic()
+    results = run_batch(jobs, backend=backend, max_workers=args.workers,
+                        rate_per_sec=args.rps, max_retries=args.retries,
+                        on_result=print_result)
+    print_report(results, time.monotonic() - start)
+    return results
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+tts_cache.py
+所有 App 共用的 gTTS 快取層：
+1) 以 (text, lang, tld, slow) 的 SHA-256 作為 key
+2) 行程內熱快取 (記憶體 LRU)
+3) 磁碟上的 mp3 快取 (LRU 淘汰，有總大小上限)
+
+同一個字第二次播放時直接從記憶體或磁碟取出，不再呼叫 gTTS。
+多個 session 同時要同一段語音時 (全班一起按播放)，只有第一個會真的合成，
+其他人等待同一次合成的結果 (single-flight)，避免被 gTTS 限流。
+實際的合成交給 tts_backends (gTTS 逾時時自動改用離線語音)；
+離線備援產生的音檔不會寫入快取，網路恢復後會重新取得 gTTS 版本；
+gTTS 逾時但之後在背景完成時，結果仍會寫進快取 (下一次播放就是 gTTS 版本)。
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from tts_backends import get_default_backend
+
+# 磁碟快取資料夾與上限 (可用環境變數覆寫)
+CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_cache"),
+)
+DISK_LIMIT_BYTES = int(os.environ.get("TTS_CACHE_DISK_MB", "200")) * 1024 * 1024
+MEMORY_LIMIT_BYTES = int(os.environ.get("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+
+
+class _Flight:
+    """一次進行中的合成；其他執行緒等待 done 之後共用結果。"""
+    __slots__ = ("done", "data", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+def cache_key(text: str, lang: str, tld: str = "com", slow: bool = False) -> str:
+    """以 (text, lang, tld, slow) 產生內容定址用的 key。"""
+    raw = "\x1f".join([text, lang.lower(), tld, "1" if slow else "0"])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """兩層 (記憶體 + 磁碟) 的 TTS 快取，執行緒安全。"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR,
+                 disk_limit: int = DISK_LIMIT_BYTES,
+                 memory_limit: int = MEMORY_LIMIT_BYTES,
+                 backend=None):
+        self.cache_dir = cache_dir
+        self.disk_limit = disk_limit
+        self.memory_limit = memory_limit
+        self.backend = backend  # None 表示使用 tts_backends.get_default_backend()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()     # key -> 檔案大小，依最近使用排序
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0             # 等待別人進行中的合成、沒有自己呼叫後端的次數
+        self.late = 0                  # gTTS 逾時、之後才在背景完成並補寫進快取的次數
+        self._inflight = {}            # key -> _Flight
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    # --- 磁碟層 ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _scan_disk(self):
+        """啟動時依檔案存取時間重建磁碟 LRU 順序。"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                st_ = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((max(st_.st_atime, st_.st_mtime), name[:-4], st_.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_limit and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key: str):
+        if key not in self._disk:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return data
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        if key in self._disk:
+            self._disk_bytes -= self._disk.pop(key)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    # --- 記憶體層 ---
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    # --- 對外介面 ---
+
+    def contains(self, key: str) -> bool:
+        """是否已在任一層快取中 (不讀檔、不計入命中次數)。"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def lookup(self, key: str):
+        """只查快取，不合成；找不到回傳 None。"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            data = self._read_disk(key)
+            if data is not None:
+                self.disk_hits += 1
+                self._remember(key, data)
+            return data
+
+    def _store_late(self, key: str, data: bytes):
+        """逾時後才完成的 gTTS 結果 (由 BackendRouter 的背景執行緒呼叫)。"""
+        with self._lock:
+            self.late += 1
+            self._remember(key, data)
+            self._write_disk(key, data)
+
+    def _synthesize(self, text, lang, tld, slow):
+        """回傳 (audio bytes, 是否值得快取)。"""
+        backend = self.backend or get_default_backend()
+        if hasattr(backend, "synthesize_with_source"):
+            key = cache_key(text, lang, tld, slow)
+            data, source = backend.synthesize_with_source(text, lang, tld, slow,
+                                                          on_late=lambda late: self._store_late(key, late))
+        else:
+            data, source = backend.synthesize(text, lang, tld, slow), backend
+        return data, getattr(source, "persistent", True)
+
+    def get(self, text: str, lang: str, tld: str = "com", slow: bool = False) -> bytes:
+        """取得音訊 bytes；快取沒有時才呼叫語音後端並寫回兩層快取。"""
+        key = cache_key(text, lang, tld, slow)
+        data = self.lookup(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            # 查快取與拿鎖之間，前一次合成可能剛好完成
+            if leader and (key in self._memory or key in self._disk):
+                data = self._memory.get(key) or self._read_disk(key)
+            if leader and data is None:
+                flight = self._inflight[key] = _Flight()
+            elif not leader:
+                self.coalesced += 1
+        if data is not None:
+            return data
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data
+
+        try:
+            data, persistent = self._synthesize(text, lang, tld, slow)
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.data = data
+            with self._lock:
+                self.misses += 1
+                if persistent:
+                    self._remember(key, data)
+                    self._write_disk(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "late": self.late,
+                "in_flight": len(self._inflight),
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """整個 Python 行程共用一份快取 (Streamlit 每次 rerun 都會拿到同一個)。"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = TTSCache()
+    return _default_cache
+
+
+def get_tts_bytes(text: str, lang: str, tld: str = "com", slow: bool = False) -> bytes:
+    """App 端使用的捷徑：取得 (可能已快取的) mp3 bytes。"""
+    return get_tts_cache().get(text, lang, tld=tld, slow=slow)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+tts_prefetch.py
+題目一顯示，就在背景把「接下來 1~3 題」的語音先合成進 tts_cache，
+學生按下播放時通常已經在快取裡，第一次播放也不用等 gTTS。
+
+每個 session 一個 owner；題目或錯題佇列改變時，尚未開始的舊工作會被取消。
+owner 依最近一次 schedule() 排序，工作都做完的舊 owner 會被移除 (最多保留 MAX_OWNERS 個)，
+關掉分頁的 session 不會一直留在記憶體裡。
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from tts_cache import cache_key, get_tts_cache
+
+MAX_WORKERS = 2
+LOOKAHEAD = 3
+MAX_OWNERS = 256
+
+
+def predict_next_indices(study_mode: str, sequence_cursor: int, wrong_queue,
+                         total: int, lookahead: int = LOOKAHEAD):
+    """
+    依照 QuizEngine.next() 的規則，猜接下來最可能出現的題號 (不含目前這題)。
+    LEARNING：sequence_cursor 之後的題目，一輪結束接錯題佇列，再接新一輪第 0 題
+    REVIEW：  錯題佇列的下一題 (佇列第 0 個就是目前題目)，佇列用完接新一輪第 0 題
+    """
+    # 只取佇列前幾個，不把整個錯題佇列 (可能上千題) 複製成 list
+    head = list(islice(wrong_queue, lookahead + 1))
+    if study_mode == "REVIEW":
+        candidates = head[1:1 + lookahead] + [0]
+    else:
+        candidates = list(range(sequence_cursor + 1, min(total, sequence_cursor + 1 + lookahead)))
+        candidates += head[:lookahead] + [0]
+
+    upcoming = []
+    current = head[0] if study_mode == "REVIEW" and head else sequence_cursor
+    for idx in candidates:
+        if idx != current and idx not in upcoming and 0 <= idx < total:
+            upcoming.append(idx)
+        if len(upcoming) >= lookahead:
+            break
+    return upcoming
+
+
+class Prefetcher:
+    """以小型 thread pool 在背景把語音寫進 TTSCache。"""
+
+    def __init__(self, cache=None, max_workers: int = MAX_WORKERS, max_owners: int = MAX_OWNERS):
+        self.cache = cache or get_tts_cache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-prefetch")
+        self._lock = threading.Lock()
+        self.max_owners = max_owners
+        self._pending = OrderedDict()   # owner -> (requests tuple, [futures])，最近 schedule 的在最後
+        self.submitted = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _work(self, text: str, lang: str):
+        try:
+            self.cache.get(text, lang)
+        except Exception:
+            # 預取失敗不影響畫面，學生按播放時會再試一次
+            with self._lock:
+                self.failed += 1
+
+    def schedule(self, owner: str, requests):
+        """
+        requests: [(text, lang), ...]，依優先順序排列。
+        同一個 owner 再次呼叫時，若清單不同就取消尚未開始的舊工作。
+        """
+        requests = tuple((t, l) for t, l in requests if t)
+        with self._lock:
+            previous = self._pending.get(owner)
+            if previous is not None and previous[0] == requests:
+                self._pending.move_to_end(owner)
+                return
+            if previous is not None:
+                self._cancel(previous[1])
+
+            futures = []
+            for text, lang in requests:
+                if self.cache.contains(cache_key(text, lang)):
+                    self.skipped += 1
+                    continue
+                futures.append(self._pool.submit(self._work, text, lang))
+                self.submitted += 1
+            self._pending[owner] = (requests, futures)
+            self._pending.move_to_end(owner)
+            self._prune()
+
+    def _prune(self):
+        """移除最舊、工作都已完成的 owner；超過 max_owners 時連同未開始的工作一起移除。(需持有 _lock)"""
+        while len(self._pending) > 1:
+            oldest, (_, futures) = next(iter(self._pending.items()))
+            if len(self._pending) > self.max_owners:
+                self._cancel(futures)
+            elif not all(future.done() for future in futures):
+                break
+            del self._pending[oldest]
+
+    def _cancel(self, futures):
+        for future in futures:
+            if future.cancel():
+                self.cancelled += 1
+
+    def cancel(self, owner: str):
+        with self._lock:
+            previous = self._pending.pop(owner, None)
+            if previous is not None:
+                self._cancel(previous[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "skipped": self.skipped,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "owners": len(self._pending),
+            }
+
+
+_default_prefetcher = None
+_default_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """整個 Python 行程共用一個預取器。"""
+    global _default_prefetcher
+    if _default_prefetcher is None:
+        with _default_lock:
+            if _default_prefetcher is None:
+                _default_prefetcher = Prefetcher()
+    return _default_prefetcher
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+tts_stream.py
+長篇文章 (例如 002_u8_miss.py 的 STORY_FULL) 的分段串流語音：
+1) 依句尾標點 (。！？!?) 切成句子，太長的句子再依逗號等子句標點切開
+2) 第一段先同步合成，其餘各段丟到背景 thread pool 同時合成
+3) 每段合成好 (或失敗) 就更新一份小小的狀態檔 static/audio/stream-<id>.json；
+   頁面上的播放器 (st.html，不用 iframe) 依序播放，下一段還沒好時只輪詢這份狀態檔，
+   某一段合成失敗就停止並顯示錯誤，不會對不存在的音檔一直重試
+4) 每一段都是獨立的 tts_cache 項目，題目句子與故事重疊的部分 (例如「想要找水喝。」)
+   只會合成一次
+
+需要 static_audio 的靜態檔案路由；沒有開啟時退回整段一次合成的 play_tts()。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from static_audio import URL_PREFIX, get_static_audio, play_tts, static_serving_enabled
+from tts_batch import write_atomic
+
+SENTENCE_END = "。！？!?"
+CLAUSE_END = "，,、；;：:"
+# 句尾標點後面緊接的引號、括號也算同一句
+CLOSERS = "」』”\"'）)"
+# 超過這個字數的句子再依子句切開，讓第一段夠短、很快就能開始播放
+MAX_CHUNK_CHARS = 16
+MAX_WORKERS = 4
+# 各段的狀態 (寫在狀態檔的 chunks 裡)
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+_SENTENCE_RE = re.compile(rf"[^{SENTENCE_END}]*[{SENTENCE_END}]+[{re.escape(CLOSERS)}]*|[^{SENTENCE_END}]+$")
+_CLAUSE_RE = re.compile(rf"[^{CLAUSE_END}]*[{CLAUSE_END}]+|[^{CLAUSE_END}]+$")
+
+
+def split_sentences(text: str):
+    """依句尾標點切句，標點 (與後面的引號) 保留在句子裡。"""
+    return [s.strip() for s in _SENTENCE_RE.findall(text) if s.strip()]
+
+
+def split_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS):
+    """
+    切成適合逐段合成的片段：先切句，超過 max_chars 的句子再依子句標點切開。
+    切法只看文字本身，所以同一個句子不論出現在故事裡還是題目裡，切出來的片段都一樣。
+    """
+    chunks = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        chunks += [c.strip() for c in _CLAUSE_RE.findall(sentence) if c.strip()]
+    # 只剩標點的片段 (例如「!」) 沒辦法發音，併到前一段
+    merged = []
+    for chunk in chunks:
+        if merged and not re.search(r"\w", chunk):
+            merged[-1] += chunk
+        else:
+            merged.append(chunk)
+    return merged
+
+
+class StreamSynthesizer:
+    """在背景把各段語音合成並發布到 static/audio/，同時維護每個串流的狀態檔；執行緒安全。"""
+
+    def __init__(self, static=None, max_workers: int = MAX_WORKERS):
+        self.static = static or get_static_audio()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-stream")
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.chunks = 0
+        self.failed = 0
+
+    def _write_status(self, stream_id: str, states):
+        """寫出狀態檔：{"chunks": [{"state": "ready", "url": ...}, {"state": "pending"}, ...]}"""
+        data = json.dumps({"chunks": states}, ensure_ascii=False).encode("utf-8")
+        write_atomic(os.path.join(self.static.audio_dir, f"stream-{stream_id}.json"), data)
+
+    def _work(self, stream_id: str, states, indexes, text: str, lang: str):
+        try:
+            state = {"state": READY, "url": self.static.publish_chunk(text, lang)}
+        except Exception:
+            # 播放器讀到 failed 就會停止並顯示錯誤
+            state = {"state": FAILED}
+            with self._lock:
+                self.failed += 1
+        with self._lock:
+            for i in indexes:
+                states[i] = state
+            self._write_status(stream_id, states)
+
+    def start(self, text: str, lang: str):
+        """
+        開始合成，回傳 (狀態檔網址, 目前各段的狀態)；沒有可發音的文字時回傳 (None, [])。
+        第一段同步合成 (出錯會直接丟出例外)，其餘各段在背景同時合成。
+        """
+        chunks = split_chunks(text)
+        if not chunks:
+            return None, []
+        stream_id = hashlib.sha256(f"{lang}\x1f{text}".encode("utf-8")).hexdigest()[:20]
+        first = self.static.publish_chunk(chunks[0], lang)
+        indexes = {}
+        for i, chunk in enumerate(chunks):
+            indexes.setdefault(chunk, []).append(i)
+        states = [{"state": PENDING}] * len(chunks)
+        for i in indexes.pop(chunks[0]):
+            states[i] = {"state": READY, "url": first}
+        with self._lock:
+            self._write_status(stream_id, states)
+            self.streams += 1
+            self.chunks += len(chunks)
+            snapshot = list(states)
+        for chunk, chunk_indexes in indexes.items():
+            self._pool.submit(self._work, stream_id, states, chunk_indexes, chunk, lang)
+        return f"{URL_PREFIX}/stream-{stream_id}.json", snapshot
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"streams": self.streams, "chunks": self.chunks, "failed": self.failed}
+
+
+_default_stream = None
+_default_lock = threading.Lock()
+
+
+def get_stream_synthesizer() -> StreamSynthesizer:
+    """整個 Python 行程共用一個。"""
+    global _default_stream
+    if _default_stream is None:
+        with _default_lock:
+            if _default_stream is None:
+                _default_stream = StreamSynthesizer()
+    return _default_stream
+
+
+# 依序播放各段；下一段還沒好就每 RETRY_MS 讀一次狀態檔，最多等 MAX_WAIT_MS，合成失敗就停止
+_PLAYER_HTML = """<div id="__ID__" style="font-family:sans-serif;display:flex;gap:10px;align-items:center">
+  <button style="padding:4px 14px;border-radius:8px;border:1px solid #ccc;background:white;cursor:pointer">▶ 播放</button>
+  <span style="color:#666;font-size:14px"></span>
+</div>
+<script data-stream="__ID__">
+(() => {
+  const root = document.getElementById("__ID__");
+  if (!root || root.dataset.ready) return;
+  root.dataset.ready = "1";
+  const STATUS_URL = __STATUS_URL__, AUTOPLAY = __AUTOPLAY__;
+  const RETRY_MS = 300, MAX_WAIT_MS = 20000;
+  const btn = root.querySelector("button"), statusEl = root.querySelector("span");
+  const player = new Audio();
+  let chunks = __CHUNKS__, index = 0, waited = 0, playing = false, timer = null;
+
+  function stop(message, label) {
+    playing = false; index = 0; waited = 0;
+    btn.textContent = label; statusEl.textContent = message;
+  }
+  async function refresh() {
+    try {
+      const resp = await fetch(STATUS_URL + "?t=" + Date.now(), {cache: "no-store"});
+      if (resp.ok) chunks = (await resp.json()).chunks;
+    } catch (e) {}
+  }
+  function warm(i) {
+    if (i < chunks.length && chunks[i].state === "ready") { const a = new Audio(); a.preload = "auto"; a.src = chunks[i].url; }
+  }
+  async function load() {
+    timer = null;
+    if (!playing) return;
+    if (index >= chunks.length) { stop("播放完畢", "▶ 重播"); return; }
+    const chunk = chunks[index];
+    if (chunk.state === "failed") { stop(`第 ${index + 1} 段語音合成失敗`, "▶ 重播"); return; }
+    if (chunk.state !== "ready") {
+      if (waited > MAX_WAIT_MS) { stop(`第 ${index + 1} 段等候逾時`, "▶ 重播"); return; }
+      statusEl.textContent = `第 ${index + 1} / ${chunks.length} 段 (合成中…)`;
+      waited += RETRY_MS;
+      timer = setTimeout(async () => { await refresh(); load(); }, RETRY_MS);
+      return;
+    }
+    waited = 0;
+    statusEl.textContent = `第 ${index + 1} / ${chunks.length} 段`;
+    player.src = chunk.url;
+    player.play().catch(() => {});
+    warm(index + 1);
+    if (chunks.some(c => c.state === "pending")) refresh();
+  }
+  player.onended = () => { index++; load(); };
+  player.onerror = () => stop(`第 ${index + 1} 段無法播放`, "▶ 重播");
+  btn.onclick = () => {
+    if (playing) {
+      playing = false; player.pause(); btn.textContent = "▶ 繼續";
+      if (timer) { clearTimeout(timer); timer = null; }
+      return;
+    }
+    playing = true; btn.textContent = "⏸ 暫停";
+    if (player.src && player.currentTime > 0 && !player.ended) player.play().catch(() => {});
+    else load();
+  };
+  if (AUTOPLAY) btn.click();
+})();
+</script>"""
+
+
+def play_stream(text: str, lang: str, autoplay: bool = True):
+    """分段串流播放一段長文字；第一段合成好就開始播放。"""
+    if not static_serving_enabled():
+        play_tts(text, lang, autoplay=autoplay)
+        return
+    status_url, chunks = get_stream_synthesizer().start(text, lang)
+    if status_url is None:
+        return
+    player_id = "tts-" + status_url.rsplit("/", 1)[-1].split(".")[0]
+    # 只帶第一段 (一定已合成好) 的狀態，其餘由播放器讀狀態檔；
+    # 這樣同一篇文章每次 rerun 的 HTML 都相同，Streamlit 不會重畫、播放不會中斷
+    chunks = chunks[:1] + [{"state": PENDING}] * (len(chunks) - 1)
+    # </ 轉成 <\/，文字內容不會提早結束 <script>
+    st.html(
+        _PLAYER_HTML
+        .replace("__ID__", player_id)
+        .replace("__STATUS_URL__", json.dumps(status_url))
+        .replace("__CHUNKS__", json.dumps(chunks).replace("</", "<\\/"))
+        .replace("__AUTOPLAY__", "true" if autoplay else "false"),
+        unsafe_allow_javascript=True,
+    )
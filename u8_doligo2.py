@@ -1,16 +1,16 @@
 import streamlit as st
 import os
 import datetime
-import pandas as pd
-import time 
+from static_audio import play_file # 共用的音檔播放 (以靜態網址提供，瀏覽器可快取)
+from corpus import load_unit # 共用的題庫 (corpus/*.json，每個行程只解析一次)
+from quiz_engine import QuizEngine, REVIEW_DONE, REVIEW_START, ROUND_DONE # 共用的出題狀態機
+from progress_store import bank_digest, get_progress_store, learner_id # 學生進度 (重新整理後可以接著做)
+from stats_table import last_answer_light, session_stats # 側邊欄統計 (作答後只更新那一列)
+from focus import focus_input # 換題時把游標放進作答框一次 (不輪詢)
+from theme import apply_theme # 共用樣式表 (theme.css，每個 session 只放進頁面一次)
 
-# 題庫
-words = [
-    "小熊", "口渴", "烏鴉", "喝水", "方法",
-    "森林", "動物", "知道", "聰明", "旅行",
-    "中午", "裝扮", "小瓶子", "許多", "石頭",
-    "動作", "難道", "忘記", "哈哈", "但是"
-]
+# 題庫 (corpus/ch_u8.json)
+words = load_unit("ch_u8").words
 
 
 # 音檔所在資料夾（請在專案下建立 audio 資料夾，放入對應 mp3）
@@ -21,19 +21,18 @@ CORRECT_SOUND_FILE = os.path.join(AUDIO_DIR, "correct.mp3")
 WRONG_SOUND_FILE = os.path.join(AUDIO_DIR, "wrong.mp3")
 
 
+# 學生進度 (網址的 ?learner=，重新整理後可以接著做)
+PROGRESS_UNIT = "ch_u8_doligo2"
+words_digest = bank_digest(words)
+progress = get_progress_store()
+learner = learner_id(st.query_params, st.session_state)
+
 # 初始化 session state
-if "index" not in st.session_state:
-    st.session_state.index = 0
-if "mode" not in st.session_state:  # normal / review
-    st.session_state.mode = "normal"
-if "retry_queue" not in st.session_state:
-    st.session_state.retry_queue = []
-if "answered" not in st.session_state:
-    st.session_state.answered = {}
+if "quiz" not in st.session_state:
+    saved = progress.load_quiz(learner, PROGRESS_UNIT, words_digest)
+    st.session_state.quiz, st.session_state.history = saved or (QuizEngine(len(words), advance_on_wrong=False), progress.new_history(learner, PROGRESS_UNIT))  # 答錯停在同一題，答對才前進
 if "history" not in st.session_state:
-    st.session_state.history = []
-if "stats" not in st.session_state:
-    st.session_state.stats = {w: {"正確": 0, "錯誤": 0} for w in words}
+    st.session_state.history = progress.new_history(learner, PROGRESS_UNIT)
 if "last_result" not in st.session_state:
     st.session_state.last_result = None
 if "played" not in st.session_state:
@@ -43,11 +42,12 @@ if "last_word" not in st.session_state:
 # 控制「繼續下一題」按鈕顯示的狀態 (Duolingo 流程的核心)
 if "show_next" not in st.session_state: 
     st.session_state.show_next = False
-# 📢 【保留】用於儲存待播放音效的 bytes (確保音效可靠播放)
+# 📢 【保留】用於儲存待播放音效的檔案路徑 (確保音效可靠播放)
 if "sound_to_play" not in st.session_state: 
     st.session_state.sound_to_play = None 
 
 
+apply_theme()
 st.markdown('<p style="font-size:26px">🎧 聽音辨字練習（預載 mp3 版本）</p>', unsafe_allow_html=True)
 
 
@@ -64,36 +64,31 @@ def play_preloaded_audio(word: str) -> bool:
     # 檔名：audio/<單字>.mp3
     filename = os.path.join(AUDIO_DIR, f"{word}.mp3")
 
-    if not os.path.exists(filename):
-        st.warning(f"⚠️ 找不到音檔：{filename}，請確認檔案是否存在。")
-        return False
-
     try:
-        with open(filename, "rb") as f:
-            audio_bytes = f.read()
-        st.audio(audio_bytes, format="audio/mp3")
+        play_file(filename, autoplay=False)
         return True
+    except FileNotFoundError:
+        st.warning(f"⚠️ 找不到音檔：{filename}，請確認檔案是否存在。")
+        return False
     except Exception as e:
         st.error(f"讀取音檔時發生錯誤：{e}")
         return False
 
 
-# 📢 【修改】通用播放音效的函式，改為將檔案 bytes 存入 session_state (這是可靠播放的關鍵)
+# 📢 【修改】通用播放音效的函式，改為將檔案路徑存入 session_state (這是可靠播放的關鍵)
 def play_sound(filepath: str):
     """
-    通用播放音效的函式，將音效內容儲存到 session_state 待主腳本播放。
+    通用播放音效的函式，將音效路徑儲存到 session_state 待主腳本播放。
     """
-    if not os.path.exists(filepath):
-        st.error(f"❌ 嚴重錯誤：找不到音效檔！請確認檔案路徑是否正確：{filepath}")
-        return
-
     try:
-        with open(filepath, "rb") as f:
-            audio_bytes = f.read()
+        # 先確認檔案存在；session state 只存路徑，播放時以靜態網址送給瀏覽器
+        os.stat(filepath)
         
-        # 儲存音效 bytes 到 session state，等待主腳本執行時播放
-        st.session_state.sound_to_play = audio_bytes
+        # 儲存音效路徑到 session state，等待主腳本執行時播放
+        st.session_state.sound_to_play = filepath
 
+    except FileNotFoundError:
+        st.error(f"❌ 嚴重錯誤：找不到音效檔！請確認檔案路徑是否正確：{filepath}")
     except Exception as e:
         st.error(f"讀取音效檔時發生錯誤：{e}")
 
@@ -108,48 +103,29 @@ def play_wrong_sound():
     play_sound(WRONG_SOUND_FILE)
 
 
-# 📌 取得下一個題目
-def get_next_word():
-    # 優先處理錯題 queue
-    if st.session_state.mode == "review":
-        if st.session_state.retry_queue:
-            return st.session_state.retry_queue[0]
-        else:
-            # 錯題複習結束 → 回到新一輪
-            st.session_state.mode = "normal"
-            st.session_state.index = 0
-            st.session_state.last_result = "🎉 錯題複習完成！開始新一輪！"
-            return words[st.session_state.index]
-
-    # normal 模式 → 按順序走題庫
-    if st.session_state.index < len(words):
-        return words[st.session_state.index]
-    else:
-        # 一輪結束 → 準備錯題複習
-        wrongs = [w for w, ans in st.session_state.answered.items() if ans is False]
-        if wrongs:
-            st.session_state.mode = "review"
-            # 刷新 retry_queue
-            st.session_state.retry_queue = wrongs.copy()
-            st.session_state.last_result = "🔁 進入錯題複習！"
-            return st.session_state.retry_queue[0]
-        else:
-            # 全部答對 → 新一輪
-            st.session_state.index = 0
-            st.session_state.answered = {} # 重設 answered 狀態
-            st.session_state.last_result = "🎉 全部正確！開始新一輪！"
-            return words[st.session_state.index]
-
-
-# 取得目前題目
-current_word = get_next_word()
+quiz = st.session_state.quiz
+stats = session_stats(st.session_state, quiz, words, label_column="單字", rate_column="正確/總次數",
+                      numbered=False, light=last_answer_light)
+
+ROUND_MESSAGES = {
+    REVIEW_DONE: "🎉 錯題複習完成！開始新一輪！",
+    REVIEW_START: "🔁 進入錯題複習！",
+    ROUND_DONE: "🎉 全部正確！開始新一輪！",
+}
+
+
+# 取得目前題目 (出題規則在 quiz_engine.py)
+current_word = words[quiz.current]
 # 確保輸入框的 key 在每次題目變換時是唯一的
-input_key = f"input_{current_word}_{st.session_state.index}_{st.session_state.mode}" 
+input_key = f"input_{current_word}_{quiz.cursor}_{quiz.mode}" 
 
 
 # 📢 檢查並播放待播放的音效 (在最上方執行，優先播放)
 if st.session_state.sound_to_play is not None:
-    st.audio(st.session_state.sound_to_play, format="audio/mp3", autoplay=True)
+    try:
+        play_file(st.session_state.sound_to_play)
+    except FileNotFoundError:
+        pass
     # 立即清除，確保下次運行不會重複播放
     st.session_state.sound_to_play = None
 
@@ -179,8 +155,8 @@ def submit_answer():
     user_input = st.session_state[input_key]
     now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    if user_input == current_word:
-        st.session_state.stats[current_word]["正確"] += 1
+    is_correct = user_input == current_word
+    if is_correct:
         result = "正確"
         
         # 🔊 播放答對音效
@@ -189,19 +165,7 @@ def submit_answer():
         # 設置結果訊息 (Duolingo 風格)
         st.session_state.last_result = '<p style="font-size:36px; color:green; font-weight:bold;">✅ 答對了！</p>' 
 
-        # 複習模式 → 答對後移出 queue
-        if st.session_state.mode == "review":
-            if current_word in st.session_state.retry_queue:
-                st.session_state.retry_queue.remove(current_word)
-        else:
-            st.session_state.answered[current_word] = True # 標記為正確
-        
-        # 答對了才推進 index
-        if st.session_state.mode == "normal":
-            st.session_state.index += 1
-        
     else:
-        st.session_state.stats[current_word]["錯誤"] += 1
         result = "錯誤"
         
         # 🔊 播放答錯音效
@@ -210,16 +174,12 @@ def submit_answer():
         # 設置結果訊息 (Duolingo 風格)
         st.session_state.last_result = f'<p style="font-size:36px; color:red; font-weight:bold;">❌ 答錯！</p>正確答案是：**{current_word}**'
 
-        if st.session_state.mode == "review":
-            # 複習模式答錯 → 將該詞移到隊列尾端，稍後再問
-            if current_word in st.session_state.retry_queue:
-                st.session_state.retry_queue.remove(current_word)
-            st.session_state.retry_queue.append(current_word)
-        else:
-            # normal 模式答錯 → 標記為錯誤
-            st.session_state.answered[current_word] = False
-            
-            
+    # 記錄作答並前進到下一題；換輪時顯示提示
+    stats.update(quiz.submit(is_correct))
+    event = quiz.next()
+    if event:
+        st.session_state.last_result = ROUND_MESSAGES[event]
+
     # 紀錄歷史
     st.session_state.history.append({
         "題目": current_word,
@@ -227,6 +187,7 @@ def submit_answer():
         "學生輸入的答案": user_input,
         "時間": now_str
     })
+    progress.save_quiz(learner, PROGRESS_UNIT, words_digest, quiz, st.session_state.history)
 
     # reset 播放狀態，並設定顯示「繼續下一題」按鈕 (Duolingo 風格)
     st.session_state.played = False
@@ -248,48 +209,29 @@ else:
                        autocomplete="off")
         # 提交答案後，會執行 submit_answer，並設定 show_next = True
         st.form_submit_button("提交答案 (或按 Enter)", on_click=submit_answer)
+    focus_input(input_key)
 
 
 # 側邊欄進度
 st.sidebar.header("📊 學習進度")
-done = sum(1 for v in st.session_state.answered.values() if v is True)
+done = stats.mastered  # 🟢：最近一次答對
 total = len(words)
 st.sidebar.write(f"✅ 已正確答對：{done} / {total}")
-st.sidebar.write(f"🔄 待複習錯題：{len(st.session_state.retry_queue)}")
-st.sidebar.write(f"模式：**{st.session_state.mode.upper()}**")
+st.sidebar.write(f"🔄 待複習錯題：{len(quiz.wrong_queue)}")
+st.sidebar.write(f"模式：**{quiz.mode}**")
 
 # 答題歷史
 st.sidebar.header("📝 答題歷史")
-if st.session_state.history:
-    # 倒序顯示，最新的在最上面
-    df = pd.DataFrame(st.session_state.history[::-1])
-    st.sidebar.dataframe(df, use_container_width=True)
+history = st.session_state.history
+if history:
+    page = 0
+    if history.pages() > 1:
+        page = st.sidebar.number_input("頁數 (最新的在第 1 頁)", min_value=1, max_value=history.pages(), value=1) - 1
+    # 只組出這一頁的 DataFrame，沒有新作答時直接用快取
+    st.sidebar.dataframe(history.frame(page), width="stretch")
 
 # 單字正確率統計 + 狀態燈
 st.sidebar.header("📊 單字正確率統計")
-stats_list = []
-for w in words: # 遍歷整個題庫的順序
-    s = st.session_state.stats[w]
-    total_attempts = s["正確"] + s["錯誤"]
-    rate = f"{s['正確']}/{total_attempts}" if total_attempts > 0 else "0/0"
-    
-    # --- 狀態燈邏輯 ---
-    status_light = "⚪" # 預設: 尚未作答 (或還沒進入該輪)
-    
-    if w in st.session_state.retry_queue:
-        status_light = "🔴" # 錯題隊列中
-    elif w in st.session_state.answered:
-        if st.session_state.answered[w] is True:
-            status_light = "🟢" # 已經正確答對過
-        elif st.session_state.answered[w] is False:
-            # 如果不在 retry_queue 但在 answered 裡是 False，代表它在 normal 模式答錯，
-            # 且還沒進入或已離開複習模式 (主要看 retry_queue)
-            status_light = "🟡" # 曾答錯，待複習 
-    
-    stats_list.append({
-        "狀態": status_light,
-        "單字": w, 
-        "正確/總次數": rate
-    })
-df_stats = pd.DataFrame(stats_list)
-st.sidebar.dataframe(df_stats, use_container_width=True)
\ No newline at end of file
+st.sidebar.caption(stats.summary())
+# 作答時只更新那一列 (stats.update)，沒有新作答時直接用快取的表格
+st.sidebar.dataframe(stats.frame(), width="stretch")
\ No newline at end of file